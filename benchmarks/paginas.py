@@ -0,0 +1,253 @@
+"""Benchmark de carga das páginas com o AppTest do Streamlit.
+
+Executa ``home.py`` e cada página de ``pages/`` sem navegador e mede, para
+cada escala do painel (1x, 10x, 100x linhas):
+
+- tempo de inicialização: de um interpretador novo até a primeira execução
+  da página concluída, e quais bibliotecas pesadas (pandas, matplotlib,
+  seaborn, plotly...) foram importadas nesse caminho;
+- tempo da primeira execução (partida a frio, incluindo a leitura dos dados);
+- tempo médio das reexecuções ao interagir com os widgets da página;
+- pico de memória residente (RSS) do processo;
+- tempo de geração do Excel dos dados exibidos pela página.
+
+Cada combinação página x escala roda em um subprocesso próprio, para que a
+memória e os caches de uma medição não afetem a outra. Uso::
+
+    python -m benchmarks.paginas [--escalas 1 10 100] [--json resultados.json]
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGINAS = ["home.py"] + sorted(os.path.relpath(p, RAIZ) for p in glob.glob(os.path.join(RAIZ, "pages", "*.py")))
+
+# Bibliotecas cujo custo de importação a inicialização deve evitar
+MODULOS_PESADOS = [
+    'pandas', 'pyarrow', 'matplotlib.pyplot', 'seaborn', 'scipy',
+    'plotly.express', 'plotly.graph_objects', 'xlsxwriter',
+]
+
+
+# === Interações de cada página (widgets usados nas reexecuções) ===
+
+def _interacoes_home(at):
+    return [lambda: at]
+
+
+def _interacoes_pagina1(at):
+    return [
+        lambda: at.sidebar.selectbox[0].select('oc3'),
+        lambda: at.sidebar.selectbox[1].select('wroa'),
+        lambda: at.sidebar.selectbox[0].select('oc134'),
+    ]
+
+
+def _interacoes_pagina2(at):
+    setores = at.selectbox[0].options
+    anos = at.selectbox[1].options
+    return [
+        lambda: at.selectbox[0].select(setores[1 % len(setores)]),
+        lambda: at.selectbox[1].select(anos[-1]),
+        lambda: at.selectbox[0].select(setores[-1]),
+    ]
+
+
+def _interacoes_pagina3(at):
+    setores = [s for s in at.multiselect[0].options if s != 'Selecionar todos']
+    return [
+        lambda: at.multiselect[0].set_value(setores[:2]),
+        lambda: at.multiselect[0].set_value(setores[:5]),
+        lambda: at.multiselect[0].set_value(['Selecionar todos']),
+    ]
+
+
+def _interacoes_pagina4(at):
+    return [
+        lambda: at.sidebar.radio[0].set_value('n2'),
+        lambda: at.sidebar.radio[0].set_value('nm'),
+        lambda: at.sidebar.radio[0].set_value('n1'),
+    ]
+
+
+def _interacoes_pagina5(at):
+    return [
+        lambda: at.sidebar.selectbox[0].select('wqtobin'),
+        lambda: at.sidebar.selectbox[1].select('oc3'),
+        lambda: at.sidebar.multiselect[0].set_value(['lnat']),
+    ]
+
+
+def _interacoes_pagina6(at):
+    tickers = at.sidebar.multiselect[0].options
+    return [
+        lambda: at.sidebar.multiselect[0].set_value(tickers[1:2]),
+        lambda: at.sidebar.multiselect[0].set_value(tickers[:4]),
+        lambda: at.sidebar.selectbox[0].select('wroe'),
+    ]
+
+
+def _interacoes_pagina7(at):
+    return [
+        lambda: at.text_area[0].input("lnat > 15 AND (oc1 = 1 OR oc3 = 1)"),
+        lambda: at.radio[0].set_value("Agregação"),
+        lambda: at.multiselect[0].set_value(['setor', 'ano']),
+    ]
+
+
+INTERACOES = {
+    "home.py": _interacoes_home,
+    PAGINAS[1]: _interacoes_pagina1,
+    PAGINAS[2]: _interacoes_pagina2,
+    PAGINAS[3]: _interacoes_pagina3,
+    PAGINAS[4]: _interacoes_pagina4,
+    PAGINAS[5]: _interacoes_pagina5,
+    PAGINAS[6]: _interacoes_pagina6,
+    PAGINAS[7]: _interacoes_pagina7,
+}
+
+
+def preparar_painel(escala, pasta):
+    """Grava um painel sintético com ``escala`` vezes as linhas e retorna o caminho."""
+    import pyarrow as pa
+
+    from utils.dados import carregar_dados
+    from utils.esquema import aplicar_esquema
+    from utils.proxies import painel_ampliado
+
+    df = aplicar_esquema(painel_ampliado(carregar_dados(), escala))
+    destino = os.path.join(pasta, f"painel_{escala}x.arrow")
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(destino, "wb") as saida:
+        with pa.ipc.new_file(saida, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+    return destino
+
+
+def medir_inicializacao(pagina):
+    """Primeira execução de ``pagina`` em um processo novo, sem outras importações.
+
+    Retorna as bibliotecas pesadas carregadas até o fim da execução; o tempo
+    é medido pelo processo pai, incluindo a partida do interpretador.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    AppTest.from_file(os.path.join(RAIZ, pagina), default_timeout=600).run()
+    return {'modulos': [m for m in MODULOS_PESADOS if m in sys.modules]}
+
+
+def medir_pagina(pagina):
+    """Executa a medição de ``pagina`` no processo atual e retorna o resultado."""
+    from streamlit.testing.v1 import AppTest
+
+    from utils import componentes, exportacao
+
+    # Guarda os dados do último botão de download para medir a exportação
+    downloads = []
+    original = componentes.botoes_download
+
+    def registrar(obter_df, chave, nome_arquivo, nome_planilha='Dados', **kwargs):
+        downloads.append((obter_df, nome_planilha))
+        return original(obter_df, chave, nome_arquivo, nome_planilha, **kwargs)
+
+    componentes.botoes_download = registrar
+
+    at = AppTest.from_file(os.path.join(RAIZ, pagina), default_timeout=600)
+    inicio = time.perf_counter()
+    at.run()
+    partida_fria = time.perf_counter() - inicio
+    erros = [e.message for e in at.exception]
+
+    tempos = []
+    for interagir in INTERACOES[pagina](at):
+        elemento = interagir()
+        inicio = time.perf_counter()
+        elemento.run()
+        tempos.append(time.perf_counter() - inicio)
+        erros += [e.message for e in at.exception]
+
+    exportacao_excel = None
+    if downloads:
+        obter_df, nome_planilha = downloads[-1]
+        inicio = time.perf_counter()
+        exportacao.exportar(obter_df(), 'xlsx', nome_planilha)
+        exportacao_excel = time.perf_counter() - inicio
+
+    return {
+        'pagina': pagina,
+        'partida_fria_s': partida_fria,
+        'reexecucao_s': sum(tempos) / len(tempos),
+        'exportacao_excel_s': exportacao_excel,
+        'pico_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'erros': erros,
+    }
+
+
+def executar(escalas, paginas=PAGINAS):
+    resultados = []
+    with tempfile.TemporaryDirectory() as pasta:
+        for escala in escalas:
+            ambiente = dict(os.environ)
+            # Mede cada página sozinha, sem o aquecimento das demais em segundo plano
+            ambiente.setdefault('AQUECIMENTO', '0')
+            if escala != 1:
+                ambiente['DADOS_ARQUIVO'] = preparar_painel(escala, pasta)
+            for pagina in paginas:
+                inicio = time.perf_counter()
+                inicializacao = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.paginas", "--inicializacao", pagina],
+                    cwd=RAIZ, env=ambiente, capture_output=True, text=True, check=True,
+                )
+                tempo_inicializacao = time.perf_counter() - inicio
+                modulos = json.loads(inicializacao.stdout.strip().splitlines()[-1])['modulos']
+
+                processo = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.paginas", "--filho", pagina],
+                    cwd=RAIZ, env=ambiente, capture_output=True, text=True, check=True,
+                )
+                resultado = json.loads(processo.stdout.strip().splitlines()[-1])
+                resultado['escala'] = escala
+                resultado['inicializacao_s'] = tempo_inicializacao
+                resultado['modulos_inicializacao'] = modulos
+                resultados.append(resultado)
+                print(_formatar(resultado), file=sys.stderr)
+    return resultados
+
+
+def _formatar(r):
+    exportacao = "-" if r['exportacao_excel_s'] is None else f"{r['exportacao_excel_s']:.2f}s"
+    erros = f"  ERROS: {r['erros']}" if r['erros'] else ""
+    return (
+        f"{r['escala']:>4}x  {r['pagina']:<50} inicialização {r['inicializacao_s']:6.2f}s  "
+        f"fria {r['partida_fria_s']:6.2f}s  "
+        f"reexecução {r['reexecucao_s']:6.2f}s  excel {exportacao:>7}  "
+        f"RSS {r['pico_rss_mb']:7.1f} MB  importados: {', '.join(r['modulos_inicializacao']) or '-'}{erros}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--escalas', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--paginas', nargs='+', default=PAGINAS)
+    parser.add_argument('--json', help="arquivo para gravar os resultados")
+    parser.add_argument('--filho', help=argparse.SUPPRESS)
+    parser.add_argument('--inicializacao', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    sys.path.insert(0, RAIZ)
+    if args.inicializacao:
+        print(json.dumps(medir_inicializacao(args.inicializacao)))
+    elif args.filho:
+        print(json.dumps(medir_pagina(args.filho)))
+    else:
+        resultados = executar(args.escalas, args.paginas)
+        if args.json:
+            with open(args.json, "w") as arquivo:
+                json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
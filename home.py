@@ -1,5 +1,10 @@
 import streamlit as st
 
+from utils.aquecimento import iniciar_aquecimento
+
+# ====== Dados e visões padrão preparados em segundo plano ======
+iniciar_aquecimento()
+
 # ====== Estilo CSS personalizado ======
 st.markdown("""
     <style>
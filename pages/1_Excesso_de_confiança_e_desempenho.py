@@ -1,10 +1,20 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import io
+
+from utils import analises
+from utils.cache import assinatura
+from utils.componentes import botoes_download, seletor_conjunto, tabela_paginada
+from utils.dados import carregar_painel, listar_conjuntos
+from utils.estatisticas import TOTAL, bootstrap_em_segundo_plano, testes
+from utils.figuras import figura_desempenho
+from utils.indice import obter_indice
+from utils.instrumentacao import enviar, etapa, finalizar, iniciar
+
+iniciar("desempenho")
 
 # === Leitura dos dados ===
-df = pd.read_excel("dados.xlsx")
+with etapa("carga"):
+    painel = seletor_conjunto()
+    indice = obter_indice(painel)
 
 # === Título e descrição ===
 st.title("Excesso de Confiança Gerencial e Desempenho")
@@ -29,7 +39,7 @@ coluna_filtro = st.sidebar.selectbox(
 )
 
 # Filtro dos valores dessa variável
-opcoes = sorted(df[coluna_filtro].dropna().unique())
+opcoes = indice.valores(coluna_filtro)
 valores_selecionados = st.sidebar.multiselect(
     f"Valores de {coluna_filtro}:", 
     opcoes, 
@@ -42,8 +52,18 @@ variavel_desempenho = st.sidebar.selectbox(
     ['wqtobin', 'wroa', 'wroaebit', 'wroe', 'wmgop']
 )
 
+mostrar_erro_padrao = st.sidebar.checkbox("Mostrar erro-padrão das médias", value=False)
+
+# === Comparação com outro conjunto de dados ===
+outros_conjuntos = {nome: caminho for nome, caminho in listar_conjuntos().items() if nome != painel.nome}
+painel_comparacao = None
+if outros_conjuntos and st.sidebar.checkbox("Comparar com outro conjunto de dados", value=False):
+    conjunto_comparacao = st.sidebar.selectbox("Conjunto para comparação:", list(outros_conjuntos))
+    with etapa("carga.comparacao"):
+        painel_comparacao = carregar_painel(outros_conjuntos[conjunto_comparacao])
+
 # === Filtro por ano ===
-anos_unicos = sorted(df['ano'].dropna().unique())
+anos_unicos = indice.valores('ano')
 anos_opcoes = ["Selecionar todos"] + anos_unicos
 
 anos_selecionados = st.sidebar.multiselect(
@@ -59,7 +79,7 @@ else:
 
 
 # === Filtro por setor ===
-setores_unicos = sorted(df['setor'].dropna().unique())
+setores_unicos = indice.valores('setor')
 setores_opcoes = ["Selecionar todos"] + setores_unicos
 
 setores_selecionados = st.sidebar.multiselect(
@@ -74,54 +94,122 @@ else:
     setores_filtrados = setores_selecionados
 
 
-# === Aplicar filtros ===
-df_filtrado = df[
-    (df[coluna_filtro].isin(valores_selecionados)) & 
-    (df['ano'].isin(anos_filtrados)) & 
-    (df['setor'].isin(setores_filtrados))
-]
+# === Aplicar filtros (interseção dos bitmaps do índice) ===
+with etapa("filtros"):
+    selecao = indice.selecionar(
+        painel,
+        **{coluna_filtro: valores_selecionados},
+        ano=anos_filtrados,
+        setor=setores_filtrados
+    )
+
+@st.fragment(run_every=1)
+def aguardar_bootstrap(bootstrap):
+    # Recarrega a página quando os intervalos ficarem prontos
+    if bootstrap.pronto():
+        st.rerun()
+    st.caption("⏳ Calculando os intervalos de confiança por bootstrap...")
+
 
 # === Verificar e gerar gráfico ===
-if variavel_desempenho in df_filtrado.columns:
+if variavel_desempenho in painel.colunas:
     st.subheader(f"📉 Desempenho por Ano e Grupo de {coluna_filtro.upper()}")
 
-    df_grouped = df_filtrado.groupby(['ano', coluna_filtro])[variavel_desempenho].mean().reset_index()
-
-    fig3, ax3 = plt.subplots(figsize=(10, 6))
-    for grupo in sorted(df_grouped[coluna_filtro].dropna().unique()):
-        subset = df_grouped[df_grouped[coluna_filtro] == grupo]
-        ax3.plot(
-            subset['ano'], 
-            subset[variavel_desempenho], 
-            marker='o', 
-            label=f'Grupo {grupo}'
+    def medias(painel_grafico):
+        # Médias por ano e grupo a partir do cubo de agregados (sem percorrer as linhas)
+        with etapa("agregacao"):
+            return analises.desempenho(
+                painel_grafico,
+                coluna_filtro,
+                variavel_desempenho,
+                anos=anos_filtrados,
+                setores=setores_filtrados,
+                grupos=valores_selecionados,
+            )
+
+    def grafico(painel_grafico, limites_y=None):
+        # Figura em cache por filtros e versão dos dados (PNG, figura fechada após o desenho)
+        with etapa("figura"):
+            return figura_desempenho(
+                painel_grafico, coluna_filtro, variavel_desempenho, valores_selecionados,
+                anos_filtrados, setores_filtrados, mostrar_erro_padrao, limites_y
+            )
+
+    if painel_comparacao is None:
+        st.image(enviar(grafico(painel)), use_container_width=True)
+    else:
+        # === Comparação lado a lado, com o mesmo eixo y nos dois gráficos ===
+        paineis = [painel, painel_comparacao]
+        tabelas = [medias(p) for p in paineis]
+        barras = [t['erro_padrao'].fillna(0) if mostrar_erro_padrao else 0 for t in tabelas]
+        inferiores = [(t['media'] - b).min() for t, b in zip(tabelas, barras) if not t.empty]
+        superiores = [(t['media'] + b).max() for t, b in zip(tabelas, barras) if not t.empty]
+        limites_y = None
+        if inferiores:
+            margem = (max(superiores) - min(inferiores)) * 0.05 or 1.0
+            limites_y = (float(min(inferiores) - margem), float(max(superiores) + margem))
+
+        for coluna, painel_grafico in zip(st.columns(2), paineis):
+            with coluna:
+                st.markdown(f"**{painel_grafico.nome}**")
+                st.image(enviar(grafico(painel_grafico, limites_y)), use_container_width=True)
+
+        # Médias dos dois conjuntos e a diferença, por ano e grupo
+        comparacao = tabelas[0][['ano', 'grupo', 'media']].merge(
+            tabelas[1][['ano', 'grupo', 'media']],
+            on=['ano', 'grupo'],
+            how='outer',
+            suffixes=(f" ({painel.nome})", f" ({painel_comparacao.nome})")
         )
+        comparacao['diferenca'] = (
+            comparacao[f"media ({painel_comparacao.nome})"] - comparacao[f"media ({painel.nome})"]
+        )
+        st.dataframe(enviar(comparacao), use_container_width=True, hide_index=True)
 
-    ax3.set_title(f"{variavel_desempenho.upper()} Médio por Ano e {coluna_filtro.upper()}")
-    ax3.set_xlabel("Ano")
-    ax3.set_ylabel(f"{variavel_desempenho.upper()} Médio")
-    ax3.set_xticks(sorted(df_grouped['ano'].unique()))
-    ax3.grid(True)
-    ax3.legend(title=coluna_filtro.upper())
-    plt.tight_layout()
-
-    st.pyplot(fig3)
+    # === Testes da diferença entre os grupos (bootstrap em segundo plano) ===
+    st.subheader(f"🧪 Diferença de {variavel_desempenho.upper()} entre os grupos de {coluna_filtro.upper()}")
+    st.caption(
+        "Média do grupo 1 (proxy maior que zero) menos a do grupo 0, com teste t de Welch "
+        "e intervalo de confiança de 95% por bootstrap com reamostragem de empresas."
+    )
+    with etapa("testes"):
+        bootstrap = bootstrap_em_segundo_plano(painel, anos_filtrados, setores_filtrados)
+        tabela_testes = testes(painel, anos_filtrados, setores_filtrados, bootstrap)
+
+    par = (tabela_testes['proxy'] == coluna_filtro) & (tabela_testes['metrica'] == variavel_desempenho)
+    st.dataframe(
+        enviar(tabela_testes[par].drop(columns=['proxy', 'metrica'])),
+        use_container_width=True,
+        hide_index=True
+    )
+    if not bootstrap.pronto():
+        aguardar_bootstrap(bootstrap)
+
+    with st.expander("Todos os pares proxy × métrica (total dos anos)"):
+        st.dataframe(
+            enviar(tabela_testes[tabela_testes['periodo'] == TOTAL].drop(columns='periodo')),
+            use_container_width=True,
+            hide_index=True
+        )
 
     # === Mostrar tabela dos dados filtrados ===
     st.subheader("📋 Dados representados no gráfico")
-    st.dataframe(df_filtrado, use_container_width=True)
-
-    # === Download dos dados em Excel ===
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df_filtrado.to_excel(writer, index=False, sheet_name='Dados_Filtrados')
-    output.seek(0)
-
-    st.download_button(
-        label="Baixar dados em Excel",
-        data=output.getvalue(),
-        file_name="dados_filtrados.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    with etapa("tabela"):
+        tabela_paginada(
+            selecao,
+            painel.colunas,
+            ['ticker', 'ano', 'setor', coluna_filtro, variavel_desempenho],
+            chave="tabela_desempenho"
+        )
+
+    # === Download dos dados (gerado apenas ao clicar) ===
+    botoes_download(
+        selecao.dados,
+        chave=assinatura(painel.versao, 'desempenho', coluna_filtro, valores_selecionados, anos_filtrados, setores_filtrados),
+        nome_arquivo="dados_filtrados",
+        nome_planilha='Dados_Filtrados'
     )
 else:
     st.warning(f"⚠️ A coluna '{variavel_desempenho}' não está disponível no DataFrame.")
+
+finalizar()
@@ -1,68 +1,78 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
-import io
 
-# Evita warnings do Streamlit com matplotlib
-import warnings
-warnings.filterwarnings("ignore")
+from utils import analises
+from utils.cache import assinatura
+from utils.componentes import botoes_download, seletor_conjunto
+from utils.figuras import figura_investimento
+from utils.indice import obter_indice
+from utils.instrumentacao import enviar, etapa, finalizar, iniciar
+
+iniciar("investimento")
 
 # Título do app
 st.title("Excesso de investimento: Análise de Crescimento dos Ativos vs. Resíduos")
 st.write("Excesso de investimento (oc2): Gráfico de Crescimento dos Ativos em relação aos Resíduos da Regressão MQO por Setor e Ano")
 
-# Carregar os dados do Excel diretamente
-df = pd.read_excel("dados.xlsx")
+# Carregar os dados (cache compartilhado)
+with etapa("carga"):
+    painel = seletor_conjunto()
+    indice = obter_indice(painel)
+
+# Retas MQO de todas as células (setor, ano), ajustadas uma única vez
+with etapa("regressao"):
+    coeficientes = analises.retas_investimento(painel)
 
 # Interface para seleção de setor e ano
-setores_disponiveis = df["setor"].dropna().unique()
-anos_disponiveis = sorted(df["ano"].dropna().unique())
+setores_disponiveis = indice.valores("setor")
+anos_disponiveis = indice.valores("ano")
 
 setor_dados = st.selectbox("Selecione o setor:", setores_disponiveis)
 ano = st.selectbox("Selecione o ano:", anos_disponiveis)
 
 # Filtrar os dados com base no setor e ano
-dfmqo = df[(df["setor"] == setor_dados) & (df["ano"] == ano)]
+with etapa("filtros"):
+    dfmqo, reta = analises.celula_investimento(painel, setor_dados, ano)
 
 if not dfmqo.empty:
     st.subheader(f"Gráfico: Setor de {setor_dados} - Ano {ano}")
 
-    fig, ax = plt.subplots(figsize=(12, 6))
-    sns.regplot(x="creat", y="residuo", data=dfmqo, scatter_kws={"s": 50}, line_kws={"color": "red"}, ax=ax)
-
-    # Adicionar os rótulos com o ticker
-    for i in range(dfmqo.shape[0]):
-        creat = dfmqo["creat"].iloc[i]
-        residuo = dfmqo["residuo"].iloc[i]
-
-        if np.isfinite(creat) and np.isfinite(residuo):
-            ax.text(creat, residuo, dfmqo["ticker"].iloc[i], fontsize=9, ha='right')
-
-    ax.set_title(f"Crescimento dos Ativos vs. Resíduos - {setor_dados} ({ano}) - OC2")
-    ax.set_xlabel("Crescimento dos Ativos")
-    ax.set_ylabel("Resíduo da Regressão MQO")
-    ax.grid(True)
-
-    st.pyplot(fig)
+    # Figura em cache por setor, ano e versão dos dados
+    with etapa("figura"):
+        grafico = figura_investimento(painel, setor_dados, ano)
+        st.image(enviar(grafico), use_container_width=True)
+    st.caption(
+        f"Reta MQO: resíduo = {reta['intercepto']:.3f} {'-' if reta['inclinacao'] < 0 else '+'} "
+        f"{abs(reta['inclinacao']):.3f} × crescimento dos ativos "
+        f"(R² = {reta['r2']:.3f}, n = {reta['n']})"
+    )
 
     # Dados filtrados abaixo do gráfico
     st.subheader("📋 Dados representados no gráfico")
-    st.dataframe(dfmqo.reset_index(drop=True))
-    
-    # Download Excel dos dados agrupados (dfmqo)
-    output_mqo = io.BytesIO()
-    with pd.ExcelWriter(output_mqo, engine='xlsxwriter') as writer:
-        dfmqo.to_excel(writer, index=False, sheet_name='Dados_Agrupados')
-    output_mqo.seek(0)
+    with etapa("tabela"):
+        st.dataframe(enviar(dfmqo.reset_index(drop=True)))
     
-    st.download_button(
-        label="Baixar dados em Excel",
-        data=output_mqo.getvalue(),
-        file_name="dados_agrupados.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    # Download dos dados agrupados (dfmqo), gerado apenas ao clicar
+    botoes_download(
+        lambda: dfmqo,
+        chave=assinatura(painel.versao, 'investimento', setor_dados, ano),
+        nome_arquivo="dados_agrupados",
+        nome_planilha='Dados_Agrupados'
     )
 
 else:
     st.warning(f"Não há dados disponíveis para o setor '{setor_dados}' no ano {ano}.")
+
+# Comparação entre todas as células, a partir das retas já ajustadas
+with st.expander("Comparar todas as células (setor × ano)"):
+    medida = st.radio(
+        "Medida:",
+        ["inclinacao", "intercepto", "r2"],
+        format_func={"inclinacao": "Inclinação", "intercepto": "Intercepto", "r2": "R²"}.get,
+        horizontal=True
+    )
+    st.dataframe(
+        enviar(coeficientes.pivot(index="setor", columns="ano", values=medida)),
+        use_container_width=True
+    )
+
+finalizar()
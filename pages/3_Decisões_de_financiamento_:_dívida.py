@@ -1,31 +1,41 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import io
+
+from utils import analises
+from utils.cache import assinatura
+from utils.componentes import botoes_download, seletor_conjunto
+from utils.figuras import grafico_contagem_oc3
+from utils.indice import obter_indice
+from utils.instrumentacao import enviar, etapa, finalizar, iniciar
+from utils.ranking import obter_ranking
 
 st.set_page_config(page_title="Excesso de Confiança Gerencial", layout="wide")
 
+iniciar("financiamento")
+
 st.title("Empresas Excessivamente Confiantes por Ano e Setor")
 st.write("Análise usando a proxy OC3 (dívida / valor de mercado), que atua na dimensão das decisões de financiamento das organizações.")
 
 # --- Importando os dados
 try:
-    df = pd.read_excel("dados.xlsx")
+    with etapa("carga"):
+        painel = seletor_conjunto()
 except FileNotFoundError:
     st.error("Arquivo 'dados.xlsx' não encontrado.")
     st.stop()
 
 # --- Verificando colunas necessárias
-if 'divev' not in df.columns or 'mediana_divev' not in df.columns:
+if 'divev' not in painel.colunas or 'mediana_divev' not in painel.colunas:
     st.error("As colunas 'divev' e/ou 'mediana_divev' não estão presentes nos dados.")
     st.stop()
 
-# --- Calculando diferença de divev
-df['divev_dif'] = df['divev'] - df['mediana_divev']
-
 # --- Variáveis
 variaveis_desempenho = ['wroa', 'wroaebit', 'wroe', 'wqtobin', 'wmgop', 'wopor', 'lnat', 'divbrat']
-setores_disponiveis = sorted(df['setor'].dropna().unique())
+
+# --- Apenas as colunas usadas na página (divev_dif já vem calculada na carga)
+colunas_pagina = ['ano', 'setor', 'ticker', 'oc3', 'divev', 'mediana_divev', 'divev_dif'] + variaveis_desempenho
+
+indice = obter_indice(painel)
+setores_disponiveis = indice.valores('setor')
 
 # --- Filtros
 setores_selecionados = st.multiselect(
@@ -43,18 +53,17 @@ if not setores_filtrados:
     st.warning("Selecione pelo menos um setor.")
     st.stop()
 
-anos_disponiveis = sorted(df[df['setor'].isin(setores_filtrados)]['ano'].dropna().unique())
+anos_disponiveis = indice.valores('ano', setor=setores_filtrados)
 ano_selecionado = st.selectbox("Selecione o ano:", options=anos_disponiveis)
 
 # --- Filtrando os dados
-df_filtrado = df[
-    (df['setor'].isin(setores_filtrados)) &
-    (df['ano'] == ano_selecionado) &
-    (df['oc3'] == 1)
-]
+with etapa("filtros"):
+    selecao = indice.selecionar(painel, setor=setores_filtrados, ano=ano_selecionado, oc3=1)
+    df_filtrado = selecao.dados(colunas_pagina)
 
-# --- Contagem por setor
-contagem_por_setor = df_filtrado.groupby('setor').size().reset_index(name='quantidade').sort_values('quantidade', ascending=False)
+# --- Contagem por setor (em cache compartilhado entre os processos)
+with etapa("agregacao"):
+    contagem_por_setor = analises.contagem_oc3(painel, ano_selecionado, setores_filtrados)
 
 # --- Cards de Resumo
 st.subheader("Resumo dos Dados Selecionados")
@@ -73,44 +82,39 @@ if contagem_por_setor.empty:
 else:
     st.subheader(f"Distribuição das Empresas com OC3 = 1 no Ano {ano_selecionado}")
     
-    fig = px.bar(
-        contagem_por_setor,
-        x='quantidade',
-        y='setor',
-        orientation='h',
-        labels={'quantidade': 'Quantidade de Empresas', 'setor': 'Setor'},
-        text='quantidade',
-        template='plotly_white',
-        color_discrete_sequence=['#1f77b4']
-    )
-    fig.update_traces(textposition='outside')
-    fig.update_layout(
-        yaxis={'categoryorder': 'total ascending'},
-        margin=dict(l=150, r=40, t=50, b=40)
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    fig = grafico_contagem_oc3(contagem_por_setor)
+    with etapa("figura"):
+        st.plotly_chart(enviar(fig), use_container_width=True)
 
 st.divider()
 
-# --- Top 10 Empresas
-top_10_maior_conf = df_filtrado.sort_values('divev_dif', ascending=False).head(10)
-top_10_menor_conf = df_filtrado.sort_values('divev_dif', ascending=True).head(10)
+# --- Ranking das Empresas (índice pré-ordenado por ano e setor)
+ranking = obter_ranking(painel)
+
+col1, col2 = st.columns(2)
+coluna_ranking = col1.selectbox("Ordenar o ranking por:", ranking.colunas)
+n_ranking = col2.number_input("Número de empresas no ranking:", min_value=1, max_value=100, value=10)
+
+with etapa("ranking"):
+    filtros_ranking = dict(ano=ano_selecionado, setores=setores_filtrados)
+    maiores = analises.ranking_empresas(painel, coluna_ranking, n_ranking, **filtros_ranking)
+    menores = analises.ranking_empresas(painel, coluna_ranking, n_ranking, crescente=True, **filtros_ranking)
+
+if coluna_ranking == 'divev_dif':
+    titulos = ("Empresas com Maior Nível de Excesso de Confiança Gerencial",
+               "Empresas com Menor Nível de Excesso de Confiança Gerencial")
+else:
+    titulos = (f"Empresas com Maior {coluna_ranking.upper()}", f"Empresas com Menor {coluna_ranking.upper()}")
 
 col1, col2 = st.columns(2)
 
 with col1:
-    st.subheader("Empresas com Maior Nível de Excesso de Confiança Gerencial")
-    st.dataframe(
-        top_10_maior_conf[['ano', 'setor', 'ticker', 'divev_dif']].reset_index(drop=True),
-        use_container_width=True
-    )
+    st.subheader(titulos[0])
+    st.dataframe(enviar(maiores), use_container_width=True)
 
 with col2:
-    st.subheader("Empresas com Menor Nível de Excesso de Confiança Gerencial")
-    st.dataframe(
-        top_10_menor_conf[['ano', 'setor', 'ticker', 'divev_dif']].reset_index(drop=True),
-        use_container_width=True
-    )
+    st.subheader(titulos[1])
+    st.dataframe(enviar(menores), use_container_width=True)
 
 st.divider()
 
@@ -120,19 +124,19 @@ st.subheader("📋 Dados representados no gráfico")
 colunas_exibir = ['ano', 'setor', 'ticker', 'oc3'] + variaveis_desempenho
 df_exibir = df_filtrado[colunas_exibir].copy()
 
-st.dataframe(
-    df_exibir.reset_index(drop=True),
-    use_container_width=True
-)
-
-# --- Download dos Dados
-output = io.BytesIO()
-with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-    df_exibir.to_excel(writer, index=False, sheet_name='Empresas')
+with etapa("tabela"):
+    st.dataframe(
+        enviar(df_exibir.reset_index(drop=True)),
+        use_container_width=True
+    )
 
-st.download_button(
-    label="Baixar Dados em Excel",
-    data=output.getvalue(),
-    file_name="empresas_oc3_filtradas.xlsx",
-    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# --- Download dos Dados (gerado apenas ao clicar)
+botoes_download(
+    lambda: df_exibir,
+    chave=assinatura(painel.versao, 'oc3', setores_filtrados, ano_selecionado),
+    nome_arquivo="empresas_oc3_filtradas",
+    nome_planilha='Empresas',
+    rotulo="Baixar Dados em Excel"
 )
+
+finalizar()
@@ -0,0 +1,86 @@
+import streamlit as st
+
+from utils.cache import assinatura
+from utils.componentes import botoes_download, seletor_conjunto
+from utils.esquema import METRICAS_WINSORIZADAS, VARIAVEIS_OC
+from utils.instrumentacao import enviar, etapa, finalizar, iniciar
+from utils.modelos import CONTROLES, EFEITOS, comparar, empilhar, obter_modelo
+
+iniciar("modelos")
+
+# === Título e descrição ===
+st.title("Modelos de Painel: Excesso de Confiança e Desempenho")
+st.write(
+    "Regressões da variável de desempenho sobre a proxy de excesso de confiança e os controles, "
+    "com erros-padrão agrupados por empresa. Os efeitos de setor, empresa e ano são removidos "
+    "pela centragem das variáveis nas médias de cada grupo."
+)
+
+# === Leitura dos dados ===
+with etapa("carga"):
+    painel = seletor_conjunto()
+
+# === Especificação no Sidebar ===
+st.sidebar.header("🔎 Especificação do modelo")
+
+metrica = st.sidebar.selectbox(
+    "Variável dependente:",
+    [m for m in METRICAS_WINSORIZADAS if m in painel.colunas]
+)
+
+proxy = st.sidebar.selectbox(
+    "Proxy de excesso de confiança:",
+    [p for p in VARIAVEIS_OC if p in painel.colunas]
+)
+
+controles_disponiveis = [c for c in CONTROLES if c in painel.colunas]
+controles = st.sidebar.multiselect(
+    "Controles:",
+    controles_disponiveis,
+    default=controles_disponiveis
+)
+
+especificacoes = st.sidebar.multiselect(
+    "Especificações:",
+    list(EFEITOS),
+    default=list(EFEITOS),
+    format_func=lambda especificacao: EFEITOS[especificacao][0]
+)
+
+if not especificacoes:
+    st.warning("Selecione pelo menos uma especificação.")
+    st.stop()
+
+# === Estimação (em cache por especificação e versão dos dados) ===
+with etapa("modelos"):
+    resultados = {
+        especificacao: obter_modelo(painel, metrica, proxy, controles, especificacao)
+        for especificacao in especificacoes
+    }
+
+# === Comparação das especificações ===
+st.subheader(f"📐 Efeito de {proxy.upper()} sobre {metrica.upper()}")
+st.dataframe(enviar(comparar(resultados, proxy)), use_container_width=True, hide_index=True)
+
+# === Coeficientes de cada modelo ===
+st.subheader("📋 Coeficientes")
+abas = st.tabs([EFEITOS[especificacao][0] for especificacao in resultados])
+for aba, (coeficientes, resumo) in zip(abas, resultados.values()):
+    with aba:
+        st.dataframe(enviar(coeficientes), use_container_width=True, hide_index=True)
+        st.caption(
+            f"N = {resumo['n']} observações de {resumo['empresas']} empresas; "
+            f"R² = {resumo['r2']:.3f}; erros-padrão agrupados por empresa."
+        )
+
+# === Download dos coeficientes (gerado apenas ao clicar) ===
+botoes_download(
+    lambda: empilhar(resultados),
+    # Ordem da seleção preservada na chave: ela define a ordem das linhas do arquivo
+    chave=assinatura(painel.versao, 'modelos', metrica, proxy, '|'.join(controles), '|'.join(especificacoes)),
+    nome_arquivo="modelos_painel",
+    nome_planilha='Coeficientes',
+    rotulo="Baixar coeficientes em Excel"
+)
+
+finalizar()
@@ -0,0 +1,124 @@
+import streamlit as st
+
+from utils.cache import assinatura
+from utils.componentes import botoes_download, seletor_conjunto
+from utils.empresas import coluna_mediana, nivel_governanca, obter_indice_empresas
+from utils.esquema import VARIAVEIS_OC
+from utils.importacao import adiado
+from utils.instrumentacao import enviar, etapa, finalizar, iniciar
+
+go = adiado('plotly.graph_objects')
+
+iniciar("perfil")
+
+# === Título e descrição ===
+st.title("Perfil da Empresa")
+st.write(
+    "Acompanhe uma ou mais empresas ao longo dos anos: o histórico das proxies de excesso de "
+    "confiança gerencial, as métricas de desempenho comparadas à mediana do setor e o nível de "
+    "governança corporativa."
+)
+
+# === Leitura dos dados (índice por ticker, em ordem de ticker e ano) ===
+with etapa("carga"):
+    painel = seletor_conjunto()
+    indice_empresas = obter_indice_empresas(painel)
+
+# === Filtros no Sidebar ===
+st.sidebar.header("🔎 Empresas")
+
+tickers = indice_empresas.tickers
+empresas = st.sidebar.multiselect(
+    "Empresas (ticker):",
+    tickers,
+    default=tickers[:1],
+    max_selections=6
+)
+
+if not empresas:
+    st.warning("Selecione pelo menos uma empresa.")
+    st.stop()
+
+metrica = st.sidebar.selectbox("Variável de desempenho:", indice_empresas.metricas)
+
+# === Perfil das empresas: uma fatia contígua do índice por ticker ===
+with etapa("filtros"):
+    perfil = indice_empresas.empresas(empresas)
+    perfil = perfil.assign(nivel=nivel_governanca(perfil))
+
+# === Cards de resumo ===
+if len(empresas) == 1:
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Setor", str(perfil['setor'].iloc[-1]))
+    col2.metric("Anos no painel", f"{perfil['ano'].min()}–{perfil['ano'].max()}")
+    col3.metric("Governança (último ano)", perfil['nivel'].iloc[-1].upper())
+
+st.divider()
+
+# === Desempenho vs. mediana do setor ===
+st.subheader(f"📈 {metrica.upper()} e mediana do setor")
+
+fig = go.Figure()
+for ticker, dados in perfil.groupby('ticker', observed=True, sort=False):
+    fig.add_trace(go.Scatter(
+        x=dados['ano'],
+        y=dados[metrica],
+        name=ticker,
+        mode='lines+markers',
+        legendgroup=ticker
+    ))
+    fig.add_trace(go.Scatter(
+        x=dados['ano'],
+        y=dados[coluna_mediana(metrica)],
+        name=f"Mediana do setor ({ticker})",
+        mode='lines',
+        line=dict(dash='dash'),
+        legendgroup=ticker
+    ))
+fig.update_layout(
+    xaxis_title="Ano",
+    yaxis_title=metrica.upper(),
+    template="plotly_white",
+    hovermode="x unified"
+)
+with etapa("figura"):
+    st.plotly_chart(enviar(fig), use_container_width=True)
+
+# Todas as métricas, com a diferença para a mediana do setor
+with st.expander("Todas as métricas de desempenho vs. mediana do setor"):
+    comparacao = perfil[['ticker', 'ano']].copy()
+    for coluna in indice_empresas.metricas:
+        comparacao[coluna] = perfil[coluna]
+        comparacao[f"{coluna}_dif"] = perfil[coluna] - perfil[coluna_mediana(coluna)]
+    st.dataframe(enviar(comparacao), use_container_width=True, hide_index=True)
+
+# === Histórico das proxies (uma linha por empresa e proxy, uma coluna por ano) ===
+st.subheader("🧭 Histórico das proxies de excesso de confiança")
+proxies = [p for p in VARIAVEIS_OC if p in perfil.columns]
+with etapa("tabela"):
+    historico = (
+        perfil.melt(id_vars=['ticker', 'ano'], value_vars=proxies, var_name='proxy')
+        .pivot(index=['ticker', 'proxy'], columns='ano', values='value')
+        .reindex([(ticker, proxy) for ticker in empresas for proxy in proxies])
+        .astype('Int8')
+    )
+    historico.columns = historico.columns.astype(str)
+    st.dataframe(enviar(historico), use_container_width=True)
+st.caption("oc134 e oc234 somam as proxies que compõem cada índice.")
+
+# === Nível de governança corporativa em cada ano ===
+st.subheader("🏛️ Nível de governança corporativa")
+governanca = perfil.pivot(index='ticker', columns='ano', values='nivel').reindex(empresas)
+governanca.columns = governanca.columns.astype(str)
+st.dataframe(enviar(governanca), use_container_width=True)
+
+# === Download do perfil (gerado apenas ao clicar) ===
+botoes_download(
+    lambda: perfil,
+    # Ordem da seleção preservada na chave: ela define a ordem das linhas do arquivo
+    chave=assinatura(painel.versao, 'perfil', '|'.join(empresas)),
+    nome_arquivo="perfil_empresas",
+    nome_planilha='Perfil'
+)
+
+finalizar()
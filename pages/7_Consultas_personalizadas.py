@@ -0,0 +1,170 @@
+import streamlit as st
+
+from utils import consultas
+from utils.cache import assinatura, cache_resultados
+from utils.componentes import botoes_download, seletor_conjunto
+from utils.empresas import obter_indice_empresas
+from utils.esquema import METRICAS_WINSORIZADAS, NIVEIS_GOVERNANCA, VARIAVEIS_OC
+from utils.indice import obter_indice
+from utils.instrumentacao import enviar, etapa, finalizar, iniciar
+
+iniciar("consultas")
+
+# === Título e descrição ===
+st.title("Consultas Personalizadas")
+st.write(
+    "Combine filtros que as demais páginas não oferecem (faixas de valores, várias proxies de OC, "
+    "tickers específicos, níveis de governança e setores) e veja as linhas ou agregações resultantes. "
+    "As consultas leem apenas as colunas usadas, em lotes, sem montar o painel inteiro."
+)
+
+# === Leitura dos dados ===
+with etapa("carga"):
+    painel = seletor_conjunto()
+    indice = obter_indice(painel)
+
+continuas = consultas.colunas_continuas(painel.esquema)
+categoricas = [c for c in ['ano', 'setor', 'ticker'] + VARIAVEIS_OC + NIVEIS_GOVERNANCA if c in painel.colunas]
+
+# === Filtros no Sidebar ===
+st.sidebar.header("🔎 Filtros da consulta")
+
+setores = st.sidebar.multiselect("Setores:", indice.valores('setor'))
+tickers = st.sidebar.multiselect("Tickers:", obter_indice_empresas(painel).tickers)
+
+anos_disponiveis = indice.valores('ano')
+anos = st.sidebar.select_slider(
+    "Anos:",
+    options=anos_disponiveis,
+    value=(anos_disponiveis[0], anos_disponiveis[-1])
+)
+
+ocs = st.sidebar.multiselect("Proxies de OC iguais a 1:", [oc for oc in VARIAVEIS_OC if oc in painel.colunas])
+todas_ocs = st.sidebar.radio(
+    "Combinação das proxies:",
+    [True, False],
+    format_func={True: "Todas", False: "Ao menos uma"}.get,
+    horizontal=True
+)
+
+niveis = st.sidebar.multiselect(
+    "Níveis de governança (qualquer um):",
+    [nivel for nivel in NIVEIS_GOVERNANCA if nivel in painel.colunas]
+)
+
+colunas_faixa = st.sidebar.multiselect(
+    "Faixas de valores:",
+    continuas,
+    default=[c for c in ['lnat'] if c in continuas]
+)
+limites = cache_resultados.obter(
+    assinatura('limites', painel.versao, colunas_faixa),
+    lambda: consultas.limites(painel, colunas_faixa)
+)
+faixas = {}
+for coluna in colunas_faixa:
+    minimo, maximo = limites[coluna]
+    if minimo is None or minimo == maximo:
+        continue
+    faixas[coluna] = st.sidebar.slider(coluna, float(minimo), float(maximo), (float(minimo), float(maximo)))
+# Faixas no intervalo inteiro não filtram nada (e manteriam as linhas sem valor de fora)
+faixas = {c: f for c, f in faixas.items() if f != (float(limites[c][0]), float(limites[c][1]))}
+
+# === Condição em SQL restrito ===
+condicao = st.text_area(
+    "Condição adicional (SQL, apenas a cláusula WHERE):",
+    placeholder="lnat > 20 AND (oc1 = 1 OR oc3 = 1) AND setor IN ('Energia Elétrica', 'Química')",
+    help=(
+        "Aceita comparações (=, <>, <, <=, >, >=), IN, BETWEEN, IS [NOT] NULL, AND, OR, NOT e "
+        "parênteses sobre as colunas do painel. Textos entre aspas simples; colunas com nomes "
+        "numéricos entre aspas duplas (ex.: \"2015\" = 1)."
+    )
+)
+
+filtros = dict(
+    setores=setores,
+    tickers=tickers,
+    anos=None if anos == (anos_disponiveis[0], anos_disponiveis[-1]) else anos,
+    ocs=ocs,
+    todas_ocs=todas_ocs,
+    niveis=niveis,
+    faixas=faixas
+)
+try:
+    filtro = consultas.combinar(
+        consultas.compilar_filtros(**filtros),
+        consultas.traduzir_condicao(condicao, painel.esquema)
+    )
+except ValueError as erro:
+    st.error(str(erro))
+    st.stop()
+
+chave_filtro = consultas.chave_consulta(painel.versao, condicao, **filtros)
+
+with etapa("filtros"):
+    total = consultas.contar_linhas(painel, filtro)
+
+col1, col2 = st.columns(2)
+col1.metric("Linhas selecionadas", f"{total}")
+col2.metric("Linhas do painel", f"{indice.n_linhas}")
+
+st.divider()
+
+modo = st.radio("Resultado:", ["Linhas", "Agregação"], horizontal=True)
+
+if modo == "Linhas":
+    # === Linhas: apenas as colunas escolhidas, lidas em lotes até o limite ===
+    colunas = st.multiselect(
+        "Colunas:",
+        painel.colunas,
+        default=['ticker', 'ano', 'setor'] + ocs + niveis + list(faixas)
+    )
+    limite = st.number_input("Máximo de linhas exibidas:", min_value=10, max_value=100_000, value=consultas.LIMITE_LINHAS)
+    if not colunas:
+        st.warning("Selecione pelo menos uma coluna.")
+        st.stop()
+
+    with etapa("tabela"):
+        linhas = consultas.primeiras_linhas(painel, colunas, filtro, limite)
+        st.dataframe(enviar(linhas), use_container_width=True, hide_index=True)
+    if total > limite:
+        st.caption(f"Exibindo as primeiras {limite} de {total} linhas; o download traz todas.")
+
+    botoes_download(
+        lambda: consultas.todas_linhas(painel, colunas, filtro),
+        chave=chave_filtro + ('linhas', '|'.join(colunas)),
+        nome_arquivo="consulta_linhas",
+        nome_planilha='Consulta'
+    )
+else:
+    # === Agregação no motor colunar, por grupos ===
+    col1, col2, col3 = st.columns(3)
+    grupos = col1.multiselect("Agrupar por:", categoricas, default=['ano'])
+    metricas = col2.multiselect(
+        "Métricas:",
+        continuas,
+        default=[m for m in METRICAS_WINSORIZADAS[:2] if m in continuas]
+    )
+    funcoes = col3.multiselect("Funções:", list(consultas.AGREGACOES), default=['media', 'contagem'])
+    if not metricas or not funcoes:
+        st.warning("Selecione pelo menos uma métrica e uma função.")
+        st.stop()
+
+    # Ordem das escolhas preservada na chave: ela define a ordem das colunas
+    chave_agregacao = chave_filtro + ('agregacao', '|'.join(grupos), '|'.join(metricas), '|'.join(funcoes))
+    with etapa("agregacao"):
+        agregado = cache_resultados.obter(
+            chave_agregacao,
+            lambda: consultas.agregar(painel, grupos, metricas, funcoes, filtro)
+        )
+    with etapa("tabela"):
+        st.dataframe(enviar(agregado), use_container_width=True, hide_index=True)
+
+    botoes_download(
+        lambda: agregado,
+        chave=chave_agregacao,
+        nome_arquivo="consulta_agregada",
+        nome_planilha='Agregacao'
+    )
+
+finalizar()
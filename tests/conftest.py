@@ -0,0 +1,17 @@
+"""Configuração comum dos testes."""
+import os
+
+# Antes de importar ``utils``: sem cache compartilhado em disco entre os
+# processos e sem o aquecimento em segundo plano
+os.environ['CACHE_COMPARTILHADO'] = ''
+os.environ['AQUECIMENTO'] = '0'
+
+import pytest  # noqa: E402
+
+from utils.dados import carregar_painel  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def painel():
+    """Painel de ``dados.xlsx`` (o arquivo colunar é construído na primeira vez)."""
+    return carregar_painel()
@@ -0,0 +1,113 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pytest
+
+from utils.cubo import construir_cubo, obter_cubo
+from utils.dados import Painel
+from utils.esquema import DUMMIES_ANO, DUMMIES_SETOR, aplicar_esquema
+from utils.governanca import obter_serie
+from utils.ingestao import ler_linhas, preparar_linhas
+from utils.proxies import COLUNAS_DERIVADAS, calcular_proxies
+from utils.regressao import obter_regressao
+
+
+@pytest.fixture(scope="module")
+def paineis(painel):
+    """Painel completo e o mesmo painel montado com o último ano anexado."""
+    tabela = painel.dataset().to_table()
+    ultimo = pc.max(tabela['ano']).as_py()
+    antigos = tabela.filter(pc.field('ano') < ultimo)
+    novos = tabela.filter(pc.field('ano') == ultimo)
+
+    # Mesma ordem das linhas do painel anexado: os anos novos no fim
+    completo = Painel(painel.caminho, None, ['completo'], pa.concat_tables([antigos, novos]))
+    base = Painel(painel.caminho, None, ['base'], antigos)
+    # Os artefatos precisam existir antes do anexo para serem atualizados
+    obter_cubo(base)
+    obter_serie(base, ['oc1', 'oc3'], 'n1')
+    obter_regressao(base, 'creat', 'residuo')
+    return completo, base.anexar(None, ['base', 'anexo'], novos)
+
+
+def _ordenar(df, colunas):
+    df = df.assign(**{c: df[c].astype(str) for c in colunas if c == 'setor'})
+    return df.sort_values(colunas, kind='stable', ignore_index=True)
+
+
+def test_cubo_anexado_igual_ao_reconstruido(paineis):
+    completo, anexado = paineis
+    esperado = construir_cubo(completo.dados())
+    obtido = obter_cubo(anexado)
+    assert obtido.keys() == esperado.keys()
+    for chave in esperado:
+        pd.testing.assert_frame_equal(
+            _ordenar(obtido[chave], ['ano', 'setor', 'grupo']),
+            _ordenar(esperado[chave], ['ano', 'setor', 'grupo']),
+            check_dtype=False, check_categorical=False,
+        )
+
+
+def test_serie_anexada_igual_a_reconstruida(paineis):
+    completo, anexado = paineis
+    for nivel in ['n1', 'n2', 'nm']:
+        pd.testing.assert_frame_equal(
+            obter_serie(anexado, ['oc1', 'oc3'], nivel),
+            obter_serie(completo, ['oc1', 'oc3'], nivel),
+            check_dtype=False,
+        )
+
+
+def test_regressao_anexada_igual_a_reconstruida(paineis):
+    completo, anexado = paineis
+    coeficientes, residuos = obter_regressao(anexado, 'creat', 'residuo')
+    esperados, residuos_esperados = obter_regressao(completo, 'creat', 'residuo')
+    pd.testing.assert_frame_equal(
+        _ordenar(coeficientes, ['setor', 'ano']), _ordenar(esperados, ['setor', 'ano']),
+        check_dtype=False, check_categorical=False,
+    )
+    pd.testing.assert_series_equal(pd.Series(residuos), pd.Series(residuos_esperados))
+
+
+def test_ingestao_de_csv_igual_a_reconstrucao(painel, tmp_path):
+    tabela = painel.dataset().to_table()
+    ultimo = pc.max(tabela['ano']).as_py()
+    antigos = tabela.filter(pc.field('ano') < ultimo)
+    base = Painel(painel.caminho, None, ['base'], antigos)
+    obter_cubo(base)
+
+    # Linhas brutas do último ano, sem defasagens, proxies nem dummies
+    derivadas = COLUNAS_DERIVADAS + ['divev_dif'] + DUMMIES_ANO + DUMMIES_SETOR
+    brutas = tabela.filter(pc.field('ano') == ultimo).to_pandas().drop(columns=derivadas, errors='ignore')
+    arquivo = tmp_path / f"novos_{ultimo}.csv"
+    brutas.to_csv(arquivo, index=False)
+    obtido = preparar_linhas(ler_linhas(str(arquivo)), base)
+
+    # Reconstrução completa: proxies recalculadas sobre todos os anos, como
+    # na conversão da planilha com DADOS_RECALCULAR_PROXIES=1
+    completo = tabela.to_pandas()
+    reconstruido = calcular_proxies(completo.drop(columns=COLUNAS_DERIVADAS))
+    reconstruido['divev_dif'] = reconstruido['divev'] - reconstruido['mediana_divev']
+    reconstruido = aplicar_esquema(reconstruido.reindex(columns=painel.colunas))
+    esperado = reconstruido[reconstruido['ano'] == ultimo].reset_index(drop=True)
+    # As dummies de setor e de ano vêm da planilha
+    assert esperado[DUMMIES_SETOR + DUMMIES_ANO].equals(
+        completo.loc[completo['ano'] == ultimo, DUMMIES_SETOR + DUMMIES_ANO].reset_index(drop=True)
+    )
+    pd.testing.assert_frame_equal(
+        obtido.reset_index(drop=True), esperado,
+        check_categorical=False, check_exact=False, rtol=1e-12,
+    )
+
+    # Anexada com o esquema do painel, como em ``anexar_anos``
+    anexado = base.anexar(None, ['base', 'anexo'], pa.Table.from_pandas(obtido, schema=base.esquema, preserve_index=False))
+    assert anexado.esquema == painel.esquema
+    esperado_cubo = construir_cubo(
+        pd.concat([antigos.to_pandas(), esperado], ignore_index=True)
+    )
+    for chave, celulas in obter_cubo(anexado).items():
+        pd.testing.assert_frame_equal(
+            _ordenar(celulas, ['ano', 'setor', 'grupo']),
+            _ordenar(esperado_cubo[chave], ['ano', 'setor', 'grupo']),
+            check_dtype=False, check_categorical=False,
+        )
@@ -0,0 +1,99 @@
+import json
+import threading
+from http.client import HTTPConnection
+
+import pytest
+
+from utils import analises
+from utils.api import servidor
+
+
+@pytest.fixture(scope="module")
+def api(painel):
+    """Servidor da API em uma porta livre, atendendo em segundo plano."""
+    api = servidor(porta=0)
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+    yield api
+    api.shutdown()
+    api.server_close()
+
+
+def _get(api, caminho, cabecalhos=None):
+    conexao = HTTPConnection(*api.server_address, timeout=60)
+    try:
+        conexao.request('GET', caminho, headers=cabecalhos or {})
+        resposta = conexao.getresponse()
+        corpo = resposta.read()
+        return resposta.status, dict(resposta.getheaders()), corpo
+    finally:
+        conexao.close()
+
+
+def test_indice_e_versao(api, painel):
+    status, _, corpo = _get(api, '/')
+    assert status == 200
+    assert set(json.loads(corpo)['analises']) == set(analises.ANALISES)
+
+    status, _, corpo = _get(api, '/versao')
+    assert (status, json.loads(corpo)) == (200, {'versao': painel.versao})
+
+
+def test_resposta_e_revalidacao(api):
+    caminho = '/ranking_empresas?n=3&ano=2020'
+    status, cabecalhos, corpo = _get(api, caminho)
+    assert status == 200
+    assert len(json.loads(corpo)) == 3
+    marca = cabecalhos['ETag']
+
+    status, cabecalhos, corpo = _get(api, caminho, {'If-None-Match': marca})
+    assert (status, corpo, cabecalhos['ETag']) == (304, b'', marca)
+
+    # A ordem dos parâmetros não muda o ETag
+    status, _, _ = _get(api, '/ranking_empresas?ano=2020&n=3', {'If-None-Match': f'"outro", {marca}'})
+    assert status == 304
+
+    status, _, _ = _get(api, '/ranking_empresas?n=4&ano=2020', {'If-None-Match': marca})
+    assert status == 200
+
+
+@pytest.mark.parametrize("caminho, mensagem", [
+    ('/ranking_empresas?n=-1', "ao menos 1"),
+    ('/ranking_empresas?n=0', "ao menos 1"),
+    ('/ranking_empresas?n=dez', "Valor inválido para 'n'"),
+    ('/ranking_empresas?coluna=lnat', "Valor inválido para 'coluna'"),
+    ('/desempenho?proxy=oc9', "Valor inválido para 'proxy'"),
+    ('/desempenho?limite=1', "Parâmetro desconhecido"),
+    ('/versao?conjunto=inexistente', "Conjunto desconhecido"),
+    ('/investimento', "obrigatórios ausentes para 'investimento': setor, ano"),
+    ('/investimento?ano=2020', "obrigatórios ausentes para 'investimento': setor."),
+    ('/contagem_oc3', "obrigatórios ausentes para 'contagem_oc3': ano."),
+])
+def test_pedidos_invalidos(api, caminho, mensagem):
+    status, cabecalhos, corpo = _get(api, caminho)
+    assert status == 400
+    assert cabecalhos['Content-Type'].startswith('application/json')
+    assert mensagem in json.loads(corpo)['erro']
+
+
+def test_pedido_invalido_nunca_recebe_304(api):
+    _, cabecalhos, _ = _get(api, '/ranking_empresas?n=3')
+    status, _, _ = _get(api, '/ranking_empresas?n=3&crescente=talvez', {'If-None-Match': cabecalhos['ETag']})
+    assert status == 400
+
+
+def test_rota_desconhecida(api):
+    status, _, corpo = _get(api, '/inexistente')
+    assert status == 404
+    assert 'erro' in json.loads(corpo)
+
+
+def test_erro_inesperado(api, monkeypatch):
+    def falhar(painel, **parametros):
+        raise RuntimeError("falha da análise")
+
+    _, conversores = analises.ANALISES['desempenho']
+    monkeypatch.setitem(analises.ANALISES, 'desempenho', (falhar, conversores))
+    status, cabecalhos, corpo = _get(api, '/desempenho?anos=1999')
+    assert status == 500
+    assert cabecalhos['Content-Type'].startswith('application/json')
+    assert 'falha da análise' not in json.loads(corpo)['erro']
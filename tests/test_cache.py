@@ -0,0 +1,116 @@
+import logging
+import multiprocessing
+
+import pytest
+
+from utils import cache
+from utils.cache import CacheCompartilhado, CacheLRU
+
+VALOR = b'x' * 1000
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    """Relógio controlado do módulo ``utils.cache`` (segundos em ``relogio[0]``)."""
+    agora = [1_000_000.0]
+    monkeypatch.setattr(cache.time, 'time', lambda: agora[0])
+    return agora
+
+
+def _armazenamento(pasta, max_bytes=10 * 1024 * 1024, validade=3600):
+    return CacheCompartilhado(str(pasta / 'resultados.sqlite'), max_bytes=max_bytes, validade=validade)
+
+
+def test_acerto_e_falha(tmp_path):
+    armazenamento = _armazenamento(tmp_path)
+    assert armazenamento.ler('testes', ('a', 1)) == (False, None)
+    armazenamento.gravar('testes', ('a', 1), {'valor': [1, 2]})
+    assert armazenamento.ler('testes', ('a', 1)) == (True, {'valor': [1, 2]})
+    # O nome do cache faz parte da chave
+    assert armazenamento.ler('outro', ('a', 1)) == (False, None)
+    # Outra conexão (outro processo ou reinício) lê o mesmo arquivo
+    assert _armazenamento(tmp_path).ler('testes', ('a', 1)) == (True, {'valor': [1, 2]})
+
+
+def test_validade(tmp_path, relogio):
+    armazenamento = _armazenamento(tmp_path, validade=100)
+    armazenamento.gravar('testes', 'antigo', 1)
+    relogio[0] += 99
+    assert armazenamento.ler('testes', 'antigo') == (True, 1)
+    relogio[0] += 2
+    assert armazenamento.ler('testes', 'antigo') == (False, None)
+    # A próxima gravação remove os itens vencidos
+    armazenamento.gravar('testes', 'novo', 2)
+    assert armazenamento.estatisticas()['itens'] == 1
+
+
+def test_descarte_dos_menos_acessados(tmp_path, relogio):
+    armazenamento = _armazenamento(tmp_path, max_bytes=2500)
+    armazenamento.gravar('testes', 'a', VALOR)
+    relogio[0] += 1
+    armazenamento.gravar('testes', 'b', VALOR)
+    # Acesso a 'a' depois do intervalo mínimo: 'b' passa a ser o menos recente
+    relogio[0] += cache.INTERVALO_ACESSO + 1
+    assert armazenamento.ler('testes', 'a')[0]
+    relogio[0] += 1
+    armazenamento.gravar('testes', 'c', VALOR)
+
+    assert armazenamento.ler('testes', 'b') == (False, None)
+    assert armazenamento.ler('testes', 'a')[0] and armazenamento.ler('testes', 'c')[0]
+    assert armazenamento.estatisticas()['bytes'] <= 2500
+
+
+def test_valor_maior_que_o_limite(tmp_path):
+    armazenamento = _armazenamento(tmp_path, max_bytes=500)
+    armazenamento.gravar('testes', 'grande', VALOR)
+    assert armazenamento.ler('testes', 'grande') == (False, None)
+
+
+def test_cache_lru_usa_o_armazenamento(tmp_path, monkeypatch):
+    armazenamento = _armazenamento(tmp_path)
+    monkeypatch.setattr(cache, 'cache_compartilhado', lambda: armazenamento)
+    chamadas = []
+
+    def construir():
+        chamadas.append(1)
+        return 42
+
+    primeiro = CacheLRU(nome="testes", compartilhado=True)
+    assert primeiro.obter('chave', construir) == 42
+    assert primeiro.obter('chave', construir) == 42
+    # Outra réplica do aplicativo: lê do armazenamento, sem construir
+    segundo = CacheLRU(nome="testes", compartilhado=True)
+    assert segundo.obter('chave', construir) == 42
+    assert len(chamadas) == 1
+    assert (primeiro.falhas, primeiro.acertos) == (1, 1)
+    assert (segundo.falhas, segundo.acertos_compartilhados) == (0, 1)
+
+
+def _gravar_em_outro_processo(argumentos):
+    """Grava a chave comum e chaves próprias; retorna os avisos de erro do SQLite."""
+    caminho, processo, vezes = argumentos
+    avisos = []
+    manipulador = logging.Handler(logging.WARNING)
+    manipulador.emit = avisos.append
+    logging.getLogger("overconfidence.cache").addHandler(manipulador)
+
+    armazenamento = CacheCompartilhado(caminho, max_bytes=10 * 1024 * 1024, validade=3600)
+    for i in range(vezes):
+        armazenamento.gravar('testes', 'comum', (processo, i))
+        armazenamento.gravar('testes', ('proprio', processo, i), i)
+        if not armazenamento.ler('testes', ('proprio', processo, i))[0]:
+            avisos.append(f"leitura {i}")
+    return len(avisos)
+
+
+def test_dois_processos_gravando_a_mesma_chave(tmp_path):
+    caminho = str(tmp_path / 'resultados.sqlite')
+    vezes = 200
+    with multiprocessing.get_context('spawn').Pool(2) as pool:
+        avisos = pool.map(_gravar_em_outro_processo, [(caminho, p, vezes) for p in range(2)])
+    assert avisos == [0, 0]
+
+    armazenamento = CacheCompartilhado(caminho, max_bytes=10 * 1024 * 1024, validade=3600)
+    encontrado, (processo, i) = armazenamento.ler('testes', 'comum')
+    assert encontrado and processo in (0, 1) and i == vezes - 1
+    assert armazenamento.estatisticas()['itens'] == 2 * vezes + 1
@@ -0,0 +1,112 @@
+import re
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pytest
+
+from utils.consultas import MAX_CARACTERES, MAX_PROFUNDIDADE, chave_consulta, compilar_filtros, traduzir_condicao
+
+ESQUEMA = pa.schema([
+    ('ano', pa.int16()),
+    ('oc1', pa.int8()),
+    ('lnat', pa.float64()),
+    ('setor', pa.dictionary(pa.int8(), pa.large_string())),
+    ('minha coluna', pa.float64()),
+])
+
+TABELA = pa.table({
+    'ano': pa.array([2015, 2016, 2017, 2018], pa.int16()),
+    'oc1': pa.array([1, 0, 1, None], pa.int8()),
+    'lnat': [14.0, 20.5, 22.0, 18.0],
+    'setor': pa.array(["Química", "Energia", "O'Brien", "Química"]).dictionary_encode(),
+    'minha coluna': [1.0, -2.0, 3.0, 4.0],
+}).cast(ESQUEMA)
+
+
+def _anos(condicao):
+    expressao = traduzir_condicao(condicao, ESQUEMA)
+    return TABELA.filter(expressao).column('ano').to_pylist()
+
+
+@pytest.mark.parametrize("condicao, esperado", [
+    ("lnat > 20", [2016, 2017]),
+    ("lnat >= 20.5 AND oc1 = 1", [2017]),
+    ("oc1 = 1 OR ano = 2016", [2015, 2016, 2017]),
+    ("NOT (oc1 = 1)", [2016]),
+    ("oc1 <> 1", [2016]),
+    ("oc1 != 1", [2016]),
+    ("ano BETWEEN 2016 AND 2017", [2016, 2017]),
+    ("ano NOT BETWEEN 2016 AND 2017", [2015, 2018]),
+    ("setor IN ('Química', 'Energia')", [2015, 2016, 2018]),
+    ("setor NOT IN ('Química')", [2016, 2017]),
+    ("setor = 'O''Brien'", [2017]),
+    ("oc1 IS NULL", [2018]),
+    ("oc1 IS NOT NULL", [2015, 2016, 2017]),
+    ('"minha coluna" < -1', [2016]),
+    ("20 < lnat", [2016, 2017]),
+    ("oc1 = TRUE", [2015, 2017]),
+    ("lnat > 1e1 and ano < 2016", [2015]),
+])
+def test_condicoes_validas(condicao, esperado):
+    assert _anos(condicao) == esperado
+
+
+@pytest.mark.parametrize("condicao", ["", "   ", None])
+def test_condicao_vazia(condicao):
+    assert traduzir_condicao(condicao, ESQUEMA) is None
+
+
+@pytest.mark.parametrize("condicao, mensagem", [
+    ("lnat > 20; DROP TABLE painel", "Caractere inválido na condição, posição 10"),
+    ("receita > 1", "coluna desconhecida 'receita'"),
+    ("setor = 1", "valor incompatível com a coluna 'setor'"),
+    ("lnat > 'alto'", "valor incompatível com a coluna 'lnat'"),
+    ("setor IN ('Química', 2)", "valor incompatível com a coluna 'setor'"),
+    ("(lnat > 20", "Condição incompleta: esperado ')'"),
+    ("lnat > 20)", "esperado o fim da condição"),
+    ("lnat 20", "esperado um operador de comparação"),
+    ("lnat >", "Condição incompleta"),
+    ("oc1 NOT = 1", "esperado IN ou BETWEEN após NOT"),
+    ("ano BETWEEN 2016 OR 2017", "esperado AND"),
+    ("1 IS NULL", "esperada uma coluna"),
+    ("lnat > -'a'", "esperado um número ou um texto entre aspas simples"),
+])
+def test_condicoes_invalidas(condicao, mensagem):
+    with pytest.raises(ValueError, match=re.escape(mensagem)):
+        traduzir_condicao(condicao, ESQUEMA)
+
+
+def test_posicao_do_erro():
+    with pytest.raises(ValueError, match=r"posição 9 \('receita'\)"):
+        traduzir_condicao("ano = 1 receita", ESQUEMA)
+
+
+def test_limites_de_tamanho():
+    with pytest.raises(ValueError, match=f"no máximo {MAX_CARACTERES} caracteres"):
+        traduzir_condicao("lnat > 1 AND " * MAX_CARACTERES + "lnat > 1", ESQUEMA)
+
+    aninhada = "(" * (MAX_PROFUNDIDADE + 1) + "lnat > 1" + ")" * (MAX_PROFUNDIDADE + 1)
+    with pytest.raises(ValueError, match="parênteses aninhados demais"):
+        traduzir_condicao(aninhada, ESQUEMA)
+
+    permitida = "(" * MAX_PROFUNDIDADE + "lnat > 1" + ")" * MAX_PROFUNDIDADE
+    assert isinstance(traduzir_condicao(permitida, ESQUEMA), pc.Expression)
+
+
+def test_chave_de_muitos_tickers():
+    tickers = [f"TCK{i:02d}" for i in range(30)]
+    # Difere só no meio da lista, que o texto da expressão abrevia
+    primeira, segunda = tickers[:25], tickers[:12] + ['OUTRO'] + tickers[13:25]
+    assert str(compilar_filtros(tickers=primeira)) == str(compilar_filtros(tickers=segunda))
+    assert chave_consulta('v1', tickers=primeira) != chave_consulta('v1', tickers=segunda)
+    assert chave_consulta('v1', tickers=primeira) == chave_consulta('v1', tickers=primeira[::-1])
+
+
+def test_chave_da_condicao_e_faixas():
+    longa = "ticker IN (" + ", ".join(f"'TCK{i:02d}'" for i in range(25)) + ")"
+    outra = longa.replace("'TCK12'", "'TCK99'")
+    assert chave_consulta('v1', longa) != chave_consulta('v1', outra)
+    assert chave_consulta('v1', faixas={'lnat': (1.0, 2.0)}) != chave_consulta('v1', faixas={'lnat': (1.0, 3.0)})
+    assert chave_consulta('v1', anos=(2015, 2020)) != chave_consulta('v1')
+    assert chave_consulta('v1', ocs=['oc1', 'oc3']) != chave_consulta('v1', ocs=['oc1', 'oc3'], todas_ocs=False)
+    assert chave_consulta('v1') != chave_consulta('v2')
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from utils.cubo import obter_cubo
+from utils import estatisticas
+from utils.estatisticas import TOTAL, iniciar_bootstrap, p_valor_t, welch
+
+
+@pytest.mark.parametrize("t, gl, esperado", [
+    # Valores críticos bilaterais das tabelas da distribuição t
+    (12.706, 1, 0.05),
+    (4.303, 2, 0.05),
+    (2.228, 10, 0.05),
+    (3.169, 10, 0.01),
+    (2.042, 30, 0.05),
+    (1.960, 1e6, 0.05),
+    (2.576, 1e6, 0.01),
+    (3.291, 1e6, 0.001),
+])
+def test_p_valor_tabelado(t, gl, esperado):
+    assert p_valor_t(t, gl) == pytest.approx(esperado, rel=2e-3)
+    assert p_valor_t(-t, gl) == pytest.approx(esperado, rel=2e-3)
+
+
+def test_p_valor_formas_fechadas():
+    t = np.linspace(-40, 40, 161)
+    # gl = 1 (Cauchy) e gl = 2 têm p-valor em forma fechada
+    np.testing.assert_allclose(p_valor_t(t, 1), 1 - 2 / np.pi * np.arctan(np.abs(t)), rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(p_valor_t(t, 2), 1 - np.abs(t) / np.sqrt(2 + t * t), rtol=1e-9, atol=1e-12)
+
+
+def test_p_valor_casos_limite():
+    assert p_valor_t(0.0, 5) == pytest.approx(1.0)
+    assert p_valor_t(np.inf, 5) == 0.0
+    assert np.isnan(p_valor_t(np.nan, 5))
+    assert np.isnan(p_valor_t(1.0, np.nan))
+
+
+def test_welch_igual_a_formula():
+    gerador = np.random.default_rng(0)
+    grupo0 = gerador.normal(0.0, 1.0, 40)
+    grupo1 = gerador.normal(0.5, 2.0, 25)
+
+    resultado = welch(
+        [len(grupo0)], [grupo0.sum()], [(grupo0 ** 2).sum()],
+        [len(grupo1)], [grupo1.sum()], [(grupo1 ** 2).sum()],
+    ).iloc[0]
+
+    v0, v1 = grupo0.var(ddof=1) / len(grupo0), grupo1.var(ddof=1) / len(grupo1)
+    t = (grupo1.mean() - grupo0.mean()) / np.sqrt(v0 + v1)
+    gl = (v0 + v1) ** 2 / (v0 ** 2 / (len(grupo0) - 1) + v1 ** 2 / (len(grupo1) - 1))
+    assert resultado['diferenca'] == pytest.approx(grupo1.mean() - grupo0.mean())
+    assert resultado['erro_padrao'] == pytest.approx(np.sqrt(v0 + v1))
+    assert resultado['t'] == pytest.approx(t)
+    assert resultado['gl'] == pytest.approx(gl)
+    assert resultado['p_valor'] == pytest.approx(float(p_valor_t(t, gl)))
+
+
+def test_welch_grupo_pequeno():
+    # Um grupo com uma única observação não tem variância: sem teste
+    resultado = welch([1], [2.0], [4.0], [3], [6.0], [14.0]).iloc[0]
+    assert np.isnan(resultado['t']) and np.isnan(resultado['p_valor'])
+
+
+def test_testes_welch_igual_as_linhas(painel):
+    df = painel.dados(['ano', 'oc3', 'wroa'])
+    tabela = estatisticas.testes_welch(obter_cubo(painel), proxies=['oc3'], metricas=['wroa']).set_index('periodo')
+    for periodo, linhas in [(TOTAL, df), ('2020', df[df['ano'] == 2020])]:
+        valores = linhas['wroa'].astype('float64')
+        grupo0 = valores[linhas['oc3'] == 0].dropna()
+        grupo1 = valores[linhas['oc3'] > 0].dropna()
+        linha = tabela.loc[periodo]
+        assert (linha['n0'], linha['n1']) == (len(grupo0), len(grupo1))
+        assert linha['diferenca'] == pytest.approx(grupo1.mean() - grupo0.mean())
+        v0, v1 = grupo0.var() / len(grupo0), grupo1.var() / len(grupo1)
+        assert linha['t'] == pytest.approx((grupo1.mean() - grupo0.mean()) / np.sqrt(v0 + v1))
+
+
+def test_bootstrap_reproduzivel(painel):
+    df = painel.dados(['ticker', 'ano', 'oc3', 'wroa'])
+    primeiro = iniciar_bootstrap(df, proxies=['oc3'], metricas=['wroa'], quantidade=200).resultado()
+    # Outro bootstrap cancela os blocos ainda na fila do primeiro
+    segundo = iniciar_bootstrap(df, proxies=['oc3'], metricas=['wroa'], quantidade=200)
+    iniciar_bootstrap(df, proxies=['oc3'], metricas=['wroa'], quantidade=50)
+    assert segundo.resultado().equals(primeiro)
+    total = primeiro.set_index('periodo').loc[TOTAL]
+    assert total['ic_inferior'] < total['ic_superior']
@@ -0,0 +1,39 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import exportacao
+
+DF = pd.DataFrame({
+    'ticker': pd.Categorical(['AAAA3', 'BBBB4', 'CCCC3']),
+    'ano': np.array([2020, 2021, 2022], dtype='int16'),
+    'capexatl1': [0.5, np.inf, -np.inf],
+    'wroa': np.array([np.nan, 1.5, 2.5], dtype='float32'),
+})
+
+
+def test_excel_com_ausentes_e_infinitos(monkeypatch):
+    # Mais de um bloco, para cobrir a gravação em partes
+    monkeypatch.setattr(exportacao, 'TAMANHO_BLOCO', 2)
+    conteudo = exportacao.exportar(DF, 'xlsx', 'Dados')
+    lido = pd.read_excel(io.BytesIO(conteudo), sheet_name='Dados')
+    esperado = io.BytesIO()
+    DF.to_excel(esperado, sheet_name='Dados', index=False)
+    pd.testing.assert_frame_equal(lido, pd.read_excel(esperado, sheet_name='Dados'))
+    assert lido['capexatl1'].tolist() == [0.5, np.inf, -np.inf]
+    assert np.isnan(lido.loc[0, 'wroa'])
+
+
+@pytest.mark.parametrize("formato", ['csv', 'parquet'])
+def test_outros_formatos(formato):
+    conteudo = exportacao.exportar(DF, formato)
+    lido = pd.read_csv(io.BytesIO(conteudo)) if formato == 'csv' else pd.read_parquet(io.BytesIO(conteudo))
+    np.testing.assert_array_equal(lido['capexatl1'], DF['capexatl1'])
+    assert len(lido) == len(DF)
+
+
+def test_formato_desconhecido():
+    with pytest.raises(ValueError, match="desconhecido"):
+        exportacao.exportar(DF, 'ods')
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.analises import ranking_empresas
+from utils.ranking import IndiceRanking
+
+DF = pd.DataFrame({
+    'ano': [2020, 2020, 2020, 2020, 2021, 2021, 2021, 2021],
+    'setor': ['A', 'A', 'B', 'B', 'A', 'A', 'B', 'B'],
+    'divev_dif': [5.0, np.nan, 3.0, 8.0, 1.0, 7.0, 2.0, 5.0],
+})
+
+
+def _referencia(df, coluna, n, anos=None, setores=None, linhas=None, crescente=False):
+    """Ranking pela ordenação completa da seleção, para comparar com o índice."""
+    mascara = df[coluna].notna()
+    if anos is not None:
+        mascara &= df['ano'].isin(np.atleast_1d(anos))
+    if setores is not None:
+        mascara &= df['setor'].isin(np.atleast_1d(setores))
+    if linhas is not None:
+        mascara &= np.isin(np.arange(len(df)), linhas)
+    selecao = df[mascara]
+    ordem = selecao[coluna].sort_values(ascending=crescente, kind='stable')
+    return ordem.index.to_numpy()[:n]
+
+
+@pytest.mark.parametrize("n", [0, -1, -10])
+def test_tamanho_invalido(n):
+    with pytest.raises(ValueError, match="ao menos 1"):
+        IndiceRanking(DF).ranking('divev_dif', n)
+
+
+def test_maiores_e_menores():
+    indice = IndiceRanking(DF)
+    assert indice.ranking('divev_dif', 3).tolist() == [3, 5, 0]
+    assert indice.ranking('divev_dif', 3, crescente=True).tolist() == [4, 6, 2]
+
+
+def test_valores_ausentes_ficam_fora():
+    indice = IndiceRanking(DF)
+    assert 1 not in indice.ranking('divev_dif', len(DF)).tolist()
+    assert len(indice.ranking('divev_dif', 100)) == DF['divev_dif'].notna().sum()
+
+
+def test_restricoes():
+    indice = IndiceRanking(DF)
+    assert indice.ranking('divev_dif', 2, anos=2021).tolist() == [5, 7]
+    assert indice.ranking('divev_dif', 5, setores=['B']).tolist() == [3, 7, 2, 6]
+    assert indice.ranking('divev_dif', 2, anos=[2020], setores='A').tolist() == [0]
+    assert indice.ranking('divev_dif', 2, linhas=[0, 2, 6]).tolist() == [0, 2]
+
+
+def test_selecao_vazia():
+    indice = IndiceRanking(DF)
+    assert indice.ranking('divev_dif', 3, anos=1999).tolist() == []
+    assert indice.ranking('divev_dif', 3, setores=['Z']).tolist() == []
+    assert indice.ranking('divev_dif', 3, linhas=[]).tolist() == []
+
+
+def test_colunas_ausentes():
+    assert IndiceRanking(DF).colunas == ['divev_dif']
+
+
+def test_igual_a_ordenacao_completa(painel):
+    df = painel.dados(['ano', 'setor', 'divev_dif', 'wroa'])
+    indice = IndiceRanking(df)
+    anos = sorted(df['ano'].unique().tolist())
+    setores = sorted(df['setor'].unique().tolist())
+    linhas = np.flatnonzero(np.arange(len(df)) % 3 == 0)
+    for coluna in ['divev_dif', 'wroa']:
+        for n in [1, 7, 50, len(df) + 1]:
+            for crescente in [False, True]:
+                for filtros in [{}, {'anos': anos[-2:]}, {'setores': setores[:3]}, {'linhas': linhas}]:
+                    obtido = indice.ranking(coluna, n, crescente=crescente, **filtros)
+                    esperado = _referencia(df, coluna, n, crescente=crescente, **filtros)
+                    # Empates podem sair em outra ordem: compara os valores
+                    np.testing.assert_array_equal(df[coluna].to_numpy()[obtido], df[coluna].to_numpy()[esperado])
+
+
+def test_ranking_empresas_rejeita_tamanho_invalido(painel):
+    with pytest.raises(ValueError):
+        ranking_empresas(painel, n=-1)
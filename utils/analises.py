@@ -0,0 +1,244 @@
+"""Análises das páginas, importáveis sem o Streamlit.
+
+As páginas, a API JSON (``utils.api``) e a linha de comando usam as mesmas
+funções, todas apoiadas nos artefatos e caches do painel:
+
+- ``desempenho``: médias por ano e grupo de uma proxy (página 1);
+- ``retas_investimento`` e ``celula_investimento``: retas MQO de cada célula
+  (setor, ano) e os pontos de uma célula (página 2);
+- ``contagem_oc3`` e ``ranking_empresas``: empresas com OC3 = 1 por setor e
+  ranking das empresas (página 3);
+- ``serie_governanca``: série anual de um nível de governança (página 4).
+
+``ANALISES`` descreve os parâmetros de cada análise para a API e a linha de
+comando, que recebem os valores como texto. Por exemplo::
+
+    python -m utils.analises desempenho proxy=oc3 metrica=wroa anos=2015,2016
+    python -m utils.analises ranking_empresas ano=2020 n=5 --formato csv
+"""
+import argparse
+import inspect
+import json
+import math
+import sys
+
+import numpy as np
+import pandas as pd
+
+from utils.cache import assinatura, cache_resultados
+from utils.cubo import METRICAS_DESEMPENHO, agregar, obter_cubo
+from utils.dados import carregar_painel, listar_conjuntos
+from utils.esquema import NIVEIS_GOVERNANCA, VARIAVEIS_OC
+from utils.governanca import obter_serie
+from utils.indice import obter_indice
+from utils.ranking import obter_ranking
+from utils.regressao import obter_regressao
+
+
+# === Página 1 ===
+
+def desempenho(painel, proxy='oc1', metrica='wqtobin', anos=None, setores=None, grupos=None):
+    """Média, desvio e erro-padrão de ``metrica`` por ano e grupo de ``proxy``."""
+    _validar(proxy, VARIAVEIS_OC, 'proxy')
+    _validar(metrica, [m for m in METRICAS_DESEMPENHO if m in painel.colunas], 'metrica')
+    return agregar(obter_cubo(painel), proxy, metrica, anos=anos, setores=setores, grupos=grupos)
+
+
+# === Página 2 ===
+
+def retas_investimento(painel):
+    """Reta MQO resíduo ~ crescimento dos ativos de cada célula (setor, ano)."""
+    coeficientes, _ = obter_regressao(painel, "creat", "residuo")
+    return coeficientes
+
+
+def celula_investimento(painel, setor, ano, colunas=None):
+    """Linhas da célula (setor, ano) e a reta MQO ajustada nela (``None`` se vazia)."""
+    dados = obter_indice(painel).selecionar(painel, setor=setor, ano=ano).dados(colunas)
+    coeficientes = retas_investimento(painel)
+    reta = coeficientes[(coeficientes["setor"] == setor) & (coeficientes["ano"] == ano)]
+    return dados, (reta.iloc[0] if len(reta) else None)
+
+
+def _investimento(painel, setor, ano):
+    pontos, reta = celula_investimento(painel, setor, ano, ['ticker', 'creat', 'residuo'])
+    return {'reta': None if reta is None else reta.to_dict(), 'pontos': pontos}
+
+
+# === Página 3 ===
+
+def contagem_oc3(painel, ano, setores=None):
+    """Empresas com OC3 = 1 por setor no ``ano``, da maior para a menor contagem."""
+    def construir():
+        filtros = {'ano': ano, 'oc3': 1}
+        if setores is not None:
+            filtros['setor'] = setores
+        selecao = obter_indice(painel).selecionar(painel, **filtros)
+        return (
+            selecao.dados(['setor'])
+            .groupby('setor', observed=True).size()
+            .reset_index(name='quantidade')
+            .sort_values('quantidade', ascending=False)
+        )
+
+    return cache_resultados.obter(assinatura('contagem_oc3', painel.versao, setores, ano), construir)
+
+
+def ranking_empresas(painel, coluna='divev_dif', n=10, ano=None, setores=None, crescente=False, somente_oc3=True):
+    """As ``n`` empresas com maior (ou menor) ``coluna`` no ``ano`` e ``setores``.
+
+    Com ``somente_oc3``, apenas as empresas com OC3 = 1, como na página 3.
+    Lança ``ValueError`` se ``n`` for menor que 1.
+    """
+    ranking = obter_ranking(painel)
+    _validar(coluna, ranking.colunas, 'coluna')
+    linhas = None
+    if somente_oc3:
+        filtros = {'oc3': 1}
+        if ano is not None:
+            filtros['ano'] = ano
+        if setores is not None:
+            filtros['setor'] = setores
+        linhas = obter_indice(painel).linhas(**filtros)
+    selecionadas = ranking.ranking(coluna, n, anos=ano, setores=setores, linhas=linhas, crescente=crescente)
+    return painel.dados(['ano', 'setor', 'ticker', coluna], linhas=selecionadas)
+
+
+# === Página 4 ===
+
+def serie_governanca(painel, nivel='n1', ocs=(), anos=None):
+    """Total de empresas e empresas com alguma das ``ocs`` por ano, no ``nivel``."""
+    _validar(nivel, NIVEIS_GOVERNANCA, 'nivel')
+    for oc in ocs:
+        _validar(oc, VARIAVEIS_OC, 'ocs')
+    return obter_serie(painel, list(ocs), nivel, anos)
+
+
+def _validar(valor, opcoes, nome):
+    if valor not in opcoes:
+        raise ValueError(f"Valor inválido para '{nome}': {valor!r}.")
+
+
+# === Parâmetros em texto (API e linha de comando) ===
+
+def _inteiros(texto):
+    return [int(valor) for valor in texto.split(',') if valor.strip()]
+
+
+def _textos(texto):
+    return [valor.strip() for valor in texto.split(',') if valor.strip()]
+
+
+def _booleano(texto):
+    if texto.lower() in ('1', 'true', 'sim'):
+        return True
+    if texto.lower() in ('0', 'false', 'nao', 'não'):
+        return False
+    raise ValueError(texto)
+
+
+# Análise -> (função, {parâmetro: conversor do texto})
+ANALISES = {
+    'desempenho': (desempenho, {
+        'proxy': str, 'metrica': str, 'anos': _inteiros, 'setores': _textos, 'grupos': _inteiros,
+    }),
+    'retas_investimento': (retas_investimento, {}),
+    'investimento': (_investimento, {'setor': str, 'ano': int}),
+    'contagem_oc3': (contagem_oc3, {'ano': int, 'setores': _textos}),
+    'ranking_empresas': (ranking_empresas, {
+        'coluna': str, 'n': int, 'ano': int, 'setores': _textos, 'crescente': _booleano, 'somente_oc3': _booleano,
+    }),
+    'serie_governanca': (serie_governanca, {'nivel': str, 'ocs': _textos, 'anos': _inteiros}),
+}
+
+
+def interpretar(nome, parametros):
+    """Converte os ``parametros`` em texto para os argumentos da análise ``nome``.
+
+    Lança ``KeyError`` para análise desconhecida e ``ValueError`` para
+    parâmetro desconhecido, obrigatório ausente ou valor inválido.
+    """
+    funcao, conversores = ANALISES[nome]
+    argumentos = {}
+    for parametro, texto in parametros.items():
+        if parametro not in conversores:
+            raise ValueError(f"Parâmetro desconhecido para '{nome}': {parametro!r}.")
+        try:
+            argumentos[parametro] = conversores[parametro](texto)
+        except ValueError:
+            raise ValueError(f"Valor inválido para '{parametro}': {texto!r}.") from None
+    ausentes = [parametro for parametro in _obrigatorios(funcao) if parametro not in argumentos]
+    if ausentes:
+        raise ValueError(f"Parâmetros obrigatórios ausentes para '{nome}': {', '.join(ausentes)}.")
+    return argumentos
+
+
+def _obrigatorios(funcao):
+    # Parâmetros sem valor padrão, exceto o painel (o primeiro)
+    parametros = list(inspect.signature(funcao).parameters.values())[1:]
+    return [
+        p.name for p in parametros
+        if p.default is inspect.Parameter.empty and p.kind not in (p.VAR_POSITIONAL, p.VAR_KEYWORD)
+    ]
+
+
+def executar(nome, painel, parametros):
+    """Executa a análise ``nome`` com ``parametros`` em texto; retorna dados serializáveis."""
+    funcao, _ = ANALISES[nome]
+    return serializar(funcao(painel, **interpretar(nome, parametros)))
+
+
+def serializar(valor):
+    """Converte DataFrames, séries e escalares do NumPy em listas, dicionários e tipos do Python.
+
+    Valores ausentes (NaN) viram ``None``, que o JSON representa como ``null``.
+    """
+    if isinstance(valor, pd.DataFrame):
+        return [serializar(registro) for registro in valor.to_dict('records')]
+    if isinstance(valor, pd.Series):
+        return serializar(valor.to_dict())
+    if isinstance(valor, dict):
+        return {str(chave): serializar(item) for chave, item in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [serializar(item) for item in valor]
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and not math.isfinite(valor):
+        return None
+    return valor
+
+
+def painel_do_conjunto(conjunto=None):
+    """Painel do conjunto ``conjunto`` (nome do registro) ou do conjunto padrão.
+
+    Lança ``KeyError`` para conjunto desconhecido.
+    """
+    conjuntos = listar_conjuntos()
+    return carregar_painel(conjuntos[conjunto] if conjunto else next(iter(conjuntos.values())))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('analise', choices=list(ANALISES))
+    parser.add_argument('parametros', nargs='*', help="parâmetros no formato nome=valor (listas separadas por vírgula)")
+    parser.add_argument('--conjunto', help="nome do conjunto de dados (padrão: o primeiro do registro)")
+    parser.add_argument('--formato', choices=['json', 'csv'], default='json')
+    args = parser.parse_args()
+
+    try:
+        parametros = dict(parametro.split('=', 1) for parametro in args.parametros)
+    except ValueError:
+        parser.error("os parâmetros devem ter o formato nome=valor")
+    try:
+        painel = painel_do_conjunto(args.conjunto)
+        resultado = executar(args.analise, painel, parametros)
+    except (KeyError, ValueError) as erro:
+        parser.error(str(erro))
+
+    if args.formato == 'csv':
+        if not isinstance(resultado, list):
+            parser.error("o formato csv só vale para análises que retornam uma tabela")
+        pd.DataFrame(resultado).to_csv(sys.stdout, index=False)
+    else:
+        json.dump(resultado, sys.stdout, ensure_ascii=False, indent=2)
+        print()
@@ -0,0 +1,152 @@
+"""API HTTP local, em JSON, sobre as análises de ``utils.analises``.
+
+Cada análise é uma rota ``GET /<analise>`` com os parâmetros na query string,
+no mesmo formato da linha de comando (listas separadas por vírgula)::
+
+    python -m utils.api --porta 8502
+    curl 'http://127.0.0.1:8502/desempenho?proxy=oc3&metrica=wroa&anos=2015,2016'
+
+``GET /`` lista as análises e seus parâmetros e ``GET /versao`` traz a
+versão dos dados. O parâmetro ``conjunto`` escolhe o conjunto de dados (o
+padrão é o primeiro do registro, como nas páginas).
+
+O ETag de cada resposta deriva da versão dos dados, da rota e dos parâmetros
+normalizados, então é calculado sem executar a análise: um cliente que envia
+``If-None-Match`` com o ETag atual recebe ``304`` sem corpo. Os corpos JSON
+ficam no cache LRU ``api`` (e no cache compartilhado entre os processos),
+invalidado naturalmente quando os dados mudam de versão.
+"""
+import argparse
+import hashlib
+import json
+import logging
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from utils.analises import ANALISES, executar, interpretar, painel_do_conjunto
+from utils.cache import CacheLRU
+from utils.dados import listar_conjuntos
+
+logger = logging.getLogger("overconfidence.api")
+
+cache_respostas = CacheLRU(max_itens=1024, max_bytes=64 * 1024 * 1024, nome="api", compartilhado=True)
+
+
+def _json(valor):
+    return json.dumps(valor, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def etag(versao, rota, parametros):
+    """ETag da resposta de ``rota`` com ``parametros`` na versão ``versao`` dos dados."""
+    chave = repr((versao, rota, sorted(parametros.items())))
+    return '"' + hashlib.sha256(chave.encode('utf-8')).hexdigest()[:32] + '"'
+
+
+class Manipulador(BaseHTTPRequestHandler):
+    """Atende as rotas da API.
+
+    Erros de parâmetro viram respostas 400 em JSON; qualquer outra falha vira
+    uma resposta 500, também em JSON, com o traceback no log.
+    """
+
+    server_version = "OverconfidenceAPI/1.0"
+
+    def do_GET(self):
+        try:
+            self._atender()
+        except Exception:
+            # Falha inesperada da análise: registrada no log, com resposta JSON ao cliente
+            logger.exception("Erro ao atender %s", self.path)
+            self._erro(HTTPStatus.INTERNAL_SERVER_ERROR, "Erro interno ao executar a análise.")
+
+    def _atender(self):
+        url = urlsplit(self.path)
+        rota = url.path.strip('/')
+        parametros = dict(parse_qsl(url.query, keep_blank_values=True))
+        conjunto = parametros.pop('conjunto', None)
+
+        if rota == '':
+            self._responder(HTTPStatus.OK, _json({
+                'analises': {nome: sorted(conversores) for nome, (_, conversores) in ANALISES.items()},
+                'conjuntos': list(listar_conjuntos()),
+            }))
+            return
+        if rota != 'versao' and rota not in ANALISES:
+            self._erro(HTTPStatus.NOT_FOUND, f"Rota desconhecida: /{rota}.")
+            return
+
+        try:
+            painel = painel_do_conjunto(conjunto)
+        except KeyError:
+            self._erro(HTTPStatus.BAD_REQUEST, f"Conjunto desconhecido: {conjunto!r}.")
+            return
+        except FileNotFoundError as erro:
+            self._erro(HTTPStatus.SERVICE_UNAVAILABLE, str(erro))
+            return
+
+        if rota == 'versao':
+            self._responder(HTTPStatus.OK, _json({'versao': painel.versao}))
+            return
+
+        # Parâmetros validados antes do ETag: um pedido inválido nunca recebe 304
+        try:
+            interpretar(rota, parametros)
+        except ValueError as erro:
+            self._erro(HTTPStatus.BAD_REQUEST, str(erro))
+            return
+
+        marca = etag(painel.versao, rota, parametros)
+        if marca in [valor.strip() for valor in self.headers.get('If-None-Match', '').split(',')]:
+            self._responder(HTTPStatus.NOT_MODIFIED, b'', marca)
+            return
+
+        try:
+            corpo = cache_respostas.obter(
+                (painel.versao, rota, tuple(sorted(parametros.items()))),
+                lambda: _json(executar(rota, painel, parametros))
+            )
+        except ValueError as erro:
+            self._erro(HTTPStatus.BAD_REQUEST, str(erro))
+            return
+        self._responder(HTTPStatus.OK, corpo, marca)
+
+    def _erro(self, status, mensagem):
+        self._responder(status, _json({'erro': mensagem}))
+
+    def _responder(self, status, corpo, marca=None):
+        self.send_response(status)
+        if marca is not None:
+            self.send_header('ETag', marca)
+            # O cliente pode guardar a resposta, mas deve revalidá-la pelo ETag
+            self.send_header('Cache-Control', 'no-cache')
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        logger.info("%s - %s", self.address_string(), formato % args)
+
+
+def servidor(host="127.0.0.1", porta=8502):
+    """Servidor HTTP da API (uma thread por requisição), ainda não iniciado."""
+    return ThreadingHTTPServer((host, porta), Manipulador)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--porta', type=int, default=8502)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    api = servidor(args.host, args.porta)
+    logger.info("API em http://%s:%d/", args.host, args.porta)
+    try:
+        api.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.server_close()
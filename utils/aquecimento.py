@@ -0,0 +1,173 @@
+"""Aquecimento dos dados e das visões padrão em segundo plano.
+
+O primeiro usuário depois de um deploy ou reinício do container pagaria a
+leitura da planilha, as colunas derivadas, os agregados e as primeiras
+figuras. ``iniciar_aquecimento()`` dispara, uma única vez por processo, uma
+thread que carrega o conjunto padrão, constrói os índices e agregados e
+renderiza a visão padrão de cada página:
+
+- página 1: ``oc1`` × ``wqtobin`` com todos os grupos, anos e setores (figura,
+  testes de Welch e bootstrap);
+- página 2: primeiro setor e primeiro ano (regressões e figura);
+- página 3: ano inicial do seletor (índice de ranking e plotly);
+- página 4: série do nível ``n1``;
+- página 6: índice por empresa.
+
+Tudo é guardado nos mesmos caches usados pelas páginas (artefatos do painel,
+figuras, testes), com as mesmas chaves: a página reaproveita o que já estiver
+pronto e calcula o restante sob demanda, como sem o aquecimento. Os artefatos
+do painel são construídos sob trava, então uma página que pedir um artefato
+em construção espera por ele em vez de refazê-lo.
+
+O Streamlit não tem gancho de inicialização do servidor: o aquecimento começa
+na primeira execução de qualquer página (``home.py`` e ``seletor_conjunto``).
+Este módulo não importa pandas nem bibliotecas de gráficos no topo, para não
+atrasar a página inicial. ``AQUECIMENTO=0`` desliga o aquecimento. Para
+executá-lo em primeiro plano (por exemplo, no build do container)::
+
+    python -m utils.aquecimento
+"""
+import logging
+import os
+import threading
+import time
+
+ATIVO = os.environ.get("AQUECIMENTO", "1") != "0"
+
+logger = logging.getLogger("overconfidence.aquecimento")
+
+_aquecimento = None
+_trava = threading.Lock()
+
+
+def _dados(painel):
+    from utils.indice import obter_indice
+
+    obter_indice(painel)
+
+
+def _pagina1(painel):
+    from utils.estatisticas import bootstrap_em_segundo_plano, testes
+    from utils.figuras import figura_desempenho
+    from utils.indice import obter_indice
+
+    indice = obter_indice(painel)
+    anos, setores = indice.valores('ano'), indice.valores('setor')
+    if 'wqtobin' in painel.colunas:
+        figura_desempenho(painel, 'oc1', 'wqtobin', indice.valores('oc1'), anos, setores)
+    bootstrap = bootstrap_em_segundo_plano(painel, anos, setores)
+    testes(painel, anos, setores, bootstrap)
+
+
+def _pagina2(painel):
+    from utils.figuras import figura_investimento
+    from utils.indice import obter_indice
+    from utils.regressao import obter_regressao
+
+    indice = obter_indice(painel)
+    obter_regressao(painel, "creat", "residuo")
+    setor, ano = indice.valores('setor')[0], indice.valores('ano')[0]
+    if len(indice.linhas(setor=setor, ano=ano)):
+        figura_investimento(painel, setor, ano)
+
+
+def _pagina3(painel):
+    from utils.importacao import modulo
+    from utils.ranking import obter_ranking
+
+    obter_ranking(painel)
+    modulo('plotly.express')
+
+
+def _pagina4(painel):
+    from utils.governanca import obter_serie
+
+    obter_serie(painel, [], 'n1')
+
+
+def _pagina6(painel):
+    from utils.empresas import obter_indice_empresas
+
+    obter_indice_empresas(painel)
+
+
+# Etapas na ordem de execução: (nome, função que recebe o painel)
+ETAPAS = [
+    ('dados', _dados),
+    ('pagina1', _pagina1),
+    ('pagina2', _pagina2),
+    ('pagina3', _pagina3),
+    ('pagina4', _pagina4),
+    ('pagina6', _pagina6),
+]
+
+
+class Aquecimento:
+    """Execução do aquecimento: etapas concluídas, tempos e falhas."""
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho
+        self.concluidas = {}
+        self.falhas = {}
+        self._fim = threading.Event()
+
+    def pronto(self):
+        return self._fim.is_set()
+
+    def aguardar(self, timeout=None):
+        return self._fim.wait(timeout)
+
+    def executar(self):
+        from utils.dados import ARQUIVO_DADOS, carregar_painel
+
+        try:
+            inicio = time.perf_counter()
+            try:
+                painel = carregar_painel(self.caminho or ARQUIVO_DADOS)
+            except Exception as erro:
+                # Sem dados não há o que aquecer; a página mostra o erro ao usuário
+                self.falhas['carga'] = repr(erro)
+                logger.warning("Aquecimento interrompido na carga: %r", erro)
+                return
+            self.concluidas['carga'] = time.perf_counter() - inicio
+
+            # Uma etapa com falha não impede as seguintes
+            for nome, funcao in ETAPAS:
+                inicio = time.perf_counter()
+                try:
+                    funcao(painel)
+                except Exception as erro:
+                    self.falhas[nome] = repr(erro)
+                    logger.warning("Falha no aquecimento (%s): %r", nome, erro)
+                else:
+                    self.concluidas[nome] = time.perf_counter() - inicio
+            logger.info("Aquecimento concluído: %s", {
+                nome: round(segundos, 3) for nome, segundos in self.concluidas.items()
+            })
+        finally:
+            self._fim.set()
+
+
+def iniciar_aquecimento(caminho=None):
+    """Inicia o aquecimento em segundo plano, se ainda não foi iniciado neste processo.
+
+    Retorna o ``Aquecimento`` em andamento (ou ``None`` se desligado).
+    """
+    global _aquecimento
+    if not ATIVO:
+        return None
+    with _trava:
+        if _aquecimento is None:
+            _aquecimento = Aquecimento(caminho)
+            threading.Thread(target=_aquecimento.executar, name="aquecimento", daemon=True).start()
+    return _aquecimento
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    aquecimento = Aquecimento()
+    aquecimento.executar()
+    for nome, segundos in aquecimento.concluidas.items():
+        print(f"{nome:<10} {segundos:6.2f} s")
+    for nome, erro in aquecimento.falhas.items():
+        print(f"{nome:<10} falhou: {erro}")
@@ -0,0 +1,304 @@
+"""Caches de resultados: LRU em memória e armazenamento em disco entre processos.
+
+``CacheLRU`` é compartilhado pelas sessões de um processo. Com
+``compartilhado=True``, uma falha em memória consulta também o
+``CacheCompartilhado``, um SQLite local lido e gravado por todos os processos
+(réplicas do aplicativo atrás de um balanceador) e que sobrevive a
+reinícios. As chaves já trazem a versão dos dados, então um resultado
+gravado por uma réplica vale para as demais enquanto os dados não mudarem.
+
+O arquivo fica em ``CACHE_COMPARTILHADO`` (padrão
+``.cache/resultados.sqlite``; vazio ou ``0`` desliga), limitado a
+``CACHE_COMPARTILHADO_MB`` (padrão 512) e com validade de
+``CACHE_COMPARTILHADO_DIAS`` (padrão 7). Os valores são serializados com
+``pickle``: o arquivo deve ser gravável apenas pelo próprio aplicativo.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.instrumentacao import contar
+
+logger = logging.getLogger("overconfidence.cache")
+
+# Segundos entre duas atualizações do último acesso de um item compartilhado
+INTERVALO_ACESSO = 60
+
+# Caches criados no processo, listados no painel de depuração
+_caches = weakref.WeakSet()
+
+
+def assinatura(*partes, **filtros):
+    """Chave normalizada e hashable para um conjunto de filtros.
+
+    Listas viram tuplas ordenadas e escalares do NumPy viram tipos do Python,
+    de modo que a mesma seleção feita em ordens diferentes gera a mesma chave.
+    """
+    def normalizar(valor):
+        if isinstance(valor, np.generic):
+            return valor.item()
+        if isinstance(valor, (list, tuple, set, frozenset)):
+            return tuple(sorted((normalizar(v) for v in valor), key=repr))
+        return valor
+
+    return tuple(normalizar(p) for p in partes) + tuple(
+        (nome, normalizar(valor)) for nome, valor in sorted(filtros.items())
+    )
+
+
+class CacheLRU:
+    """Cache limitado por número de itens e/ou bytes, com contadores de uso.
+
+    ``tamanho`` calcula os bytes de um valor (por padrão ``len``); ``nome``
+    identifica o cache nos contadores da instrumentação e no armazenamento
+    compartilhado. Threads que pedem uma chave em construção esperam pelo
+    valor em vez de construí-lo de novo. ``falhas`` conta apenas as chamadas
+    ao construtor; os valores lidos do armazenamento compartilhado contam em
+    ``acertos_compartilhados``.
+    """
+
+    def __init__(self, max_itens=None, max_bytes=None, tamanho=len, nome="cache", compartilhado=False):
+        self.nome = nome
+        self.compartilhado = compartilhado
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self._tamanho = tamanho
+        self._itens = OrderedDict()
+        self._bytes = 0
+        self._trava = threading.Lock()
+        self._em_construcao = {}
+        self.acertos = 0
+        self.acertos_compartilhados = 0
+        self.falhas = 0
+        _caches.add(self)
+
+    def __len__(self):
+        return len(self._itens)
+
+    @property
+    def bytes(self):
+        return self._bytes
+
+    def obter(self, chave, construtor):
+        """Retorna o valor de ``chave``, chamando ``construtor()`` se ausente."""
+        while True:
+            with self._trava:
+                if chave in self._itens:
+                    self._itens.move_to_end(chave)
+                    self.acertos += 1
+                    contar(f"{self.nome}.acerto")
+                    return self._itens[chave][0]
+                construcao = self._em_construcao.get(chave)
+                if construcao is None:
+                    construcao = self._em_construcao[chave] = threading.Event()
+                    break
+            # Outra thread constrói a mesma chave; se ela falhar, esta tenta
+            construcao.wait()
+
+        try:
+            valor = self._construir(chave, construtor)
+            self.guardar(chave, valor)
+        finally:
+            with self._trava:
+                del self._em_construcao[chave]
+            construcao.set()
+        return valor
+
+    def _construir(self, chave, construtor):
+        armazenamento = cache_compartilhado() if self.compartilhado else None
+        if armazenamento is not None:
+            encontrado, valor = armazenamento.ler(self.nome, chave)
+            if encontrado:
+                with self._trava:
+                    self.acertos_compartilhados += 1
+                contar(f"{self.nome}.compartilhado.acerto")
+                return valor
+        with self._trava:
+            self.falhas += 1
+        contar(f"{self.nome}.falha")
+        valor = construtor()
+        if armazenamento is not None:
+            armazenamento.gravar(self.nome, chave, valor)
+        return valor
+
+    def guardar(self, chave, valor):
+        tamanho = self._tamanho(valor) if self.max_bytes is not None else 0
+        with self._trava:
+            if chave in self._itens:
+                self._bytes -= self._itens.pop(chave)[1]
+            self._itens[chave] = (valor, tamanho)
+            self._bytes += tamanho
+            self._remover_excesso()
+
+    def _remover_excesso(self):
+        while self._itens and (
+            (self.max_itens is not None and len(self._itens) > self.max_itens)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            _, (_, tamanho) = self._itens.popitem(last=False)
+            self._bytes -= tamanho
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+            self._bytes = 0
+
+    def estatisticas(self):
+        """Contadores, itens e bytes do cache desde o início do processo."""
+        return {
+            'cache': self.nome,
+            'acertos': self.acertos,
+            'acertos_compartilhados': self.acertos_compartilhados,
+            'falhas': self.falhas,
+            'itens': len(self),
+            'bytes': self.bytes,
+        }
+
+
+def estatisticas_caches():
+    """Estatísticas de todos os caches do processo, para dimensioná-los."""
+    return sorted((cache.estatisticas() for cache in list(_caches)), key=lambda e: e['cache'])
+
+
+class CacheCompartilhado:
+    """Resultados em um SQLite local compartilhado entre processos.
+
+    Cada item guarda o valor serializado, o tamanho e os instantes de
+    gravação e do último acesso. Acima de ``max_bytes`` os itens acessados há
+    mais tempo são removidos; itens gravados há mais de ``validade`` segundos
+    são ignorados e removidos. O banco usa o modo WAL (leituras não bloqueiam
+    a gravação de outro processo) e espera até ``espera`` segundos por uma
+    trava. Erros do SQLite nunca chegam às páginas: viram falhas do cache.
+    """
+
+    def __init__(self, caminho, max_bytes, validade, espera=5.0):
+        self.caminho = caminho
+        self.max_bytes = max_bytes
+        self.validade = validade
+        self.espera = espera
+        self._local = threading.local()
+
+    def _conexao(self):
+        # Uma conexão por thread e por processo (o pacote estático usa fork)
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is not None and self._local.pid == os.getpid():
+            return conexao
+        pasta = os.path.dirname(self.caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        conexao = sqlite3.connect(self.caminho, timeout=self.espera, isolation_level=None)
+        conexao.execute(f"PRAGMA busy_timeout = {int(self.espera * 1000)}")
+        conexao.execute("PRAGMA journal_mode = WAL")
+        conexao.execute("PRAGMA synchronous = NORMAL")
+        conexao.execute(
+            "CREATE TABLE IF NOT EXISTS itens ("
+            " chave TEXT PRIMARY KEY, valor BLOB NOT NULL, bytes INTEGER NOT NULL,"
+            " gravado REAL NOT NULL, acessado REAL NOT NULL)"
+        )
+        conexao.execute("CREATE INDEX IF NOT EXISTS itens_acessado ON itens (acessado)")
+        self._local.conexao, self._local.pid = conexao, os.getpid()
+        return conexao
+
+    @staticmethod
+    def _chave(nome, chave):
+        return hashlib.sha256(repr((nome, chave)).encode('utf-8')).hexdigest()
+
+    def ler(self, nome, chave):
+        """``(True, valor)`` se a chave estiver no armazenamento e válida; senão ``(False, None)``."""
+        chave = self._chave(nome, chave)
+        agora = time.time()
+        try:
+            conexao = self._conexao()
+            linha = conexao.execute(
+                "SELECT valor, acessado FROM itens WHERE chave = ? AND gravado > ?",
+                (chave, agora - self.validade),
+            ).fetchone()
+            if linha is None:
+                return False, None
+            if agora - linha[1] > INTERVALO_ACESSO:
+                # A ordem LRU não precisa de precisão maior; evita uma gravação por leitura
+                conexao.execute("UPDATE itens SET acessado = ? WHERE chave = ?", (agora, chave))
+            return True, pickle.loads(linha[0])
+        except (sqlite3.Error, pickle.UnpicklingError, OSError) as erro:
+            logger.warning("Cache compartilhado indisponível para leitura: %r", erro)
+            return False, None
+
+    def gravar(self, nome, chave, valor):
+        """Grava ``valor`` e remove os itens vencidos e os excedentes, em uma transação."""
+        try:
+            conteudo = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+        if len(conteudo) > self.max_bytes:
+            return
+        agora = time.time()
+        try:
+            conexao = self._conexao()
+            conexao.execute("BEGIN IMMEDIATE")
+            try:
+                conexao.execute(
+                    "INSERT OR REPLACE INTO itens (chave, valor, bytes, gravado, acessado) VALUES (?, ?, ?, ?, ?)",
+                    (self._chave(nome, chave), conteudo, len(conteudo), agora, agora),
+                )
+                conexao.execute("DELETE FROM itens WHERE gravado <= ?", (agora - self.validade,))
+                self._remover_excesso(conexao)
+                conexao.execute("COMMIT")
+            except BaseException:
+                conexao.execute("ROLLBACK")
+                raise
+            contar("compartilhado.gravacao")
+        except (sqlite3.Error, OSError) as erro:
+            logger.warning("Cache compartilhado indisponível para gravação: %r", erro)
+
+    def _remover_excesso(self, conexao):
+        total = conexao.execute("SELECT COALESCE(SUM(bytes), 0) FROM itens").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Menos acessados primeiro, até caber no limite
+        removidos = []
+        for chave, tamanho in conexao.execute("SELECT chave, bytes FROM itens ORDER BY acessado"):
+            if total <= self.max_bytes:
+                break
+            removidos.append((chave,))
+            total -= tamanho
+        conexao.executemany("DELETE FROM itens WHERE chave = ?", removidos)
+        contar("compartilhado.descarte", len(removidos))
+
+    def estatisticas(self):
+        """Itens e bytes gravados no armazenamento."""
+        itens, total = self._conexao().execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM itens").fetchone()
+        return {'itens': itens, 'bytes': total}
+
+    def limpar(self):
+        self._conexao().execute("DELETE FROM itens")
+
+
+# Resultados das páginas (contagens, séries) que valem entre processos
+cache_resultados = CacheLRU(max_itens=512, nome="resultados", compartilhado=True)
+
+_CAMINHO_COMPARTILHADO = os.environ.get("CACHE_COMPARTILHADO", os.path.join(".cache", "resultados.sqlite"))
+_compartilhado = None
+_trava_compartilhado = threading.Lock()
+
+
+def cache_compartilhado():
+    """Armazenamento compartilhado do processo, ou ``None`` se desligado."""
+    global _compartilhado
+    if _CAMINHO_COMPARTILHADO in ("", "0"):
+        return None
+    with _trava_compartilhado:
+        if _compartilhado is None:
+            _compartilhado = CacheCompartilhado(
+                os.path.abspath(_CAMINHO_COMPARTILHADO),
+                max_bytes=int(os.environ.get("CACHE_COMPARTILHADO_MB", "512")) * 1024 * 1024,
+                validade=float(os.environ.get("CACHE_COMPARTILHADO_DIAS", "7")) * 24 * 3600,
+            )
+    return _compartilhado
@@ -0,0 +1,103 @@
+"""Componentes de interface reutilizados pelas páginas."""
+import math
+
+import streamlit as st
+
+from utils.aquecimento import iniciar_aquecimento
+from utils.dados import carregar_painel, listar_conjuntos
+from utils.exportacao import FORMATOS, exportar_em_cache
+from utils.instrumentacao import enviar
+
+TAMANHOS_PAGINA = [25, 50, 100, 250]
+
+# Chave (fora dos widgets) do conjunto de dados ativo em st.session_state
+CHAVE_CONJUNTO = "conjunto_ativo"
+
+
+def seletor_conjunto():
+    """Seletor do conjunto de dados ativo no menu lateral; retorna o painel.
+
+    A escolha fica em ``st.session_state`` e vale para todas as páginas. Os
+    painéis ficam em cache, então trocar de conjunto não relê os arquivos.
+    Lança ``FileNotFoundError`` se o arquivo do conjunto não existir. Na
+    primeira chamada do processo, inicia também o aquecimento em segundo plano.
+    """
+    iniciar_aquecimento()
+    conjuntos = listar_conjuntos()
+    nomes = list(conjuntos)
+    ativo = st.session_state.get(CHAVE_CONJUNTO)
+    if ativo not in conjuntos:
+        ativo = nomes[0]
+    if len(nomes) > 1:
+        ativo = st.sidebar.selectbox("📂 Conjunto de dados:", nomes, index=nomes.index(ativo))
+    st.session_state[CHAVE_CONJUNTO] = ativo
+    return carregar_painel(conjuntos[ativo])
+
+
+def botoes_download(obter_df, chave, nome_arquivo, nome_planilha='Dados', rotulo="Baixar dados em Excel"):
+    """Botões de download em Excel, CSV e Parquet.
+
+    Os arquivos só são gerados quando o usuário clica em um dos botões.
+    ``chave`` identifica a seleção (versão dos dados + filtros) no cache de
+    arquivos; ``obter_df`` devolve os dados a exportar.
+    """
+    colunas = st.columns(len(FORMATOS))
+    for coluna, (formato, (nome, mime)) in zip(colunas, FORMATOS.items()):
+        with coluna:
+            st.download_button(
+                label=rotulo if formato == 'xlsx' else f"Baixar em {nome}",
+                data=lambda formato=formato: exportar_em_cache(chave, obter_df, formato, nome_planilha),
+                file_name=f"{nome_arquivo}.{formato}",
+                mime=mime,
+                key=f"download_{nome_arquivo}_{formato}",
+            )
+
+
+def tabela_paginada(selecao, colunas, colunas_padrao, chave):
+    """Tabela com seletor de colunas, ordenação e paginação feitas no servidor.
+
+    Apenas as linhas da página atual e as colunas escolhidas são montadas e
+    enviadas ao navegador. ``selecao`` é uma ``utils.indice.Selecao``;
+    ``colunas`` são as colunas oferecidas no seletor.
+    """
+    colunas_exibidas = st.multiselect(
+        "Colunas exibidas:",
+        colunas,
+        default=[c for c in colunas_padrao if c in colunas],
+        key=f"{chave}_colunas"
+    )
+
+    col1, col2, col3, col4 = st.columns([3, 2, 2, 2])
+    ordenar_por = col1.selectbox(
+        "Ordenar por:",
+        [None] + list(colunas),
+        format_func=lambda c: "(ordem original)" if c is None else c,
+        key=f"{chave}_ordem"
+    )
+    crescente = col2.radio(
+        "Ordem:",
+        [True, False],
+        format_func=lambda c: "Crescente" if c else "Decrescente",
+        horizontal=True,
+        key=f"{chave}_crescente"
+    )
+    tamanho = col3.selectbox("Linhas por página:", TAMANHOS_PAGINA, index=1, key=f"{chave}_tamanho")
+
+    total = len(selecao)
+    n_paginas = max(1, math.ceil(total / tamanho))
+    # A chave inclui o número de páginas para voltar à primeira quando o filtro muda
+    pagina = col4.number_input(
+        f"Página (de {n_paginas}):",
+        min_value=1,
+        max_value=n_paginas,
+        value=1,
+        key=f"{chave}_pagina_{n_paginas}"
+    )
+
+    inicio = (pagina - 1) * tamanho
+    fim = min(inicio + tamanho, total)
+    df_pagina = selecao.pagina(inicio, fim, colunas_exibidas or None, ordenar_por, crescente)
+    df_pagina.index = range(inicio + 1, inicio + 1 + len(df_pagina))
+
+    st.dataframe(enviar(df_pagina), use_container_width=True)
+    st.caption(f"Linhas {inicio + 1 if total else 0}–{fim} de {total}.")
@@ -0,0 +1,391 @@
+"""Consultas ad hoc sobre o painel com o motor colunar do Arrow (Acero).
+
+A página 7 monta as consultas a partir dos filtros do menu lateral e de uma
+condição em SQL restrito. Os filtros viram uma expressão do
+``pyarrow.compute``; a varredura lê apenas as colunas projetadas e aplica a
+expressão lote a lote (``Painel.dataset``), e as agregações são feitas no
+plano do Acero, sem montar o DataFrame do painel. As linhas são lidas em lotes
+e a varredura para assim que o limite exibido é atingido.
+
+A condição em SQL aceita apenas a cláusula WHERE: comparações (``=``,
+``<>``, ``!=``, ``<``, ``<=``, ``>``, ``>=``), ``IN``, ``BETWEEN``,
+``IS [NOT] NULL``, ``AND``, ``OR``, ``NOT`` e parênteses, sobre colunas do
+painel e literais numéricos ou entre aspas simples. Nada do texto é executado
+diretamente: ele é traduzido para uma expressão do Arrow. Por exemplo::
+
+    lnat > 20 AND (oc1 = 1 OR oc3 = 1) AND setor IN ('Energia Elétrica', 'Química')
+"""
+import re
+
+import pyarrow as pa
+import pyarrow.acero as ac
+import pyarrow.compute as pc
+
+from utils.cache import assinatura
+
+# Nome exibido -> função de agregação do Acero
+AGREGACOES = {
+    'media': 'mean',
+    'mediana': 'approximate_median',
+    'soma': 'sum',
+    'contagem': 'count',
+    'minimo': 'min',
+    'maximo': 'max',
+    'desvio_padrao': 'stddev',
+}
+
+TAMANHO_LOTE = 64 * 1024
+LIMITE_LINHAS = 1000
+
+MAX_CARACTERES = 2000
+MAX_PROFUNDIDADE = 32
+
+
+def colunas_continuas(esquema):
+    """Colunas de ponto flutuante do ``esquema`` (candidatas a faixas e métricas)."""
+    return [campo.name for campo in esquema if pa.types.is_floating(campo.type)]
+
+
+def combinar(*expressoes):
+    """``AND`` das expressões informadas (as ``None`` são ignoradas)."""
+    resultado = None
+    for expressao in expressoes:
+        if expressao is not None:
+            resultado = expressao if resultado is None else resultado & expressao
+    return resultado
+
+
+def compilar_filtros(setores=None, tickers=None, anos=None, ocs=None, todas_ocs=True,
+                     niveis=None, faixas=None):
+    """Expressão dos filtros do menu lateral (``None`` sem filtros).
+
+    ``anos`` é um intervalo ``(inicio, fim)``; ``ocs`` são proxies que devem
+    valer 1 (todas ou, com ``todas_ocs=False``, ao menos uma); ``niveis`` são
+    níveis de governança dos quais a empresa deve estar em algum; ``faixas``
+    mapeia coluna -> ``(minimo, maximo)``.
+    """
+    filtros = []
+    if setores:
+        filtros.append(pc.field('setor').isin(list(setores)))
+    if tickers:
+        filtros.append(pc.field('ticker').isin(list(tickers)))
+    if anos is not None:
+        filtros.append((pc.field('ano') >= anos[0]) & (pc.field('ano') <= anos[1]))
+    if ocs:
+        condicoes = [pc.field(oc) > 0 for oc in ocs]
+        filtros.append(_reduzir(condicoes, 'and' if todas_ocs else 'or'))
+    if niveis:
+        filtros.append(_reduzir([pc.field(nivel) == 1 for nivel in niveis], 'or'))
+    for coluna, (minimo, maximo) in (faixas or {}).items():
+        filtros.append((pc.field(coluna) >= minimo) & (pc.field(coluna) <= maximo))
+    return combinar(*filtros)
+
+
+def chave_consulta(versao, condicao="", setores=None, tickers=None, anos=None, ocs=None, todas_ocs=True,
+                   niveis=None, faixas=None):
+    """Chave de cache da consulta, a partir dos filtros de ``compilar_filtros`` e da condição.
+
+    Não usa o texto da expressão do Arrow, que abrevia conjuntos ``isin``
+    longos: seleções diferentes de muitos tickers teriam a mesma chave.
+    """
+    return assinatura(
+        versao, 'consulta', (condicao or "").strip(),
+        setores=setores or (), tickers=tickers or (), anos=anos, ocs=ocs or (), todas_ocs=todas_ocs,
+        niveis=niveis or (), faixas=repr(sorted((faixas or {}).items())),
+    )
+
+
+def _reduzir(expressoes, operador):
+    resultado = expressoes[0]
+    for expressao in expressoes[1:]:
+        resultado = resultado & expressao if operador == 'and' else resultado | expressao
+    return resultado
+
+
+# === Condição em SQL restrito ===
+
+_TOKENS = re.compile(r"""
+    (?P<espaco>\s+)
+  | (?P<numero>\d+\.?\d*(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)
+  | (?P<texto>'(?:[^']|'')*')
+  | (?P<coluna_aspas>"[^"]+")
+  | (?P<nome>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<operador><=|>=|<>|!=|=|<|>)
+  | (?P<pontuacao>[(),-])
+""", re.VERBOSE)
+
+_PALAVRAS = {'AND', 'OR', 'NOT', 'IN', 'BETWEEN', 'IS', 'NULL', 'TRUE', 'FALSE'}
+
+_COMPARACOES = {
+    '=': lambda a, b: a == b,
+    '<>': lambda a, b: a != b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+}
+
+
+def _tokenizar(texto):
+    tokens, posicao = [], 0
+    while posicao < len(texto):
+        encontrado = _TOKENS.match(texto, posicao)
+        if encontrado is None:
+            raise ValueError(f"Caractere inválido na condição, posição {posicao + 1}: {texto[posicao]!r}.")
+        tipo, valor = encontrado.lastgroup, encontrado.group()
+        if tipo == 'nome' and valor.upper() in _PALAVRAS:
+            tipo, valor = 'palavra', valor.upper()
+        if tipo != 'espaco':
+            tokens.append((tipo, valor, posicao + 1))
+        posicao = encontrado.end()
+    return tokens
+
+
+class _Tradutor:
+    """Analisador descendente recursivo da condição, gerando ``pc.Expression``."""
+
+    def __init__(self, tokens, esquema):
+        self.tokens = tokens
+        self.esquema = esquema
+        self.posicao = 0
+        self.profundidade = 0
+
+    # --- Navegação pelos tokens
+
+    def _atual(self):
+        return self.tokens[self.posicao] if self.posicao < len(self.tokens) else (None, None, None)
+
+    def _aceitar(self, tipo, valor=None):
+        atual_tipo, atual_valor, _ = self._atual()
+        if atual_tipo == tipo and (valor is None or atual_valor == valor):
+            self.posicao += 1
+            return True
+        return False
+
+    def _exigir(self, tipo, valor=None, descricao=None):
+        if not self._aceitar(tipo, valor):
+            self._erro(f"esperado {descricao or valor or tipo}")
+
+    def _erro(self, mensagem, indice=None):
+        """Lança ``ValueError`` apontando o token atual (ou o de ``indice``)."""
+        _, valor, posicao = self._atual() if indice is None else self.tokens[indice]
+        if valor is None:
+            raise ValueError(f"Condição incompleta: {mensagem}.")
+        raise ValueError(f"Condição inválida na posição {posicao} ({valor!r}): {mensagem}.")
+
+    # --- Gramática
+
+    def traduzir(self):
+        expressao = self._ou()
+        if self._atual()[0] is not None:
+            self._erro("esperado o fim da condição")
+        return expressao
+
+    def _ou(self):
+        expressao = self._e()
+        while self._aceitar('palavra', 'OR'):
+            expressao = expressao | self._e()
+        return expressao
+
+    def _e(self):
+        expressao = self._nao()
+        while self._aceitar('palavra', 'AND'):
+            expressao = expressao & self._nao()
+        return expressao
+
+    def _nao(self):
+        if self._aceitar('palavra', 'NOT'):
+            return ~self._nao()
+        return self._predicado()
+
+    def _predicado(self):
+        if self._aceitar('pontuacao', '('):
+            self.profundidade += 1
+            if self.profundidade > MAX_PROFUNDIDADE:
+                self._erro("parênteses aninhados demais")
+            expressao = self._ou()
+            self._exigir('pontuacao', ')', "')'")
+            self.profundidade -= 1
+            return expressao
+
+        esquerda = self._operando()
+        if self._aceitar('palavra', 'IS'):
+            negar = self._aceitar('palavra', 'NOT')
+            self._exigir('palavra', 'NULL')
+            expressao = self._campo(esquerda).is_null()
+            return ~expressao if negar else expressao
+
+        negar = self._aceitar('palavra', 'NOT')
+        if self._aceitar('palavra', 'IN'):
+            self._exigir('pontuacao', '(', "'('")
+            valores = [self._literal(esquerda)]
+            while self._aceitar('pontuacao', ','):
+                valores.append(self._literal(esquerda))
+            self._exigir('pontuacao', ')', "')'")
+            expressao = self._campo(esquerda).isin(valores)
+        elif self._aceitar('palavra', 'BETWEEN'):
+            minimo = self._literal(esquerda)
+            self._exigir('palavra', 'AND')
+            maximo = self._literal(esquerda)
+            campo = self._campo(esquerda)
+            expressao = (campo >= minimo) & (campo <= maximo)
+        elif negar:
+            self._erro("esperado IN ou BETWEEN após NOT")
+        else:
+            tipo, operador, _ = self._atual()
+            if tipo != 'operador':
+                self._erro("esperado um operador de comparação")
+            self.posicao += 1
+            direita = self._operando()
+            expressao = _COMPARACOES[operador](self._valor(esquerda, direita), self._valor(direita, esquerda))
+        return ~expressao if negar else expressao
+
+    def _operando(self):
+        """``('coluna', nome, indice)`` ou ``('literal', valor, indice)``."""
+        indice = self.posicao
+        tipo, valor, _ = self._atual()
+        if tipo in ('nome', 'coluna_aspas'):
+            nome = valor.strip('"')
+            if nome not in self.esquema.names:
+                self._erro(f"coluna desconhecida {nome!r}")
+            self.posicao += 1
+            return ('coluna', nome, indice)
+        if tipo == 'palavra' and valor in ('TRUE', 'FALSE'):
+            self.posicao += 1
+            return ('literal', int(valor == 'TRUE'), indice)
+        return ('literal', self._literal(None), indice)
+
+    def _literal(self, coluna):
+        """Literal numérico ou texto, compatível com o tipo de ``coluna`` se informada."""
+        sinal = -1 if self._aceitar('pontuacao', '-') else 1
+        tipo, valor, _ = self._atual()
+        if tipo == 'numero':
+            literal = sinal * (float(valor) if re.search(r"[.eE]", valor) else int(valor))
+        elif tipo == 'texto' and sinal == 1:
+            literal = valor[1:-1].replace("''", "'")
+        else:
+            self._erro("esperado um número ou um texto entre aspas simples")
+        if coluna is not None and coluna[0] == 'coluna' and not _compativel(self._tipo(coluna), literal):
+            self._erro(f"valor incompatível com a coluna {coluna[1]!r}")
+        self.posicao += 1
+        return literal
+
+    def _tipo(self, operando):
+        tipo = self.esquema.field(operando[1]).type
+        return tipo.value_type if pa.types.is_dictionary(tipo) else tipo
+
+    def _campo(self, operando):
+        if operando[0] != 'coluna':
+            self._erro("esperada uma coluna", operando[2])
+        return pc.field(operando[1])
+
+    def _valor(self, operando, outro):
+        if operando[0] == 'coluna':
+            return pc.field(operando[1])
+        if outro[0] == 'coluna' and not _compativel(self._tipo(outro), operando[1]):
+            self._erro(f"valor incompatível com a coluna {outro[1]!r}", operando[2])
+        return pc.scalar(operando[1])
+
+
+def _compativel(tipo, literal):
+    if pa.types.is_string(tipo) or pa.types.is_large_string(tipo):
+        return isinstance(literal, str)
+    return not isinstance(literal, str)
+
+
+def traduzir_condicao(texto, esquema):
+    """Traduz a condição em SQL restrito para uma expressão sobre ``esquema``.
+
+    Retorna ``None`` para texto vazio. Lança ``ValueError`` com a posição do
+    erro se a condição não for válida.
+    """
+    texto = (texto or "").strip()
+    if not texto:
+        return None
+    if len(texto) > MAX_CARACTERES:
+        raise ValueError(f"A condição deve ter no máximo {MAX_CARACTERES} caracteres.")
+    return _Tradutor(_tokenizar(texto), esquema).traduzir()
+
+
+# === Execução ===
+
+def contar_linhas(painel, filtro=None):
+    """Número de linhas que atendem a ``filtro`` (lê só as colunas do filtro)."""
+    return painel.dataset().count_rows(filter=filtro)
+
+
+def lotes(painel, colunas, filtro=None, tamanho_lote=TAMANHO_LOTE):
+    """Lotes (``pa.RecordBatch``) com ``colunas`` das linhas que atendem a ``filtro``."""
+    scanner = painel.dataset().scanner(columns=list(colunas), filter=filtro, batch_size=tamanho_lote)
+    return scanner.to_batches()
+
+
+def primeiras_linhas(painel, colunas, filtro=None, limite=LIMITE_LINHAS):
+    """DataFrame com até ``limite`` linhas; a varredura para ao atingir o limite."""
+    selecionados, total = [], 0
+    for lote in lotes(painel, colunas, filtro):
+        if total >= limite:
+            break
+        selecionados.append(lote.slice(0, limite - total))
+        total += min(lote.num_rows, limite - total)
+    return _tabela(painel, colunas, selecionados).to_pandas()
+
+
+def todas_linhas(painel, colunas, filtro=None):
+    """DataFrame com todas as linhas que atendem a ``filtro`` (para download)."""
+    return _tabela(painel, colunas, list(lotes(painel, colunas, filtro))).to_pandas()
+
+
+def _tabela(painel, colunas, lotes_lidos):
+    if lotes_lidos:
+        return pa.Table.from_batches(lotes_lidos)
+    return pa.schema([painel.esquema.field(coluna) for coluna in colunas]).empty_table()
+
+
+def agregar(painel, grupos, metricas, funcoes, filtro=None):
+    """Agrega ``metricas`` com ``funcoes`` (chaves de ``AGREGACOES``) por ``grupos``.
+
+    O plano do Acero (varredura -> filtro -> agregação) processa os lotes em
+    fluxo. Sem ``grupos`` retorna uma única linha. As colunas do resultado
+    são ``<metrica>_<funcao>``, ordenadas pelos grupos.
+    """
+    grupos, metricas = list(grupos), list(metricas)
+    prefixo = 'hash_' if grupos else ''
+    agregacoes = [
+        (metrica, prefixo + AGREGACOES[funcao], _opcoes(funcao), f"{metrica}_{funcao}")
+        for metrica in metricas for funcao in funcoes
+    ]
+    dataset = painel.dataset()
+    colunas = list(dict.fromkeys(grupos + metricas))
+    nos = [ac.Declaration("scan", ac.ScanNodeOptions(dataset, columns=colunas, filter=filtro))]
+    if filtro is not None:
+        # O scan usa o filtro só para descartar lotes; a filtragem das linhas é explícita
+        nos.append(ac.Declaration("filter", ac.FilterNodeOptions(filtro)))
+    nos.append(ac.Declaration("aggregate", ac.AggregateNodeOptions(agregacoes, keys=grupos)))
+    df = ac.Declaration.from_sequence(nos).to_table().to_pandas()
+    if grupos:
+        # Ordenado no pandas: o Arrow não ordena colunas de dicionário (ticker, setor)
+        df = df.sort_values(grupos, ignore_index=True)
+    return df[grupos + [nome for *_, nome in agregacoes]]
+
+
+def _opcoes(funcao):
+    if funcao == 'desvio_padrao':
+        return pc.VarianceOptions(ddof=1)
+    if funcao == 'contagem':
+        return pc.CountOptions(mode='only_valid')
+    return None
+
+
+def limites(painel, colunas):
+    """Mínimo e máximo de cada coluna numérica, em uma única varredura."""
+    if not colunas:
+        return {}
+    agregacoes = [(coluna, 'min_max', None, coluna) for coluna in colunas]
+    nos = [
+        ac.Declaration("scan", ac.ScanNodeOptions(painel.dataset(), columns=list(colunas))),
+        ac.Declaration("aggregate", ac.AggregateNodeOptions(agregacoes)),
+    ]
+    linha = ac.Declaration.from_sequence(nos).to_table().to_pylist()[0]
+    return {coluna: (linha[coluna]['min'], linha[coluna]['max']) for coluna in colunas}
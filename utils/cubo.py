@@ -0,0 +1,85 @@
+"""Cubo de agregados do desempenho por (ano, setor, grupo de OC).
+
+Para cada par proxy de OC x métrica de desempenho guarda a soma, a contagem e
+a soma dos quadrados da métrica em cada célula (ano, setor, valor da proxy).
+Qualquer combinação de filtros de ano, setor e grupo é respondida somando as
+células do cubo, sem percorrer as linhas do painel.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.esquema import VARIAVEIS_OC
+
+METRICAS_DESEMPENHO = ['wqtobin', 'wroa', 'wroaebit', 'wroe', 'wmgop']
+
+
+def construir_cubo(df, proxies=VARIAVEIS_OC, metricas=METRICAS_DESEMPENHO):
+    """Retorna um dicionário (proxy, métrica) -> DataFrame de células.
+
+    Cada DataFrame tem as colunas ``ano``, ``setor``, ``grupo``, ``n``,
+    ``soma`` e ``soma_quadrados``.
+    """
+    metricas = [m for m in metricas if m in df.columns]
+    valores = df[metricas].astype('float64')
+    quadrados = (valores ** 2).add_suffix('__q')
+    base = pd.concat([df[['ano', 'setor']], valores, quadrados], axis=1)
+
+    cubo = {}
+    for proxy in proxies:
+        if proxy not in df.columns:
+            continue
+        grupos = base.assign(grupo=df[proxy]).groupby(['ano', 'setor', 'grupo'], observed=True)
+        somas = grupos.sum(min_count=1)
+        contagens = grupos[metricas].count()
+        for metrica in metricas:
+            celulas = pd.DataFrame({
+                'n': contagens[metrica],
+                'soma': somas[metrica].fillna(0.0),
+                'soma_quadrados': somas[f'{metrica}__q'].fillna(0.0),
+            }).reset_index()
+            cubo[(proxy, metrica)] = celulas[celulas['n'] > 0].reset_index(drop=True)
+    return cubo
+
+
+def agregar(cubo, proxy, metrica, anos=None, setores=None, grupos=None):
+    """Média, desvio-padrão e erro-padrão da métrica por (ano, grupo).
+
+    ``anos``, ``setores`` e ``grupos`` restringem as células somadas; ``None``
+    considera todos os valores.
+    """
+    celulas = cubo[(proxy, metrica)]
+    mascara = np.ones(len(celulas), dtype=bool)
+    if anos is not None:
+        mascara &= celulas['ano'].isin(anos).to_numpy()
+    if setores is not None:
+        mascara &= celulas['setor'].isin(setores).to_numpy()
+    if grupos is not None:
+        mascara &= celulas['grupo'].isin(grupos).to_numpy()
+
+    total = (
+        celulas[mascara]
+        .groupby(['ano', 'grupo'])[['n', 'soma', 'soma_quadrados']]
+        .sum()
+        .reset_index()
+    )
+    n = total['n'].astype('float64')
+    media = total['soma'] / n
+    variancia = (total['soma_quadrados'] - n * media ** 2) / (n - 1)
+    total['media'] = media
+    total['desvio'] = np.sqrt(variancia.clip(lower=0))
+    total['erro_padrao'] = total['desvio'] / np.sqrt(n)
+    return total[['ano', 'grupo', 'n', 'media', 'desvio', 'erro_padrao']]
+
+
+def anexar_cubo(cubo, df):
+    """Acrescenta ao cubo as células de ``df``, com anos que ainda não estão nele."""
+    novo = construir_cubo(df)
+    return {
+        chave: pd.concat([celulas, novo[chave]], ignore_index=True) if chave in novo else celulas
+        for chave, celulas in cubo.items()
+    }
+
+
+def obter_cubo(painel):
+    """Cubo do painel, construído uma única vez por versão dos dados."""
+    return painel.artefato('cubo', construir_cubo, anexar_cubo)
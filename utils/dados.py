@@ -0,0 +1,393 @@
+"""Acesso compartilhado aos dados do painel.
+
+A planilha é convertida uma única vez para um arquivo colunar (Arrow IPC /
+Feather v2, sem compressão) em ``.cache/``, com os tipos declarados em
+``utils.esquema``. O arquivo é reconstruído automaticamente sempre que
+``dados.xlsx`` muda, é mapeado em memória e cada página materializa apenas as
+colunas de que precisa.
+
+Além do painel padrão, cada arquivo ``.xlsx``, ``.arrow`` ou ``.feather`` da
+pasta ``conjuntos/`` é um conjunto de dados disponível (``listar_conjuntos``).
+Cada conjunto é carregado uma única vez; quando a memória ocupada pelos
+painéis passa do limite, os menos usados recentemente são descartados.
+
+Anos incluídos depois da planilha (``python -m utils.ingestao``) ficam em
+partições colunares em ``anexos/<conjunto>/`` e são somados ao painel na
+carga. Se a planilha passar a conter um ano anexado, vale a planilha.
+
+Para gerar o arquivo colunar antecipadamente (por exemplo, no deploy)::
+
+    python -m utils.dados
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from utils.esquema import aplicar_esquema, assinatura as assinatura_esquema
+from utils.instrumentacao import contar
+from utils.proxies import calcular_proxies
+
+# Planilha padrão; a variável de ambiente DADOS_ARQUIVO aponta para outro
+# arquivo (.xlsx, ou .arrow/.feather já no esquema de tipos)
+ARQUIVO_DADOS = os.environ.get("DADOS_ARQUIVO", "dados.xlsx")
+EXTENSOES_COLUNARES = (".arrow", ".feather")
+PASTA_CACHE = ".cache"
+PASTA_ANEXOS = "anexos"
+
+# Pasta com os demais conjuntos de dados (versões do painel, extensões etc.);
+# o nome de cada conjunto é o nome do arquivo sem a extensão
+PASTA_CONJUNTOS = os.environ.get("DADOS_PASTA_CONJUNTOS", "conjuntos")
+
+# Memória máxima ocupada pelos painéis carregados (MB, DADOS_MEMORIA_MB)
+MEMORIA_PAINEIS = int(os.environ.get("DADOS_MEMORIA_MB", "1024")) * 1024 * 1024
+
+# Com DADOS_RECALCULAR_PROXIES=1, as proxies de OC (e as medianas e resíduos
+# que as definem) são recalculadas a partir das colunas brutas na conversão
+RECALCULAR_PROXIES = os.environ.get("DADOS_RECALCULAR_PROXIES", "0") == "1"
+
+# Metadado gravado no arquivo colunar identificando a planilha de origem
+_CHAVE_ORIGEM = b"overconfidence.origem"
+
+# Painéis carregados, do menos para o mais usado recentemente
+_paineis = OrderedDict()
+_trava = threading.Lock()
+# Protege a ordem de ``_paineis``; separada de ``_trava`` para que um acerto
+# não espere a carga de outro conjunto
+_trava_ordem = threading.Lock()
+
+
+class Painel:
+    """Painel de dados mapeado em memória, com as colunas derivadas prontas."""
+
+    def __init__(self, caminho, assinatura, partes, tabela):
+        self.caminho = caminho
+        self.assinatura = assinatura
+        # Hash da planilha e de cada partição anexada
+        self.partes = partes
+        self.versao = _versao(partes)
+        self._tabela = tabela
+        self._artefatos = {}
+        self._anexadores = {}
+        self._trava = threading.Lock()
+
+    @property
+    def nome(self):
+        return _nome_conjunto(self.caminho)
+
+    @property
+    def colunas(self):
+        return self._tabela.column_names
+
+    @property
+    def bytes(self):
+        return self._tabela.nbytes
+
+    @property
+    def esquema(self):
+        """Esquema Arrow das colunas (sem os metadados de origem)."""
+        return self._tabela.schema.remove_metadata()
+
+    def dados(self, colunas=None, linhas=None):
+        """Retorna uma visão somente leitura do painel.
+
+        Com ``colunas`` e/ou ``linhas`` (números das linhas), apenas essa parte
+        é materializada. Sem ``linhas``, as colunas numéricas apontam
+        diretamente para o arquivo mapeado em memória.
+        """
+        tabela = self._tabela if colunas is None else self._tabela.select(list(colunas))
+        if linhas is not None:
+            tabela = tabela.take(linhas)
+        return tabela.to_pandas(split_blocks=True)
+
+    def dataset(self):
+        """``pyarrow.dataset`` sobre as colunas mapeadas em memória.
+
+        As consultas (``utils.consultas``) leem apenas as colunas projetadas
+        e aplicam os filtros lote a lote, sem montar o DataFrame do painel.
+        """
+        return ds.dataset(self._tabela)
+
+    def artefato(self, nome, construtor, anexar=None):
+        """Retorna o artefato derivado ``nome`` (índices, agregados etc.).
+
+        ``construtor`` recebe o painel completo e é chamado uma única vez; o
+        resultado vale enquanto esta versão dos dados estiver carregada.
+        ``anexar(artefato, df_novo)``, se informado, atualiza o artefato com
+        as linhas de anos anexados sem reconstruí-lo (ver ``Painel.anexar``).
+        """
+        try:
+            artefato = self._artefatos[nome]
+            contar("artefato.acerto")
+            return artefato
+        except KeyError:
+            pass
+        with self._trava:
+            if nome not in self._artefatos:
+                contar("artefato.falha")
+                self._artefatos[nome] = construtor(self.dados())
+                if anexar is not None:
+                    self._anexadores[nome] = anexar
+            return self._artefatos[nome]
+
+    def anexar(self, assinatura, partes, tabela):
+        """Novo painel com as linhas de ``tabela`` (anos novos) após as atuais.
+
+        Os artefatos com função ``anexar`` recebem apenas as linhas novas; os
+        demais são reconstruídos quando pedidos.
+        """
+        painel = Painel(self.caminho, assinatura, partes, pa.concat_tables([self._tabela, tabela]))
+        df_novo = tabela.to_pandas(split_blocks=True)
+        with self._trava:
+            for nome, anexar in self._anexadores.items():
+                painel._artefatos[nome] = anexar(self._artefatos[nome], df_novo)
+                painel._anexadores[nome] = anexar
+                contar("artefato.anexo")
+        return painel
+
+
+def _nome_conjunto(caminho):
+    return os.path.splitext(os.path.basename(caminho))[0]
+
+
+def listar_conjuntos():
+    """Conjuntos de dados disponíveis (nome -> caminho), o padrão primeiro."""
+    conjuntos = {_nome_conjunto(ARQUIVO_DADOS): os.path.abspath(ARQUIVO_DADOS)}
+    if os.path.isdir(PASTA_CONJUNTOS):
+        for arquivo in sorted(os.listdir(PASTA_CONJUNTOS)):
+            # Ignora arquivos temporários do Excel e ocultos
+            if arquivo.startswith(("~$", ".")):
+                continue
+            if arquivo.endswith((".xlsx",) + EXTENSOES_COLUNARES):
+                conjuntos.setdefault(
+                    _nome_conjunto(arquivo),
+                    os.path.abspath(os.path.join(PASTA_CONJUNTOS, arquivo))
+                )
+    return conjuntos
+
+
+def _caminho_anexos(caminho):
+    pasta, nome = os.path.split(caminho)
+    return os.path.join(pasta, PASTA_ANEXOS, _nome_conjunto(nome))
+
+
+def listar_anexos(caminho=ARQUIVO_DADOS):
+    """Partições anexadas ao conjunto ``caminho``, em ordem."""
+    pasta = _caminho_anexos(os.path.abspath(caminho))
+    if not os.path.isdir(pasta):
+        return []
+    return [os.path.join(pasta, arquivo) for arquivo in sorted(os.listdir(pasta)) if arquivo.endswith(".arrow")]
+
+
+def _assinatura(caminho):
+    # Uma partição nova (ou alterada) também muda a assinatura
+    return tuple(
+        (info.st_mtime_ns, info.st_size)
+        for info in map(os.stat, [caminho] + listar_anexos(caminho))
+    )
+
+
+def _hash_arquivo(caminho):
+    h = hashlib.sha1()
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _versao(partes):
+    if len(partes) == 1:
+        return partes[0]
+    return hashlib.sha1(":".join(partes).encode()).hexdigest()
+
+
+def _caminho_colunar(caminho):
+    pasta, nome = os.path.split(caminho)
+    return os.path.join(pasta, PASTA_CACHE, os.path.splitext(nome)[0] + ".arrow")
+
+
+def _origem(versao):
+    # O arquivo colunar depende da planilha, da variante do esquema de tipos
+    # e de as proxies terem sido recalculadas
+    return f"{versao}:{assinatura_esquema()}:{int(RECALCULAR_PROXIES)}".encode()
+
+
+def _ler_planilha(caminho):
+    df = pd.read_excel(caminho)
+
+    # === Colunas derivadas, calculadas uma única vez na conversão ===
+    df.columns = df.columns.str.lower()
+    if RECALCULAR_PROXIES:
+        df = calcular_proxies(df)
+    if "divev" in df.columns and "mediana_divev" in df.columns:
+        df["divev_dif"] = df["divev"] - df["mediana_divev"]
+    return aplicar_esquema(df)
+
+
+def _gravar_colunar(df, destino, versao):
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    metadados = dict(tabela.schema.metadata or {})
+    metadados[_CHAVE_ORIGEM] = _origem(versao)
+    _gravar_tabela(tabela.replace_schema_metadata(metadados), destino)
+
+
+def _gravar_tabela(tabela, destino):
+    # Grava em arquivo temporário e troca de uma vez, para que outros
+    # processos nunca leiam um arquivo pela metade
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    with pa.OSFile(temporario, "wb") as saida:
+        with pa.ipc.new_file(saida, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+    os.replace(temporario, destino)
+
+
+def _abrir_colunar(destino, versao):
+    """Mapeia o arquivo colunar em memória, se ele corresponder a ``versao``."""
+    try:
+        tabela = pa.ipc.open_file(pa.memory_map(destino)).read_all()
+    except (OSError, pa.ArrowInvalid):
+        return None
+    metadados = tabela.schema.metadata or {}
+    if metadados.get(_CHAVE_ORIGEM) != _origem(versao):
+        return None
+    return tabela
+
+
+def _ler_anexos(caminhos, historico):
+    """Partições ``caminhos`` no esquema de ``historico``, sem os anos que ele já tem."""
+    tabelas = []
+    anos = pc.unique(historico['ano'])
+    for caminho in caminhos:
+        tabela = pa.ipc.open_file(pa.memory_map(caminho)).read_all()
+        if not tabela.schema.equals(historico.schema):
+            # Planilha reconvertida com outra variante do esquema de tipos
+            tabela = tabela.select(historico.column_names).cast(historico.schema)
+        repetidos = pc.is_in(tabela['ano'], value_set=anos)
+        if pc.any(repetidos).as_py():
+            tabela = tabela.filter(pc.invert(repetidos))
+        anos = pa.concat_arrays([anos, pc.unique(tabela['ano'])])
+        tabelas.append(tabela)
+    return pa.concat_tables(tabelas)
+
+
+def gravar_anexo(tabela, nome, caminho=ARQUIVO_DADOS):
+    """Grava ``tabela`` como a partição ``nome`` do conjunto ``caminho``.
+
+    Retorna o caminho da partição. Lança ``FileExistsError`` se ela já existir.
+    """
+    destino = os.path.join(_caminho_anexos(os.path.abspath(caminho)), f"{nome}.arrow")
+    if os.path.exists(destino):
+        raise FileExistsError(f"A partição '{destino}' já existe.")
+    _gravar_tabela(tabela, destino)
+    return destino
+
+
+def construir_colunar(caminho=ARQUIVO_DADOS, forcar=False):
+    """Gera o arquivo colunar de ``caminho`` se ele estiver ausente ou desatualizado.
+
+    Retorna o caminho do arquivo colunar.
+    """
+    caminho = os.path.abspath(caminho)
+    versao = _hash_arquivo(caminho)
+    destino = _caminho_colunar(caminho)
+    if forcar or _abrir_colunar(destino, versao) is None:
+        _gravar_colunar(_ler_planilha(caminho), destino, versao)
+    return destino
+
+
+def _carregar_tabela(caminho, versao):
+    if caminho.endswith(EXTENSOES_COLUNARES):
+        return pa.ipc.open_file(pa.memory_map(caminho)).read_all()
+
+    destino = _caminho_colunar(caminho)
+    tabela = _abrir_colunar(destino, versao)
+    if tabela is not None:
+        return tabela
+
+    df = _ler_planilha(caminho)
+    try:
+        _gravar_colunar(df, destino, versao)
+    except OSError:
+        # Sem permissão de escrita: segue com a tabela em memória
+        return pa.Table.from_pandas(df, preserve_index=False)
+    return _abrir_colunar(destino, versao)
+
+
+def carregar_painel(caminho=ARQUIVO_DADOS):
+    """Retorna o painel em cache, recarregando-o se o arquivo mudou.
+
+    Lança ``FileNotFoundError`` se o arquivo não existir.
+    """
+    caminho = os.path.abspath(caminho)
+    assinatura = _assinatura(caminho)
+
+    painel = _paineis.get(caminho)
+    if painel is not None and painel.assinatura == assinatura:
+        _usar(caminho)
+        return painel
+
+    with _trava:
+        painel = _paineis.get(caminho)
+        if painel is not None and painel.assinatura == assinatura:
+            return painel
+
+        anexos = listar_anexos(caminho)
+        partes = tuple(_hash_arquivo(arquivo) for arquivo in [caminho] + anexos)
+        if painel is not None and painel.partes == partes:
+            # Arquivos regravados sem mudança de conteúdo
+            painel.assinatura = assinatura
+            _usar(caminho)
+            return painel
+
+        if painel is not None and partes[:len(painel.partes)] == painel.partes:
+            # Apenas partições novas: o histórico e seus agregados são reaproveitados
+            novas = _ler_anexos(anexos[len(painel.partes) - 1:], painel._tabela)
+            painel = painel.anexar(assinatura, partes, novas)
+        else:
+            tabela = _carregar_tabela(caminho, partes[0])
+            if anexos:
+                tabela = pa.concat_tables([tabela, _ler_anexos(anexos, tabela)])
+            painel = Painel(caminho, assinatura, partes, tabela)
+        with _trava_ordem:
+            _paineis[caminho] = painel
+        _usar(caminho)
+        _descartar(manter=caminho)
+        return painel
+
+
+def _usar(caminho):
+    with _trava_ordem:
+        try:
+            _paineis.move_to_end(caminho)
+        except KeyError:
+            # Descartado por outra thread entre a consulta e o uso
+            pass
+
+
+def _descartar(manter):
+    """Descarta os painéis menos usados até respeitar ``MEMORIA_PAINEIS``.
+
+    O painel ``manter`` (o que acabou de ser carregado) nunca é descartado.
+    """
+    with _trava_ordem:
+        for caminho in list(_paineis):
+            if sum(painel.bytes for painel in _paineis.values()) <= MEMORIA_PAINEIS:
+                return
+            if caminho != manter:
+                del _paineis[caminho]
+                contar("painel.descarte")
+
+
+def carregar_dados(colunas=None, caminho=ARQUIVO_DADOS):
+    """Atalho para ``carregar_painel(caminho).dados(colunas)``."""
+    return carregar_painel(caminho).dados(colunas)
+
+
+if __name__ == "__main__":
+    print(construir_colunar(forcar=True))
@@ -0,0 +1,79 @@
+"""Índice por empresa para o perfil da página 6.
+
+Na construção, as colunas do perfil (proxies de OC, níveis de governança e
+métricas ``w*``, com a mediana de cada métrica no setor e ano) são copiadas
+uma única vez em ordem de (ticker, ano). Cada ticker ocupa então um intervalo
+contíguo de linhas, e o perfil de uma empresa é uma fatia ``inicio:fim``, sem
+percorrer o restante do painel.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.esquema import METRICAS_WINSORIZADAS, NIVEIS_GOVERNANCA, VARIAVEIS_OC
+
+COLUNAS_PERFIL = ['ticker', 'ano', 'setor'] + VARIAVEIS_OC + NIVEIS_GOVERNANCA + METRICAS_WINSORIZADAS
+
+SUFIXO_MEDIANA = '_mediana_setor'
+
+
+def coluna_mediana(metrica):
+    """Nome da coluna com a mediana de ``metrica`` no setor e ano."""
+    return metrica + SUFIXO_MEDIANA
+
+
+class IndiceEmpresas:
+    """Colunas do perfil ordenadas por (ticker, ano), com o intervalo de cada ticker."""
+
+    def __init__(self, df, colunas=COLUNAS_PERFIL):
+        colunas = [c for c in colunas if c in df.columns]
+        self.metricas = [c for c in METRICAS_WINSORIZADAS if c in colunas]
+        codigos, tickers = pd.factorize(df['ticker'], sort=True)
+        self._posicao = {ticker: i for i, ticker in enumerate(tickers.tolist())}
+
+        # Números das linhas do painel em ordem de (ticker, ano)
+        self.ordem = np.lexsort((df['ano'].to_numpy(), codigos))
+        self.limites = np.searchsorted(codigos[self.ordem], np.arange(len(tickers) + 1))
+
+        perfil = df[colunas]
+        medianas = perfil.groupby(['setor', 'ano'], observed=True)[self.metricas].transform('median')
+        perfil = pd.concat([perfil, medianas.add_suffix(SUFIXO_MEDIANA)], axis=1)
+        self._perfil = perfil.iloc[self.ordem].reset_index(drop=True)
+
+    @property
+    def tickers(self):
+        return list(self._posicao)
+
+    def intervalo(self, ticker):
+        """Intervalo ``(inicio, fim)`` das linhas de ``ticker`` no perfil ordenado."""
+        posicao = self._posicao[ticker]
+        return int(self.limites[posicao]), int(self.limites[posicao + 1])
+
+    def empresa(self, ticker):
+        """Perfil de ``ticker``, um ano por linha. Lança ``KeyError`` se não existir."""
+        inicio, fim = self.intervalo(ticker)
+        return self._perfil.iloc[inicio:fim]
+
+    def empresas(self, tickers):
+        """Perfis de ``tickers`` empilhados, na ordem pedida."""
+        if not tickers:
+            return self._perfil.iloc[:0]
+        return pd.concat([self.empresa(ticker) for ticker in tickers], ignore_index=True)
+
+    def linhas(self, tickers):
+        """Números das linhas do painel de ``tickers`` (para ler as demais colunas)."""
+        fatias = [self.ordem[slice(*self.intervalo(ticker))] for ticker in tickers]
+        return np.concatenate(fatias) if fatias else np.array([], dtype=np.int64)
+
+
+def nivel_governanca(perfil):
+    """Nível de governança de cada linha (``n1``, ``n2``, ``nm`` ou ``tradicional``)."""
+    nivel = pd.Series('tradicional', index=perfil.index)
+    for coluna in NIVEIS_GOVERNANCA:
+        if coluna in perfil.columns:
+            nivel = nivel.mask(perfil[coluna] == 1, coluna)
+    return nivel
+
+
+def obter_indice_empresas(painel):
+    """Índice por empresa do painel, construído uma única vez por versão dos dados."""
+    return painel.artefato('empresas', IndiceEmpresas)
@@ -0,0 +1,92 @@
+"""Esquema de tipos do painel.
+
+Declara o tipo de cada coluna para que o painel ocupe o mínimo de memória:
+categorias para ``ticker``/``setor``, inteiros pequenos para o ano e as
+dummies, e ``float32`` opcional para as métricas winsorizadas (``w*``). As
+demais colunas numéricas continuam em ``float64``, pois valores contábeis
+como ``at`` e ``rec`` ultrapassam a precisão de ``float32``.
+
+Para comparar a memória do painel com e sem o esquema::
+
+    python -m utils.esquema
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+VARIAVEIS_OC = ['oc1', 'oc2', 'oc3', 'oc4', 'oc134', 'oc234']
+NIVEIS_GOVERNANCA = ['n1', 'n2', 'nm']
+METRICAS_WINSORIZADAS = ['wqtobin', 'wroa', 'wroaebit', 'wroe', 'wmgop', 'wopor']
+
+DUMMIES_ANO = [str(ano) for ano in range(2010, 2024)]
+DUMMIES_SETOR = [f"s{i}" for i in range(1, 20)]
+
+# Controlado pela variável de ambiente DADOS_FLOAT32 (0 desativa)
+FLOAT32_WINSORIZADAS = os.environ.get("DADOS_FLOAT32", "1") != "0"
+
+
+def tipos(float32_winsorizadas=FLOAT32_WINSORIZADAS):
+    """Retorna o mapeamento coluna -> tipo declarado."""
+    esquema = {"ticker": "category", "setor": "category", "ano": "int16"}
+    for coluna in DUMMIES_ANO + DUMMIES_SETOR + NIVEIS_GOVERNANCA + VARIAVEIS_OC + ["oc41"]:
+        esquema[coluna] = "int8"
+    if float32_winsorizadas:
+        for coluna in METRICAS_WINSORIZADAS:
+            esquema[coluna] = "float32"
+    return esquema
+
+
+def assinatura(float32_winsorizadas=FLOAT32_WINSORIZADAS):
+    """Identifica a variante do esquema (usada para invalidar caches em disco)."""
+    return "v1-f32" if float32_winsorizadas else "v1-f64"
+
+
+def aplicar_esquema(df, float32_winsorizadas=FLOAT32_WINSORIZADAS):
+    """Converte ``df`` para os tipos declarados.
+
+    Colunas ausentes do esquema mantêm o tipo inferido. Lança ``ValueError``
+    se uma coluna inteira tiver valores ausentes ou fora da faixa do tipo.
+    """
+    df = df.copy()
+    for coluna, tipo in tipos(float32_winsorizadas).items():
+        if coluna not in df.columns:
+            continue
+        if tipo.startswith("int"):
+            valores = df[coluna]
+            if valores.isna().any():
+                raise ValueError(f"A coluna '{coluna}' possui valores ausentes.")
+            limites = np.iinfo(tipo)
+            if len(valores) and (valores.min() < limites.min or valores.max() > limites.max):
+                raise ValueError(f"A coluna '{coluna}' possui valores fora da faixa de {tipo}.")
+        df[coluna] = df[coluna].astype(tipo)
+    return df
+
+
+def relatorio_memoria(original, compacto):
+    """Compara a memória ocupada por ``original`` e ``compacto``, por tipo.
+
+    Retorna um DataFrame com os bytes de cada tipo de ``compacto`` antes e
+    depois da conversão, mais uma linha de total.
+    """
+    antes = original.memory_usage(index=False, deep=True)
+    depois = compacto.memory_usage(index=False, deep=True)
+    relatorio = pd.DataFrame({
+        'tipo': compacto.dtypes.astype(str),
+        'colunas': 1,
+        'bytes_antes': antes,
+        'bytes_depois': depois,
+    }).groupby('tipo').sum()
+    relatorio.loc['total'] = relatorio.sum()
+    relatorio['fator'] = relatorio['bytes_antes'] / relatorio['bytes_depois']
+    return relatorio
+
+
+if __name__ == "__main__":
+    from utils.dados import ARQUIVO_DADOS
+
+    original = pd.read_excel(ARQUIVO_DADOS)
+    original.columns = original.columns.str.lower()
+    compacto = aplicar_esquema(original)
+    relatorio = relatorio_memoria(original, compacto)
+    print(relatorio.to_string(float_format="{:.1f}".format))
@@ -0,0 +1,414 @@
+"""Testes da diferença de desempenho entre empresas com e sem excesso de confiança.
+
+Para cada par proxy de OC x métrica de desempenho compara o grupo 1 (proxy
+maior que zero) com o grupo 0, em cada ano e no total dos anos:
+
+- diferença de médias e teste t de Welch, calculados a partir das somas do
+  cubo de agregados (``utils.cubo``), sem percorrer as linhas;
+- intervalo de confiança da diferença por bootstrap com reamostragem de
+  empresas (clusters), o que respeita a dependência entre os anos de uma
+  mesma empresa no total dos anos.
+
+O bootstrap de todos os pares é feito de uma vez: cada réplica é um vetor de
+pesos das empresas multiplicado pela matriz de somas e contagens por empresa.
+Os blocos de réplicas rodam em um pool de threads (o produto de matrizes do
+NumPy libera o GIL) e o resultado fica em cache por filtro; um processo
+auxiliar criado por ``fork`` a partir do servidor multithread do Streamlit
+poderia herdar travas presas por outras threads. ``bootstrap_em_segundo_plano``
+devolve imediatamente, para que a página mostre os testes de Welch enquanto os
+intervalos são calculados. Pedidos com o mesmo filtro compartilham o mesmo
+bootstrap; ao começar um bootstrap, os blocos ainda na fila dos anteriores são
+cancelados e voltam para a fila apenas se alguém voltar a pedi-los (um
+usuário que trocou de filtro não deixa réplicas abandonadas ocupando o pool).
+
+Para calcular a tabela completa no terminal::
+
+    python -m utils.estatisticas [--replicas N]
+"""
+import argparse
+import math
+import os
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.cache import CacheLRU, assinatura
+from utils.cubo import METRICAS_DESEMPENHO, obter_cubo
+from utils.esquema import VARIAVEIS_OC
+from utils.indice import obter_indice
+from utils.instrumentacao import etapa
+
+TOTAL = "Todos os anos"
+NIVEL_CONFIANCA = 0.95
+REPLICAS = 2000
+SEMENTE = 20240601
+
+# Threads do bootstrap (ESTATISTICAS_THREADS; padrão: uma por CPU)
+THREADS = int(os.environ.get("ESTATISTICAS_THREADS", "0")) or os.cpu_count() or 1
+
+# Blocos de réplicas distribuídos pelo pool; fixo para que o resultado não
+# dependa do número de threads
+BLOCOS = 16
+
+# Limite de elementos da matriz de pesos de um bloco de réplicas
+_ELEMENTOS_BLOCO = 2_000_000
+
+cache_bootstrap = CacheLRU(max_itens=64, nome="bootstrap")
+cache_testes = CacheLRU(max_itens=256, nome="testes", compartilhado=True)
+
+_pool = None
+# Bootstrap pedido por último: tem a vez na fila do pool
+_atual = None
+_trava = threading.Lock()
+
+
+# === Teste t de Welch ===
+
+_COLUNAS_SOMAS = pd.MultiIndex.from_product([['n', 'soma', 'soma_quadrados'], [0, 1]])
+
+
+def _beta_incompleta(x, a, b, iteracoes=200):
+    """Função beta incompleta regularizada I_x(a, b), vetorizada (frações contínuas)."""
+    x, a, b = np.broadcast_arrays(*(np.asarray(v, dtype='float64') for v in (x, a, b)))
+    lgamma = np.vectorize(math.lgamma, otypes=['float64'])
+
+    def fracao(x, a, b):
+        # Algoritmo de Lentz modificado
+        minimo = 1e-300
+        c = np.ones_like(x)
+        d = 1 - (a + b) * x / (a + 1)
+        d = 1 / np.where(np.abs(d) < minimo, minimo, d)
+        h = d.copy()
+        for m in range(1, iteracoes + 1):
+            for numerador in (
+                m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1)),
+            ):
+                d = 1 + numerador * d
+                d = 1 / np.where(np.abs(d) < minimo, minimo, d)
+                c = 1 + numerador / c
+                c = np.where(np.abs(c) < minimo, minimo, c)
+                h = h * d * c
+            if not np.any(np.abs(d * c - 1) > 1e-14):
+                break
+        return h
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ln_frente = (
+            lgamma(a + b) - lgamma(a) - lgamma(b)
+            + a * np.log(x) + b * np.log1p(-x)
+        )
+        frente = np.exp(ln_frente)
+        direto = x < (a + 1) / (a + b + 2)
+        resultado = np.where(
+            direto,
+            frente * fracao(x, a, b) / a,
+            1 - frente * fracao(1 - x, b, a) / b,
+        )
+    resultado = np.where(x <= 0, 0.0, np.where(x >= 1, 1.0, resultado))
+    return np.where(np.isnan(x) | np.isnan(a) | np.isnan(b), np.nan, resultado)
+
+
+def p_valor_t(t, gl):
+    """P-valor bilateral da estatística ``t`` com ``gl`` graus de liberdade."""
+    t = np.asarray(t, dtype='float64')
+    gl = np.asarray(gl, dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return _beta_incompleta(gl / (gl + t * t), gl / 2, 0.5)
+
+
+def welch(n0, soma0, quadrados0, n1, soma1, quadrados1):
+    """Diferença de médias (grupo 1 - grupo 0) e teste de Welch a partir das somas.
+
+    Retorna um DataFrame com ``media0``, ``media1``, ``diferenca``,
+    ``erro_padrao``, ``t``, ``gl`` e ``p_valor``.
+    """
+    n0, n1 = np.asarray(n0, dtype='float64'), np.asarray(n1, dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        media0, media1 = soma0 / n0, soma1 / n1
+        v0 = np.clip((quadrados0 - n0 * media0 ** 2) / (n0 - 1), 0, None) / n0
+        v1 = np.clip((quadrados1 - n1 * media1 ** 2) / (n1 - 1), 0, None) / n1
+        erro_padrao = np.sqrt(v0 + v1)
+        diferenca = media1 - media0
+        t = diferenca / erro_padrao
+        gl = (v0 + v1) ** 2 / (v0 ** 2 / (n0 - 1) + v1 ** 2 / (n1 - 1))
+    return pd.DataFrame({
+        'media0': media0, 'media1': media1, 'diferenca': diferenca,
+        'erro_padrao': erro_padrao, 't': t, 'gl': gl, 'p_valor': p_valor_t(t, gl),
+    })
+
+
+def testes_welch(cubo, proxies=VARIAVEIS_OC, metricas=METRICAS_DESEMPENHO, anos=None, setores=None):
+    """Testes de Welch de cada par proxy x métrica, por ano e no total dos anos.
+
+    Retorna as colunas ``proxy``, ``metrica``, ``periodo`` (o ano ou
+    ``TOTAL``), ``n0``, ``n1`` e as de ``welch``.
+    """
+    pares = [(p, m) for p in proxies for m in metricas if (p, m) in cubo]
+    celulas = pd.concat(
+        [cubo[par] for par in pares],
+        keys=pares, names=['proxy', 'metrica', None],
+    ).reset_index(level=['proxy', 'metrica'])
+    mascara = np.ones(len(celulas), dtype=bool)
+    if anos is not None:
+        mascara &= celulas['ano'].isin(anos).to_numpy()
+    if setores is not None:
+        mascara &= celulas['setor'].astype(str).isin(setores).to_numpy()
+    celulas = celulas[mascara]
+
+    # Somas por par, ano e grupo (0 ou proxy > 0), mais o total dos anos
+    por_ano = (
+        celulas.assign(oc=(celulas['grupo'] > 0).astype(int), periodo=celulas['ano'].astype(str))
+        .groupby(['proxy', 'metrica', 'periodo', 'oc'])[['n', 'soma', 'soma_quadrados']].sum()
+        .unstack('oc')
+        .reindex(columns=_COLUNAS_SOMAS, fill_value=0)
+    )
+    total = por_ano.groupby(level=['proxy', 'metrica']).sum()
+    total.index = pd.MultiIndex.from_tuples(
+        [(p, m, TOTAL) for p, m in total.index], names=por_ano.index.names
+    )
+    # Na ordem dos pares pedidos, com os anos antes do total
+    somas = pd.concat([por_ano, total]).fillna(0)
+    ordem = {par: i for i, par in enumerate(pares)}
+    somas = somas.iloc[np.argsort([ordem[chave[:2]] for chave in somas.index], kind='stable')]
+
+    resultado = welch(
+        somas[('n', 0)].to_numpy(), somas[('soma', 0)].to_numpy(), somas[('soma_quadrados', 0)].to_numpy(),
+        somas[('n', 1)].to_numpy(), somas[('soma', 1)].to_numpy(), somas[('soma_quadrados', 1)].to_numpy(),
+    )
+    resultado.insert(0, 'n1', somas[('n', 1)].to_numpy().astype('int64'))
+    resultado.insert(0, 'n0', somas[('n', 0)].to_numpy().astype('int64'))
+    return pd.concat([somas.index.to_frame(index=False), resultado], axis=1)
+
+
+# === Bootstrap por empresa ===
+
+def matriz_empresas(df, proxies, metricas, anos):
+    """Somas e contagens de cada métrica por empresa.
+
+    Retorna ``(somas, contagens)``, matrizes empresa x coluna com as colunas
+    na ordem (proxy, métrica, ano, grupo), em que grupo é 0 ou 1.
+    """
+    empresas, _ = pd.factorize(df['ticker'])
+    n_empresas = int(empresas.max()) + 1 if len(empresas) else 0
+    ano = np.searchsorted(anos, df['ano'].to_numpy())
+    n_colunas = len(proxies) * len(metricas) * len(anos) * 2
+
+    somas = np.zeros(n_empresas * n_colunas)
+    contagens = np.zeros(n_empresas * n_colunas)
+    for i, proxy in enumerate(proxies):
+        grupo = (df[proxy].to_numpy() > 0).astype('int64')
+        for j, metrica in enumerate(metricas):
+            valores = df[metrica].to_numpy(dtype='float64')
+            validos = np.isfinite(valores)
+            coluna = ((i * len(metricas) + j) * len(anos) + ano) * 2 + grupo
+            posicao = (empresas * n_colunas + coluna)[validos]
+            somas += np.bincount(posicao, valores[validos], minlength=len(somas))
+            contagens += np.bincount(posicao, minlength=len(contagens))
+    forma = (n_empresas, n_colunas)
+    return somas.reshape(forma), contagens.reshape(forma)
+
+
+def _diferencas(somas, contagens, forma):
+    """Diferença de médias (grupo 1 - grupo 0) por réplica, nos anos e no total.
+
+    ``somas`` e ``contagens`` são réplicas x colunas; ``forma`` é
+    (proxies, métricas, anos). O total fica na última posição do eixo dos anos.
+    """
+    somas = somas.reshape(len(somas), *forma, 2)
+    contagens = contagens.reshape(len(contagens), *forma, 2)
+    somas = np.concatenate([somas, somas.sum(axis=3, keepdims=True)], axis=3)
+    contagens = np.concatenate([contagens, contagens.sum(axis=3, keepdims=True)], axis=3)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        medias = somas / contagens
+    return medias[..., 1] - medias[..., 0]
+
+
+def replicas(somas, contagens, forma, quantidade, semente):
+    """``quantidade`` réplicas do bootstrap, reamostrando as linhas (empresas).
+
+    Os pesos de cada réplica são o número de vezes que cada empresa foi
+    sorteada; as somas da réplica são o produto dos pesos pela matriz.
+    """
+    gerador = np.random.default_rng(semente)
+    n_empresas = len(somas)
+    bloco = max(1, _ELEMENTOS_BLOCO // max(n_empresas, 1))
+    resultados = []
+    for inicio in range(0, quantidade, bloco):
+        tamanho = min(bloco, quantidade - inicio)
+        sorteio = gerador.integers(0, n_empresas, size=(tamanho, n_empresas))
+        deslocamento = np.arange(tamanho)[:, None] * n_empresas
+        pesos = np.bincount((sorteio + deslocamento).ravel(), minlength=tamanho * n_empresas)
+        pesos = pesos.reshape(tamanho, n_empresas).astype('float64')
+        resultados.append(_diferencas(pesos @ somas, pesos @ contagens, forma))
+    return np.concatenate(resultados)
+
+
+def _obter_pool():
+    global _pool
+    with _trava:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=THREADS, thread_name_prefix="bootstrap")
+        return _pool
+
+
+class Bootstrap:
+    """Bootstrap de todos os pares em andamento no pool de threads."""
+
+    def __init__(self, proxies, metricas, anos, blocos, nivel):
+        self.proxies = proxies
+        self.metricas = metricas
+        self.anos = anos
+        self.nivel = nivel
+        # Argumentos de ``replicas`` de cada bloco e a tarefa submetida para ele
+        self._blocos = blocos
+        self._tarefas = [None] * len(blocos)
+        self._trava = threading.Lock()
+        self._resultado = None
+
+    def retomar(self):
+        """Passa este bootstrap à frente na fila do pool.
+
+        Cancela os blocos ainda na fila do bootstrap anterior e submete os
+        blocos deste ainda não submetidos ou cancelados.
+        """
+        global _atual
+        with _trava:
+            anterior, _atual = _atual, self
+        if anterior is not None and anterior is not self:
+            anterior._cancelar()
+        pool = _obter_pool()
+        with self._trava:
+            for i, argumentos in enumerate(self._blocos):
+                tarefa = self._tarefas[i]
+                if tarefa is None or tarefa.cancelled():
+                    self._tarefas[i] = pool.submit(replicas, *argumentos)
+
+    def _cancelar(self):
+        # Só os blocos ainda na fila; os que estão em execução terminam
+        with self._trava:
+            for tarefa in self._tarefas:
+                if tarefa is not None:
+                    tarefa.cancel()
+
+    def pronto(self):
+        with self._trava:
+            tarefas = list(self._tarefas)
+        if any(tarefa is None or tarefa.cancelled() for tarefa in tarefas):
+            # Pedido de novo depois de ceder a vez a outro filtro
+            self.retomar()
+            return False
+        return all(tarefa.done() for tarefa in tarefas)
+
+    def _diferencas(self):
+        diferencas = []
+        for tarefa, argumentos in zip(list(self._tarefas), self._blocos):
+            try:
+                if tarefa is None:
+                    raise CancelledError
+                diferencas.append(tarefa.result())
+            except CancelledError:
+                # Bloco cancelado por outro bootstrap: calcula aqui mesmo
+                diferencas.append(replicas(*argumentos))
+        return np.concatenate(diferencas)
+
+    def resultado(self):
+        """Intervalos de confiança por par e período (espera o fim das réplicas).
+
+        Retorna as colunas ``proxy``, ``metrica``, ``periodo``, ``ic_inferior``
+        e ``ic_superior``.
+        """
+        if self._resultado is None and not self._blocos:
+            # Seleção sem linhas
+            self._resultado = pd.DataFrame(columns=['proxy', 'metrica', 'periodo', 'ic_inferior', 'ic_superior'])
+        if self._resultado is None:
+            diferencas = self._diferencas()
+            alfa = (1 - self.nivel) / 2
+            with np.errstate(invalid='ignore'), etapa("bootstrap.quantis"):
+                inferior, superior = np.nanquantile(diferencas, [alfa, 1 - alfa], axis=0)
+            periodos = [str(ano) for ano in self.anos] + [TOTAL]
+            chaves = pd.MultiIndex.from_product(
+                [self.proxies, self.metricas, periodos], names=['proxy', 'metrica', 'periodo']
+            )
+            self._resultado = pd.DataFrame(
+                {'ic_inferior': inferior.ravel(), 'ic_superior': superior.ravel()}, index=chaves
+            ).reset_index()
+        return self._resultado
+
+
+def iniciar_bootstrap(df, proxies=VARIAVEIS_OC, metricas=METRICAS_DESEMPENHO,
+                      quantidade=REPLICAS, nivel=NIVEL_CONFIANCA, semente=SEMENTE):
+    """Distribui as réplicas do bootstrap de ``df`` pelo pool de threads."""
+    proxies = [p for p in proxies if p in df.columns]
+    metricas = [m for m in metricas if m in df.columns]
+    anos = np.unique(df['ano'].to_numpy())
+    with etapa("bootstrap.matriz"):
+        somas, contagens = matriz_empresas(df, proxies, metricas, anos)
+    forma = (len(proxies), len(metricas), len(anos))
+
+    if not len(somas):
+        return Bootstrap(proxies, metricas, anos.tolist(), [], nivel)
+
+    partes = np.array_split(np.arange(quantidade), BLOCOS)
+    sementes = np.random.SeedSequence(semente).spawn(len(partes))
+    blocos = [
+        (somas, contagens, forma, len(parte), semente_parte)
+        for parte, semente_parte in zip(partes, sementes) if len(parte)
+    ]
+    bootstrap = Bootstrap(proxies, metricas, anos.tolist(), blocos, nivel)
+    bootstrap.retomar()
+    return bootstrap
+
+
+def bootstrap_em_segundo_plano(painel, anos=None, setores=None, quantidade=REPLICAS):
+    """Bootstrap das empresas de ``anos`` e ``setores``, em cache por versão e filtros.
+
+    Retorna um ``Bootstrap`` imediatamente; ``pronto()`` indica se os
+    intervalos já podem ser lidos sem esperar.
+    """
+    def construir():
+        filtros = {}
+        if anos is not None:
+            filtros['ano'] = anos
+        if setores is not None:
+            filtros['setor'] = setores
+        linhas = obter_indice(painel).linhas(**filtros)
+        colunas = ['ticker', 'ano'] + VARIAVEIS_OC + METRICAS_DESEMPENHO
+        colunas = [c for c in colunas if c in painel.colunas]
+        return iniciar_bootstrap(painel.dados(colunas, linhas=linhas), quantidade=quantidade)
+
+    chave = assinatura('bootstrap', painel.versao, quantidade, anos=anos, setores=setores)
+    return cache_bootstrap.obter(chave, construir)
+
+
+def testes(painel, anos=None, setores=None, bootstrap=None):
+    """Testes de Welch de todos os pares, com os intervalos do ``bootstrap`` se prontos."""
+    tabela = cache_testes.obter(
+        assinatura('testes', painel.versao, anos=anos, setores=setores),
+        lambda: testes_welch(obter_cubo(painel), anos=anos, setores=setores),
+    )
+    if bootstrap is not None and bootstrap.pronto():
+        tabela = tabela.merge(bootstrap.resultado(), on=['proxy', 'metrica', 'periodo'], how='left')
+    return tabela
+
+
+if __name__ == "__main__":
+    import time
+
+    from utils.dados import carregar_painel
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--replicas', type=int, default=REPLICAS, help="réplicas do bootstrap")
+    args = parser.parse_args()
+
+    painel = carregar_painel()
+    inicio = time.perf_counter()
+    bootstrap = bootstrap_em_segundo_plano(painel, quantidade=args.replicas)
+    bootstrap.resultado()
+    print(f"{args.replicas} réplicas em {time.perf_counter() - inicio:.2f} s ({THREADS} threads)\n")
+
+    tabela = testes(painel, bootstrap=bootstrap)
+    tabela = tabela[tabela['periodo'] == TOTAL].drop(columns='periodo')
+    print(tabela.to_string(index=False, float_format="{:.4f}".format))
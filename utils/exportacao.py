@@ -0,0 +1,90 @@
+"""Exportação dos dados filtrados em Excel, CSV e Parquet.
+
+Os arquivos são gerados em blocos de linhas: o Excel usa o modo
+``constant_memory`` do xlsxwriter, que grava cada linha em disco temporário
+em vez de manter a planilha inteira em memória. Os arquivos prontos ficam em
+cache pela assinatura do filtro, então downloads repetidos da mesma seleção
+não refazem o arquivo.
+"""
+import io
+
+from utils.cache import CacheLRU
+from utils.importacao import adiado
+from utils.instrumentacao import etapa
+
+TAMANHO_BLOCO = 5000
+
+xlsxwriter = adiado('xlsxwriter')
+
+FORMATOS = {
+    'xlsx': ("Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    'csv': ("CSV", "text/csv"),
+    'parquet': ("Parquet", "application/vnd.apache.parquet"),
+}
+
+cache_arquivos = CacheLRU(max_bytes=128 * 1024 * 1024, nome="exportacao", compartilhado=True)
+
+
+def _blocos(df):
+    for inicio in range(0, len(df), TAMANHO_BLOCO):
+        yield df.iloc[inicio:inicio + TAMANHO_BLOCO]
+
+
+def gerar_excel(df, nome_planilha='Dados'):
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    worksheet = workbook.add_worksheet(nome_planilha)
+    cabecalho = workbook.add_format({'bold': True, 'border': 1, 'align': 'center'})
+
+    worksheet.write_row(0, 0, [str(coluna) for coluna in df.columns], cabecalho)
+    linha = 1
+    for bloco in _blocos(df):
+        # Valores ausentes viram células vazias e infinitos viram o texto
+        # 'inf'/'-inf', como no pandas.to_excel (o xlsxwriter não grava NaN/inf)
+        bloco = bloco.astype(object).where(bloco.notna(), None)
+        bloco = bloco.replace({float('inf'): 'inf', float('-inf'): '-inf'})
+        for registro in bloco.itertuples(index=False):
+            worksheet.write_row(linha, 0, registro)
+            linha += 1
+
+    workbook.close()
+    return output.getvalue()
+
+
+def gerar_csv(df):
+    output = io.BytesIO()
+    for i, bloco in enumerate(_blocos(df)):
+        output.write(bloco.to_csv(index=False, header=(i == 0)).encode('utf-8'))
+    if len(df) == 0:
+        output.write(df.to_csv(index=False).encode('utf-8'))
+    return output.getvalue()
+
+
+def gerar_parquet(df):
+    output = io.BytesIO()
+    df.to_parquet(output, index=False)
+    return output.getvalue()
+
+
+def exportar(df, formato, nome_planilha='Dados'):
+    """Conteúdo do arquivo de ``df`` no ``formato`` ('xlsx', 'csv' ou 'parquet')."""
+    geradores = {
+        'xlsx': lambda: gerar_excel(df, nome_planilha),
+        'csv': lambda: gerar_csv(df),
+        'parquet': lambda: gerar_parquet(df),
+    }
+    if formato not in geradores:
+        raise ValueError(f"Formato de exportação desconhecido: {formato}")
+    with etapa(f"exportacao.{formato}"):
+        return geradores[formato]()
+
+
+def exportar_em_cache(chave, obter_df, formato, nome_planilha='Dados'):
+    """Como ``exportar``, mas reaproveita o arquivo já gerado para ``chave``.
+
+    ``obter_df`` só é chamado quando o arquivo ainda não está em cache.
+    """
+    return cache_arquivos.obter(
+        (chave, formato, nome_planilha),
+        lambda: exportar(obter_df(), formato, nome_planilha),
+    )
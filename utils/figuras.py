@@ -0,0 +1,203 @@
+"""Cache das figuras do matplotlib/seaborn renderizadas em PNG.
+
+Cada figura é desenhada uma única vez por chave (página, assinatura dos
+filtros e versão dos dados), convertida em PNG e fechada logo em seguida, de
+modo que nenhuma figura fica aberta entre as execuções das páginas. Os PNG
+ficam em um cache LRU com contadores de acertos e falhas, exibidos no painel
+de depuração (``?debug=1``). O matplotlib só é importado na primeira figura
+desenhada (ver ``utils.importacao``).
+
+Os gráficos das páginas 1 e 2 são montados aqui, e não nas páginas, para que
+o aquecimento (``utils.aquecimento``) renderize as visões padrão com as
+mesmas chaves usadas pelas páginas. Os gráficos plotly das páginas 3 e 4
+(interativos, sem cache) também ficam aqui, para que o pacote estático
+(``utils.relatorio``) produza os mesmos gráficos das páginas.
+"""
+import io
+import threading
+
+import numpy as np
+
+from utils.analises import celula_investimento, desempenho
+from utils.cache import CacheLRU, assinatura
+from utils.importacao import adiado
+from utils.instrumentacao import etapa
+
+# Mesmos parâmetros usados por st.pyplot
+DPI = 200
+
+plt = adiado('matplotlib.pyplot')
+sns = adiado('seaborn')
+px = adiado('plotly.express')
+go = adiado('plotly.graph_objects')
+
+cache_figuras = CacheLRU(max_itens=256, max_bytes=64 * 1024 * 1024, nome="figuras", compartilhado=True)
+
+# O pyplot guarda estado global; as sessões e o aquecimento desenham uma figura por vez
+_trava_desenho = threading.Lock()
+
+
+def renderizar(chave, desenhar, figsize=(10, 6)):
+    """Retorna o PNG da figura de ``chave``, desenhando-a com ``desenhar(fig, ax)`` se preciso."""
+    def construir():
+        with etapa("figura.desenho"), _trava_desenho:
+            fig, ax = plt.subplots(figsize=figsize)
+            try:
+                desenhar(fig, ax)
+                buffer = io.BytesIO()
+                fig.savefig(buffer, format='png', dpi=DPI, bbox_inches='tight')
+                return buffer.getvalue()
+            finally:
+                plt.close(fig)
+
+    return cache_figuras.obter(chave, construir)
+
+
+def figura_desempenho(painel, coluna_filtro, variavel, grupos, anos, setores,
+                      mostrar_erro_padrao=False, limites_y=None):
+    """PNG das médias de ``variavel`` por ano e grupo de ``coluna_filtro`` (página 1)."""
+    def desenhar(fig, ax):
+        with etapa("agregacao"):
+            df_grouped = desempenho(painel, coluna_filtro, variavel,
+                                    anos=anos, setores=setores, grupos=grupos)
+
+        for grupo in sorted(df_grouped['grupo'].unique()):
+            subset = df_grouped[df_grouped['grupo'] == grupo]
+            if mostrar_erro_padrao:
+                ax.errorbar(
+                    subset['ano'],
+                    subset['media'],
+                    yerr=subset['erro_padrao'],
+                    marker='o',
+                    capsize=4,
+                    label=f'Grupo {grupo}'
+                )
+            else:
+                ax.plot(
+                    subset['ano'],
+                    subset['media'],
+                    marker='o',
+                    label=f'Grupo {grupo}'
+                )
+
+        ax.set_title(f"{variavel.upper()} Médio por Ano e {coluna_filtro.upper()}")
+        ax.set_xlabel("Ano")
+        ax.set_ylabel(f"{variavel.upper()} Médio")
+        ax.set_xticks(sorted(df_grouped['ano'].unique()))
+        if limites_y is not None:
+            ax.set_ylim(*limites_y)
+        ax.grid(True)
+        ax.legend(title=coluna_filtro.upper())
+        fig.tight_layout()
+
+    return renderizar(
+        assinatura(
+            'desempenho', painel.versao, coluna_filtro, variavel,
+            grupos, anos, setores, mostrar_erro_padrao, limites_y
+        ),
+        desenhar
+    )
+
+
+def figura_investimento(painel, setor, ano):
+    """PNG da dispersão crescimento dos ativos × resíduo de uma célula (página 2)."""
+    def desenhar(fig, ax):
+        dfmqo, reta = celula_investimento(painel, setor, ano, ['ticker', 'creat', 'residuo'])
+
+        # Colunas extraídas uma única vez para os pontos, a reta e os rótulos
+        creat = dfmqo["creat"].to_numpy(dtype=float)
+        residuo = dfmqo["residuo"].to_numpy(dtype=float)
+        tickers = dfmqo["ticker"].to_numpy()
+        finitos = np.isfinite(creat) & np.isfinite(residuo)
+
+        sns.scatterplot(x=creat[finitos], y=residuo[finitos], s=50, ax=ax)
+
+        # Reta MQO lida do cache de regressões (sem reajuste a cada execução)
+        if finitos.any():
+            x_reta = np.array([creat[finitos].min(), creat[finitos].max()])
+            ax.plot(x_reta, reta["intercepto"] + reta["inclinacao"] * x_reta, color="red")
+
+        # Rótulos com o ticker. Um ``ax.text`` por ponto de propósito: o Agg
+        # desenha texto a partir de glifos em cache, e juntar os rótulos numa
+        # única PathCollection de TextPath deixou o desenho duas vezes mais lento
+        for x, y, ticker in zip(creat[finitos], residuo[finitos], tickers[finitos]):
+            ax.text(x, y, ticker, fontsize=9, ha='right')
+
+        ax.set_title(f"Crescimento dos Ativos vs. Resíduos - {setor} ({ano}) - OC2")
+        ax.set_xlabel("Crescimento dos Ativos")
+        ax.set_ylabel("Resíduo da Regressão MQO")
+        ax.grid(True)
+
+    # Figura em cache por setor, ano e versão dos dados
+    return renderizar(assinatura('investimento', painel.versao, setor, ano), desenhar, figsize=(12, 6))
+
+
+# === Gráficos interativos (plotly) ===
+
+def grafico_contagem_oc3(contagem):
+    """Barras das empresas com OC3 = 1 por setor (página 3)."""
+    fig = px.bar(
+        contagem,
+        x='quantidade',
+        y='setor',
+        orientation='h',
+        labels={'quantidade': 'Quantidade de Empresas', 'setor': 'Setor'},
+        text='quantidade',
+        template='plotly_white',
+        color_discrete_sequence=['#1f77b4']
+    )
+    fig.update_traces(textposition='outside')
+    fig.update_layout(
+        yaxis={'categoryorder': 'total ascending'},
+        margin=dict(l=150, r=40, t=50, b=40)
+    )
+    return fig
+
+
+def grafico_governanca(serie, nivel):
+    """Total de empresas (barras) e empresas com OC (linha) por ano no ``nivel`` (página 4)."""
+    fig = go.Figure()
+
+    # Barra azul (total)
+    fig.add_trace(go.Bar(
+        x=serie['Ano'].astype(str),
+        y=serie['Total Empresas'],
+        name='Total de Empresas',
+        marker_color='rgba(0, 123, 255, 0.7)',
+        hovertemplate='Ano: %{x}<br>Total de Empresas: %{y}<extra></extra>'
+    ))
+
+    # Linha vermelha (excesso de confiança)
+    fig.add_trace(go.Scatter(
+        x=serie['Ano'].astype(str),
+        y=serie['Empresas com OC'],
+        name='Empresas com Excesso de Confiança',
+        mode='lines+markers',
+        line=dict(color='crimson', width=3, shape='spline'),
+        marker=dict(size=8, color='crimson'),
+        hovertemplate='Ano: %{x}<br>Empresas com OC: %{y}<extra></extra>'
+    ))
+
+    fig.update_layout(
+        title=f"Número de Empresas por Ano - Nível {nivel.upper()}",
+        xaxis_title="Ano",
+        yaxis_title="Número de Empresas",
+        template="plotly_white",
+        bargap=0.25,
+        hovermode="x unified",
+        barmode='group',
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="center",
+            x=0.5,
+            bgcolor='rgba(0,0,0,0)',
+            bordercolor='rgba(0,0,0,0)'
+        ),
+        xaxis=dict(showgrid=True, gridcolor='rgba(200,200,200,0.3)'),
+        yaxis=dict(showgrid=True, gridcolor='rgba(200,200,200,0.3)'),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig
@@ -0,0 +1,62 @@
+"""Séries anuais por nível de governança corporativa.
+
+Conta, em uma única agregação, o total de empresas e as empresas com alguma
+das proxies de OC selecionadas para cada ano e para os três níveis (``n1``,
+``n2`` e ``nm``).
+"""
+import pandas as pd
+
+from utils.cache import assinatura, cache_resultados
+from utils.esquema import NIVEIS_GOVERNANCA
+
+
+def construir_serie(df, ocs):
+    """Retorna as colunas ``nivel``, ``Ano``, ``Total Empresas`` e ``Empresas com OC``.
+
+    Anos sem empresas em um nível não aparecem na série desse nível.
+    """
+    niveis = df[NIVEIS_GOVERNANCA].eq(1)
+    if ocs:
+        com_oc = df[list(ocs)].sum(axis=1).ge(1)
+    else:
+        com_oc = pd.Series(False, index=df.index)
+
+    contagens = pd.concat(
+        {
+            'Total Empresas': niveis,
+            'Empresas com OC': niveis.mul(com_oc, axis=0),
+        },
+        axis=1,
+    ).groupby(df['ano'].rename('Ano')).sum()
+
+    serie = contagens.stack(level=1).rename_axis(['Ano', 'nivel']).reset_index()
+    serie = serie[serie['Total Empresas'] > 0]
+    return serie[['nivel', 'Ano', 'Total Empresas', 'Empresas com OC']].reset_index(drop=True)
+
+
+def anexar_serie(serie, df, ocs):
+    """Acrescenta à série os anos de ``df``, que ainda não estão nela."""
+    serie = pd.concat([serie, construir_serie(df, ocs)], ignore_index=True)
+    return serie.sort_values(['Ano', 'nivel'], kind='stable', ignore_index=True)
+
+
+def obter_serie(painel, ocs, nivel, anos=None):
+    """Série de ``nivel`` para o conjunto ``ocs``, restrita a ``anos`` se informado.
+
+    A série dos três níveis é calculada uma única vez por conjunto de proxies;
+    o recorte fica no cache de resultados compartilhado entre os processos.
+    """
+    ocs = tuple(sorted(ocs))
+
+    def construir():
+        serie = painel.artefato(
+            ('governanca', ocs),
+            lambda df: construir_serie(df, ocs),
+            lambda serie, df: anexar_serie(serie, df, ocs),
+        )
+        serie = serie[serie['nivel'] == nivel]
+        if anos is not None:
+            serie = serie[serie['Ano'].isin(anos)]
+        return serie.drop(columns='nivel').reset_index(drop=True)
+
+    return cache_resultados.obter(assinatura('governanca', painel.versao, ocs, nivel, anos=anos), construir)
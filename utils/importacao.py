@@ -0,0 +1,77 @@
+"""Importação sob demanda das bibliotecas de gráficos e exportação.
+
+matplotlib, seaborn e plotly custam de centenas de milissegundos a mais de
+um segundo para importar. As páginas declaram os backends no topo com
+``adiado``, que devolve um substituto leve; o módulo de verdade só é
+importado no primeiro acesso a um atributo, isto é, quando o gráfico é
+desenhado::
+
+    px = adiado('plotly.express')
+    ...
+    fig = px.bar(...)   # importa plotly.express aqui
+
+Cada backend registrado em ``BACKENDS`` pode ter uma preparação executada
+antes da importação (o matplotlib, por exemplo, é fixado no backend ``Agg``,
+sem interface gráfica). O tempo de cada importação é registrado pela
+instrumentação na etapa ``importacao.<modulo>``.
+"""
+import importlib
+import sys
+import threading
+
+from utils.instrumentacao import etapa
+
+
+def _preparar_matplotlib():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+# Módulo -> preparação executada antes da primeira importação
+BACKENDS = {
+    'matplotlib.pyplot': _preparar_matplotlib,
+    'seaborn': _preparar_matplotlib,
+    'plotly.express': None,
+    'plotly.graph_objects': None,
+    'xlsxwriter': None,
+}
+
+_trava = threading.Lock()
+
+
+def modulo(nome):
+    """Importa ``nome`` (se ainda não foi importado) e retorna o módulo."""
+    if nome in sys.modules:
+        return sys.modules[nome]
+    with _trava:
+        if nome not in sys.modules:
+            with etapa(f"importacao.{nome}"):
+                preparar = BACKENDS.get(nome)
+                if preparar is not None:
+                    preparar()
+                importlib.import_module(nome)
+    return sys.modules[nome]
+
+
+def carregado(nome):
+    """Indica se ``nome`` já foi importado no processo."""
+    return nome in sys.modules
+
+
+class ModuloAdiado:
+    """Substituto de um módulo que só o importa no primeiro acesso a atributo."""
+
+    def __init__(self, nome):
+        self._nome = nome
+
+    def __getattr__(self, atributo):
+        return getattr(modulo(self._nome), atributo)
+
+    def __repr__(self):
+        estado = "importado" if carregado(self._nome) else "não importado"
+        return f"<módulo adiado {self._nome!r} ({estado})>"
+
+
+def adiado(nome):
+    """``ModuloAdiado`` para ``nome``, a ser usado no lugar de ``import nome``."""
+    return ModuloAdiado(nome)
@@ -0,0 +1,102 @@
+"""Índice de bitmaps para os filtros das páginas.
+
+Para cada valor de ``ano``, ``setor``, das proxies de OC e dos níveis de
+governança guarda um bitmap (``np.packbits``) com as linhas em que o valor
+ocorre. Um filtro vira uma sequência de OR/AND entre bitmaps e devolve os
+números das linhas; o DataFrame só é montado quando a página pede os dados.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.esquema import NIVEIS_GOVERNANCA, VARIAVEIS_OC
+
+COLUNAS_INDEXADAS = ['ano', 'setor'] + VARIAVEIS_OC + NIVEIS_GOVERNANCA
+
+
+class Selecao:
+    """Linhas selecionadas por um filtro, com leitura preguiçosa dos dados."""
+
+    def __init__(self, painel, linhas):
+        self._painel = painel
+        self.linhas = linhas
+
+    def __len__(self):
+        return len(self.linhas)
+
+    @property
+    def vazia(self):
+        return len(self.linhas) == 0
+
+    def dados(self, colunas=None):
+        """Monta o DataFrame das linhas selecionadas (apenas ``colunas``, se informadas)."""
+        return self._painel.dados(colunas, linhas=self.linhas)
+
+    def pagina(self, inicio, fim, colunas=None, ordenar_por=None, crescente=True):
+        """Monta apenas as linhas ``inicio:fim`` da seleção, opcionalmente ordenada.
+
+        Para ordenar, somente a coluna ``ordenar_por`` é lida para todas as
+        linhas; as demais colunas são lidas só para a página pedida.
+        """
+        linhas = self.linhas
+        if ordenar_por is not None:
+            valores = self._painel.dados([ordenar_por], linhas=linhas)[ordenar_por]
+            ordem = valores.sort_values(ascending=crescente, kind='stable', na_position='last').index
+            linhas = linhas[ordem.to_numpy()]
+        return self._painel.dados(colunas, linhas=linhas[inicio:fim])
+
+
+class IndiceBitmap:
+    """Bitmaps por valor das colunas indexadas de um painel."""
+
+    def __init__(self, df, colunas=COLUNAS_INDEXADAS):
+        self.n_linhas = len(df)
+        self._bitmaps = {}
+        for coluna in colunas:
+            if coluna not in df.columns:
+                continue
+            codigos, valores = pd.factorize(df[coluna], sort=True)
+            self._bitmaps[coluna] = {
+                valor: np.packbits(codigos == codigo)
+                for codigo, valor in enumerate(valores.tolist())
+            }
+        self._vazio = np.zeros((self.n_linhas + 7) // 8, dtype=np.uint8)
+        self._cheio = np.packbits(np.ones(self.n_linhas, dtype=bool))
+
+    def valores(self, coluna, **filtros):
+        """Valores distintos (ordenados) de ``coluna``, opcionalmente sob ``filtros``."""
+        bitmaps = self._bitmaps[coluna]
+        if not filtros:
+            return list(bitmaps)
+        mascara = self.mascara(**filtros)
+        return [valor for valor, bitmap in bitmaps.items() if np.any(bitmap & mascara)]
+
+    def mascara(self, **filtros):
+        """Bitmap das linhas que atendem a todos os ``filtros``.
+
+        Cada filtro é ``coluna=valores``; basta a linha ter um dos valores.
+        """
+        resultado = self._cheio
+        for coluna, valores in filtros.items():
+            bitmaps = self._bitmaps[coluna]
+            if np.isscalar(valores):
+                valores = [valores]
+            uniao = self._vazio
+            for valor in valores:
+                bitmap = bitmaps.get(valor)
+                if bitmap is not None:
+                    uniao = uniao | bitmap
+            resultado = resultado & uniao
+        return resultado
+
+    def linhas(self, **filtros):
+        """Números das linhas (em ordem crescente) que atendem aos ``filtros``."""
+        mascara = np.unpackbits(self.mascara(**filtros), count=self.n_linhas)
+        return np.flatnonzero(mascara)
+
+    def selecionar(self, painel, **filtros):
+        return Selecao(painel, self.linhas(**filtros))
+
+
+def obter_indice(painel):
+    """Índice do painel, construído uma única vez por versão dos dados."""
+    return painel.artefato('indice', IndiceBitmap)
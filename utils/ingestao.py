@@ -0,0 +1,132 @@
+"""Inclusão incremental de anos novos no painel.
+
+Recebe apenas as linhas brutas dos anos novos (CSV ou xlsx, com as mesmas
+colunas da planilha) e calcula as medianas, os resíduos e as proxies somente
+das células (setor, ano) desses anos, que não dependem dos demais. Do
+histórico são lidos apenas ``at`` e ``rec`` do ano anterior, para as
+defasagens ``atl1`` e ``recl1`` (quando não vierem nas linhas novas).
+
+O resultado é gravado como uma partição colunar do conjunto de dados (ver
+``utils.dados``); na próxima carga o painel recebe as linhas novas e o cubo,
+as regressões e as séries de governança já calculados recebem apenas as
+células novas. As medianas e regressões dos anos novos usam somente as linhas
+enviadas, e não uma amostra anterior aos filtros da pesquisa.
+
+Para anexar um ano ao conjunto padrão::
+
+    python -m utils.ingestao novos_2024.csv [--dados dados.xlsx]
+"""
+import argparse
+
+import pandas as pd
+import pyarrow as pa
+
+from utils.dados import ARQUIVO_DADOS, carregar_painel, gravar_anexo
+from utils.esquema import DUMMIES_ANO, DUMMIES_SETOR, aplicar_esquema, tipos
+from utils.indice import obter_indice
+from utils.proxies import calcular_proxies, defasar
+
+# Colunas brutas de que as proxies dependem
+COLUNAS_BRUTAS = ['ticker', 'ano', 'setor', 'at', 'rec', 'capex', 'emfcp', 'emflp', 'ev', 'dpa']
+
+
+def ler_linhas(arquivo):
+    """Lê as linhas novas de um CSV ou de uma planilha, com colunas em minúsculas."""
+    if arquivo.lower().endswith(".csv"):
+        df = pd.read_csv(arquivo)
+    else:
+        df = pd.read_excel(arquivo)
+    df.columns = df.columns.str.lower()
+    return df
+
+
+def preparar_linhas(novos, painel):
+    """Calcula as colunas derivadas de ``novos`` e as alinha às colunas do painel.
+
+    Lança ``ValueError`` se faltarem colunas brutas, se algum ano já estiver
+    no painel, se houver (ticker, ano) repetido ou setor desconhecido.
+    """
+    faltantes = [coluna for coluna in COLUNAS_BRUTAS if coluna not in novos.columns]
+    if faltantes:
+        raise ValueError(f"Colunas ausentes nas linhas novas: {', '.join(faltantes)}.")
+    if novos.duplicated(['ticker', 'ano']).any():
+        raise ValueError("As linhas novas possuem (ticker, ano) repetidos.")
+
+    indice = obter_indice(painel)
+    anos_painel = set(indice.valores('ano'))
+    anos = sorted(set(novos['ano'].tolist()))
+    repetidos = [ano for ano in anos if ano in anos_painel]
+    if repetidos:
+        raise ValueError(f"O painel já possui os anos {', '.join(map(str, repetidos))}.")
+
+    novos = novos.copy()
+    novos['ticker'] = novos['ticker'].astype(str)
+    novos['setor'] = novos['setor'].astype(str)
+
+    # === Defasagens: do histórico, apenas o ano anterior aos anos novos ===
+    anteriores = [ano - 1 for ano in anos if ano - 1 in anos_painel]
+    colunas_defasagem = ['ticker', 'ano', 'at', 'rec']
+    if anteriores:
+        historico = painel.dados(colunas_defasagem, linhas=indice.linhas(ano=anteriores))
+        historico['ticker'] = historico['ticker'].astype(str)
+    else:
+        historico = novos[colunas_defasagem].iloc[:0]
+    contexto = pd.concat([historico, novos[colunas_defasagem]], ignore_index=True)
+    for coluna, original in (('atl1', 'at'), ('recl1', 'rec')):
+        if coluna not in novos.columns:
+            novos[coluna] = defasar(contexto, original)[len(historico):]
+
+    # === Medianas, resíduos e proxies só das células novas ===
+    df = calcular_proxies(novos)
+    if 'divev' in df.columns and 'mediana_divev' in df.columns:
+        df['divev_dif'] = df['divev'] - df['mediana_divev']
+
+    # === Dummies de ano e de setor, com a codificação do painel ===
+    for coluna in DUMMIES_ANO:
+        if coluna in painel.colunas:
+            df[coluna] = (df['ano'] == int(coluna)).astype('int8')
+    dummies_setor = [coluna for coluna in DUMMIES_SETOR if coluna in painel.colunas]
+    if dummies_setor:
+        codificacao = painel.dados(['setor'] + dummies_setor).drop_duplicates('setor')
+        dummy_do_setor = dict(zip(
+            codificacao['setor'].astype(str),
+            codificacao[dummies_setor].to_numpy().argmax(axis=1),
+        ))
+        desconhecidos = sorted(set(df['setor']) - set(dummy_do_setor))
+        if desconhecidos:
+            raise ValueError(f"Setores sem dummy no painel: {', '.join(desconhecidos)}.")
+        posicao = df['setor'].map(dummy_do_setor).to_numpy()
+        for i, coluna in enumerate(dummies_setor):
+            df[coluna] = (posicao == i).astype('int8')
+
+    # Colunas inteiras não podem ficar vazias; as demais ausentes ficam nulas
+    esquema = tipos()
+    inteiras = [
+        coluna for coluna in painel.colunas
+        if coluna not in df.columns and esquema.get(coluna, '').startswith('int')
+    ]
+    if inteiras:
+        raise ValueError(f"Colunas ausentes nas linhas novas: {', '.join(inteiras)}.")
+    return aplicar_esquema(df.reindex(columns=painel.colunas))
+
+
+def anexar_anos(arquivo, caminho=ARQUIVO_DADOS):
+    """Anexa ao conjunto ``caminho`` os anos novos de ``arquivo``.
+
+    Retorna o caminho da partição gravada, nomeada pelos anos que contém.
+    """
+    painel = carregar_painel(caminho)
+    df = preparar_linhas(ler_linhas(arquivo), painel)
+    anos = sorted(set(df['ano'].tolist()))
+    nome = str(anos[0]) if len(anos) == 1 else f"{anos[0]}-{anos[-1]}"
+    tabela = pa.Table.from_pandas(df, schema=painel.esquema, preserve_index=False)
+    return gravar_anexo(tabela, nome, caminho)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('arquivo', help="CSV ou planilha com as linhas brutas dos anos novos")
+    parser.add_argument('--dados', default=ARQUIVO_DADOS, help="conjunto de dados que recebe os anos")
+    args = parser.parse_args()
+
+    print(anexar_anos(args.arquivo, args.dados))
@@ -0,0 +1,152 @@
+"""Medição das etapas de cada página (carga, filtros, agregações, figuras,
+tabelas e exportações).
+
+Cada página cria um medidor com ``iniciar(pagina)`` e marca suas etapas com
+``with etapa("nome"):``. Os caches contam acertos e falhas com ``contar`` e
+os elementos enviados ao navegador registram seu tamanho com ``enviar``. Ao
+final, ``finalizar()`` grava um log estruturado (JSON) e, com ``?debug=1`` na
+URL, mostra um painel "Desempenho" na página.
+
+Quando nem o parâmetro ``debug`` nem o log do logger ``overconfidence.desempenho``
+estão ativos, as funções retornam imediatamente, sem medir nada.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger("overconfidence.desempenho")
+
+_local = threading.local()
+_NULO = nullcontext()
+
+
+class Medidor:
+    """Tempos, contadores e bytes enviados durante uma execução da página."""
+
+    def __init__(self, pagina, depuracao):
+        self.pagina = pagina
+        self.depuracao = depuracao
+        self.etapas = []
+        self.contadores = {}
+        self.bytes_enviados = 0
+        self._inicio = time.perf_counter()
+
+    @contextmanager
+    def etapa(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.etapas.append((nome, time.perf_counter() - inicio))
+
+    def contar(self, nome, quantidade=1):
+        self.contadores[nome] = self.contadores.get(nome, 0) + quantidade
+
+    def resumo(self):
+        return {
+            'pagina': self.pagina,
+            'total_s': round(time.perf_counter() - self._inicio, 6),
+            'etapas': [{'etapa': nome, 'segundos': round(s, 6)} for nome, s in self.etapas],
+            'contadores': self.contadores,
+            'bytes_enviados': self.bytes_enviados,
+        }
+
+
+def _ativo():
+    return getattr(_local, 'medidor', None)
+
+
+def _modo_depuracao():
+    import streamlit as st
+
+    try:
+        return st.query_params.get("debug", "0") not in ("", "0", "false")
+    except Exception:
+        # Fora de uma sessão do Streamlit (scripts, testes)
+        return False
+
+
+def iniciar(pagina):
+    """Começa a medir a execução atual de ``pagina``; retorna o medidor ou ``None``."""
+    depuracao = _modo_depuracao()
+    if not depuracao and not logger.isEnabledFor(logging.INFO):
+        _local.medidor = None
+        return None
+    _local.medidor = Medidor(pagina, depuracao)
+    return _local.medidor
+
+
+def etapa(nome):
+    """Contexto que mede a etapa ``nome`` da execução atual."""
+    medidor = _ativo()
+    if medidor is not None:
+        return medidor.etapa(nome)
+    if logger.isEnabledFor(logging.INFO):
+        # Etapas fora da execução da página (ex.: downloads) vão direto para o log
+        return _etapa_avulsa(nome)
+    return _NULO
+
+
+@contextmanager
+def _etapa_avulsa(nome):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        logger.info(json.dumps({'etapa': nome, 'segundos': round(time.perf_counter() - inicio, 6)}))
+
+
+def contar(nome, quantidade=1):
+    medidor = _ativo()
+    if medidor is not None:
+        medidor.contar(nome, quantidade)
+
+
+def enviar(objeto):
+    """Registra o tamanho de ``objeto`` enviado ao navegador e o retorna.
+
+    DataFrames são medidos pelo tamanho em Arrow (o formato usado pelo
+    Streamlit), figuras do Plotly pelo JSON e imagens pelos bytes.
+    """
+    medidor = _ativo()
+    if medidor is None:
+        return objeto
+    if isinstance(objeto, (bytes, bytearray)):
+        tamanho = len(objeto)
+    elif hasattr(objeto, 'to_plotly_json'):
+        tamanho = len(objeto.to_json())
+    else:
+        import pyarrow as pa
+
+        tamanho = pa.Table.from_pandas(objeto).nbytes
+    medidor.bytes_enviados += tamanho
+    return objeto
+
+
+def finalizar():
+    """Grava o log da execução atual e, em modo de depuração, mostra o painel."""
+    medidor = _ativo()
+    _local.medidor = None
+    if medidor is None:
+        return
+
+    resumo = medidor.resumo()
+    logger.info(json.dumps(resumo, ensure_ascii=False))
+
+    if medidor.depuracao:
+        import streamlit as st
+
+        with st.expander("⏱️ Desempenho"):
+            st.metric("Tempo total", f"{resumo['total_s'] * 1000:.1f} ms")
+            st.table(resumo['etapas'])
+            if resumo['contadores']:
+                st.table([{'contador': nome, 'valor': valor} for nome, valor in resumo['contadores'].items()])
+            st.caption(f"Dados enviados ao navegador: {resumo['bytes_enviados'] / 1024:.1f} KiB")
+
+            # Contadores acumulados no processo, para dimensionar os caches
+            from utils.cache import estatisticas_caches
+
+            st.caption("Caches do processo (desde o início do servidor):")
+            st.table(estatisticas_caches())
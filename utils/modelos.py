@@ -0,0 +1,243 @@
+"""Modelos de painel do desempenho sobre as proxies de excesso de confiança.
+
+Estima ``metrica ~ proxy + controles`` em três especificações:
+
+- ``agrupado``: MQO agrupado, com intercepto;
+- ``setor_ano``: MQO agrupado com efeitos de setor e de ano;
+- ``empresa_ano``: efeitos fixos de empresa e de ano (two-way).
+
+Os efeitos não viram colunas de dummies: as variáveis são centradas nas
+médias de cada grupo, alternando entre os efeitos até convergir (projeções
+alternadas, com ``np.bincount``). Os erros-padrão são agrupados por empresa,
+com a correção de amostra pequena usual (G/(G-1) * (N-1)/(N-K)); efeitos
+aninhados nos clusters não entram em K. Empresas com uma única observação
+saem dos modelos com efeito de empresa, pois são ajustadas perfeitamente.
+
+Os resultados ficam em cache por especificação e versão dos dados. Para
+medir o tempo de estimação em painéis sintéticos maiores::
+
+    python -m utils.modelos [--escala N]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.estatisticas import p_valor_t
+
+CONTROLES = ['lnat', 'divbrat']
+CLUSTER = 'ticker'
+
+# Especificação -> (rótulo, efeitos absorvidos)
+EFEITOS = {
+    'agrupado': ("MQO agrupado", []),
+    'setor_ano': ("MQO agrupado com efeitos de setor e ano", ['setor', 'ano']),
+    'empresa_ano': ("Efeitos fixos de empresa e ano", ['ticker', 'ano']),
+}
+
+TOLERANCIA = 1e-10
+MAX_ITERACOES = 1000
+
+
+def remover_singletons(codigos):
+    """Máscara das linhas cujos grupos têm mais de uma linha em todos os efeitos."""
+    manter = np.ones(len(codigos[0]), dtype=bool) if codigos else None
+    while codigos:
+        removidas = np.zeros_like(manter)
+        for c in codigos:
+            contagem = np.bincount(c[manter])
+            removidas[manter] |= contagem[c[manter]] == 1
+        if not removidas.any():
+            break
+        manter &= ~removidas
+    return manter
+
+
+def centrar(matriz, codigos, tolerancia=TOLERANCIA, max_iteracoes=MAX_ITERACOES):
+    """Remove de cada coluna de ``matriz`` as médias dos grupos de cada efeito.
+
+    ``codigos`` tem, para cada efeito, o grupo (0..k-1) de cada linha. Com
+    mais de um efeito as médias são subtraídas alternadamente até que todas
+    fiquem abaixo de ``tolerancia`` (relativa à escala de cada coluna).
+    Retorna a matriz centrada e o número de iterações.
+    """
+    matriz = np.array(matriz, dtype='float64', copy=True)
+    if not codigos:
+        return matriz, 0
+    contagens = [np.bincount(c).astype('float64') for c in codigos]
+    escala = np.maximum(np.abs(matriz).max(axis=0), 1e-300)
+    for iteracao in range(1, max_iteracoes + 1):
+        maior = 0.0
+        for c, n in zip(codigos, contagens):
+            for j in range(matriz.shape[1]):
+                medias = np.bincount(c, matriz[:, j], minlength=len(n)) / n
+                matriz[:, j] -= medias[c]
+                maior = max(maior, np.abs(medias).max() / escala[j])
+        if len(codigos) == 1 or maior < tolerancia:
+            break
+    return matriz, iteracao
+
+
+def estimar(df, metrica, proxy, controles=CONTROLES, efeitos='empresa_ano', nivel=0.95):
+    """Estima o modelo e retorna ``(coeficientes, resumo)``.
+
+    ``coeficientes`` tem as colunas ``variavel``, ``coeficiente``,
+    ``erro_padrao``, ``t``, ``p_valor``, ``ic_inferior`` e ``ic_superior``;
+    ``resumo`` é um dicionário com N, clusters, R² (within, nos modelos com
+    efeitos) e iterações da centragem.
+    """
+    rotulo, absorvidos = EFEITOS[efeitos]
+    variaveis = [proxy] + [c for c in controles if c != proxy]
+    colunas = list(dict.fromkeys([metrica] + variaveis + absorvidos + [CLUSTER]))
+    dados = df[colunas]
+    validos = np.isfinite(dados[[metrica] + variaveis].to_numpy(dtype='float64')).all(axis=1)
+    dados = dados[validos]
+
+    codigos = [pd.factorize(dados[e])[0] for e in absorvidos]
+    manter = remover_singletons(codigos)
+    if manter is not None:
+        dados = dados[manter]
+        codigos = [pd.factorize(c[manter])[0] for c in codigos]
+
+    y = dados[metrica].to_numpy(dtype='float64')
+    X = dados[variaveis].to_numpy(dtype='float64')
+    if not absorvidos:
+        X = np.column_stack([X, np.ones(len(X))])
+        variaveis = variaveis + ['intercepto']
+
+    centrado, iteracoes = centrar(np.column_stack([y, X]), codigos)
+    y_c, X_c = centrado[:, 0], centrado[:, 1:]
+
+    # Variáveis sem variação depois da centragem (ex.: constantes na empresa)
+    norma = np.linalg.norm(X_c, axis=0)
+    estimaveis = norma > 1e-9 * np.maximum(np.linalg.norm(X, axis=0), 1)
+    Xe = X_c[:, estimaveis]
+
+    n, k = Xe.shape
+    clusters, _ = pd.factorize(dados[CLUSTER])
+    g = int(clusters.max()) + 1 if n else 0
+
+    # Graus de liberdade absorvidos: níveis de todos os efeitos menos os
+    # redundantes entre eles, sem contar os efeitos aninhados nas empresas
+    absorvidos_gl = 0
+    if absorvidos and n:
+        niveis = {nome: int(c.max()) + 1 for nome, c in zip(absorvidos, codigos)}
+        absorvidos_gl = sum(niveis.values()) - (len(absorvidos) - 1) - niveis.get(CLUSTER, 0)
+
+    coeficiente = np.full(len(variaveis), np.nan)
+    erro_padrao = np.full(len(variaveis), np.nan)
+    r2 = np.nan
+    if n > k + absorvidos_gl and g > 1 and k:
+        xtx_inv = np.linalg.pinv(Xe.T @ Xe)
+        beta = xtx_inv @ (Xe.T @ y_c)
+        residuos = y_c - Xe @ beta
+
+        # Matriz "sanduíche" com os escores somados por empresa
+        escores = np.column_stack([
+            np.bincount(clusters, Xe[:, j] * residuos, minlength=g) for j in range(k)
+        ])
+        correcao = g / (g - 1) * (n - 1) / (n - k - absorvidos_gl)
+        variancia = correcao * xtx_inv @ (escores.T @ escores) @ xtx_inv
+
+        coeficiente[estimaveis] = beta
+        erro_padrao[estimaveis] = np.sqrt(np.clip(np.diag(variancia), 0, None))
+        total = y_c if absorvidos else y - y.mean()
+        r2 = 1 - residuos @ residuos / (total @ total)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = coeficiente / erro_padrao
+    gl = max(g - 1, 1)
+    quantil = _quantil_t(1 - (1 - nivel) / 2, gl)
+    coeficientes = pd.DataFrame({
+        'variavel': variaveis,
+        'coeficiente': coeficiente,
+        'erro_padrao': erro_padrao,
+        't': t,
+        'p_valor': p_valor_t(t, gl),
+        'ic_inferior': coeficiente - quantil * erro_padrao,
+        'ic_superior': coeficiente + quantil * erro_padrao,
+    })
+    resumo = {
+        'especificacao': rotulo,
+        'n': n,
+        'empresas': g,
+        'r2': r2,
+        'iteracoes': iteracoes,
+    }
+    return coeficientes, resumo
+
+
+def _quantil_t(probabilidade, gl):
+    """Quantil da distribuição t (bissecção sobre ``p_valor_t``)."""
+    alvo = 2 * (1 - probabilidade)
+    inferior, superior = 0.0, 1e3
+    for _ in range(100):
+        meio = (inferior + superior) / 2
+        if p_valor_t(meio, gl) > alvo:
+            inferior = meio
+        else:
+            superior = meio
+    return (inferior + superior) / 2
+
+
+def obter_modelo(painel, metrica, proxy, controles=CONTROLES, efeitos='empresa_ano'):
+    """``estimar`` sobre o painel completo, em cache por especificação."""
+    controles = tuple(controles)
+    return painel.artefato(
+        ('modelo', metrica, proxy, controles, efeitos),
+        lambda df: estimar(df, metrica, proxy, list(controles), efeitos),
+    )
+
+
+def comparar(resultados, proxy):
+    """Coeficiente de ``proxy`` e resumo de cada especificação, uma linha por modelo.
+
+    ``resultados`` é um dicionário especificação -> ``(coeficientes, resumo)``.
+    """
+    linhas = []
+    for coeficientes, resumo in resultados.values():
+        linha = coeficientes[coeficientes['variavel'] == proxy].iloc[0]
+        linhas.append({
+            'especificacao': resumo['especificacao'],
+            'coeficiente': linha['coeficiente'],
+            'erro_padrao': linha['erro_padrao'],
+            'p_valor': linha['p_valor'],
+            'n': resumo['n'],
+            'empresas': resumo['empresas'],
+            'r2': resumo['r2'],
+        })
+    return pd.DataFrame(linhas)
+
+
+def empilhar(resultados):
+    """Coeficientes de todas as especificações em uma tabela só."""
+    return pd.concat(
+        [coeficientes.assign(especificacao=resumo['especificacao']) for coeficientes, resumo in resultados.values()],
+        ignore_index=True,
+    )
+
+
+if __name__ == "__main__":
+    from utils.dados import carregar_dados
+    from utils.proxies import painel_ampliado
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--escala', type=int, default=10,
+                        help="tamanho do painel sintético usado na medição de tempo")
+    parser.add_argument('--metrica', default='wroa')
+    parser.add_argument('--proxy', default='oc1')
+    args = parser.parse_args()
+
+    df = carregar_dados()
+    for efeitos in EFEITOS:
+        coeficientes, resumo = estimar(df, args.metrica, args.proxy, efeitos=efeitos)
+        print(resumo)
+        print(coeficientes.to_string(index=False, float_format="{:.4f}".format), "\n")
+
+    ampliado = painel_ampliado(df, args.escala)
+    for efeitos in EFEITOS:
+        inicio = time.perf_counter()
+        _, resumo = estimar(ampliado, args.metrica, args.proxy, efeitos=efeitos)
+        print(f"{efeitos}: {len(ampliado)} linhas em {time.perf_counter() - inicio:.2f} s "
+              f"({resumo['iteracoes']} iterações)")
@@ -0,0 +1,134 @@
+"""Cálculo das proxies de excesso de confiança a partir das colunas brutas.
+
+Reproduz as regras da dissertação:
+
+- ``oc1``: ``capex / atl1`` acima da mediana do setor no ano;
+- ``oc2``: resíduo positivo da regressão MQO, por setor e ano, do crescimento
+  das vendas (``crerec``) sobre o crescimento dos ativos (``creat``);
+- ``oc3``: ``(emfcp + emflp) / ev`` acima da mediana do setor no ano;
+- ``oc4``: dividendos por ação (``dpa``) iguais a zero;
+- ``oc41``: dividend yield (``dyf``) acima da mediana do setor no ano;
+- ``oc134`` e ``oc234``: soma das proxies que os compõem.
+
+Medianas e regressões são calculadas de forma vetorizada para todas as
+células (setor, ano) de uma vez (ver ``utils.regressao``).
+
+Para comparar as proxies recalculadas com as do arquivo::
+
+    python -m utils.proxies [--escala N]
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from utils.regressao import GRUPOS, residuos_mqo
+
+COLUNAS_DERIVADAS = [
+    'atl1', 'recl1', 'capexatl1', 'mediana_capexatl1', 'oc1',
+    'creat', 'crerec', 'residuo', 'oc2',
+    'divev', 'mediana_divev', 'oc3', 'oc4', 'mediana_dy', 'oc41', 'oc134', 'oc234',
+]
+
+
+def defasar(df, coluna):
+    """Valor de ``coluna`` da mesma empresa no ano anterior (NaN se ausente)."""
+    anterior = df[['ticker', 'ano', coluna]].copy()
+    anterior['ano'] = anterior['ano'] + 1
+    chaves = pd.MultiIndex.from_frame(df[['ticker', 'ano']])
+    return (
+        anterior.set_index(['ticker', 'ano'])[coluna]
+        .reindex(chaves)
+        .to_numpy()
+    )
+
+
+def calcular_proxies(df, grupos=GRUPOS):
+    """Retorna uma cópia de ``df`` com as colunas derivadas e as proxies recalculadas.
+
+    ``atl1`` e ``recl1`` são usadas se existirem; caso contrário, vêm do ano
+    anterior da mesma empresa.
+    """
+    df = df.copy()
+    for coluna, original in (('atl1', 'at'), ('recl1', 'rec')):
+        if coluna not in df.columns:
+            df[coluna] = defasar(df, original)
+
+    medianas = df.groupby(grupos, observed=True)
+
+    df['capexatl1'] = df['capex'] / df['atl1']
+    df['mediana_capexatl1'] = medianas['capexatl1'].transform('median')
+    df['oc1'] = (df['capexatl1'] > df['mediana_capexatl1']).astype('int8')
+
+    df['creat'] = (df['at'] / df['atl1'] - 1) * 100
+    df['crerec'] = (df['rec'] / df['recl1'] - 1) * 100
+    df['residuo'] = residuos_mqo(df, 'creat', 'crerec', grupos)
+    df['oc2'] = (df['residuo'] > 0).astype('int8')
+
+    df['divev'] = (df['emfcp'] + df['emflp']) / df['ev']
+    df['mediana_divev'] = medianas['divev'].transform('median')
+    df['oc3'] = (df['divev'] > df['mediana_divev']).astype('int8')
+
+    df['oc4'] = (df['dpa'] == 0).astype('int8')
+
+    if 'dyf' in df.columns:
+        df['mediana_dy'] = medianas['dyf'].transform('median')
+        df['oc41'] = (df['dyf'] > df['mediana_dy']).astype('int8')
+
+    df['oc134'] = (df['oc1'] + df['oc3'] + df['oc4']).astype('int8')
+    df['oc234'] = (df['oc2'] + df['oc3'] + df['oc4']).astype('int8')
+    return df
+
+
+def verificar(df):
+    """Compara as proxies do arquivo com as recalculadas.
+
+    Retorna, por proxy, a concordância da regra (aplicada às medianas e
+    resíduos do arquivo) e a concordância do recálculo completo. As medianas e
+    regressões do arquivo foram estimadas na amostra anterior aos filtros da
+    pesquisa, por isso o recálculo completo não coincide em 100% das linhas.
+    """
+    regra = {
+        'oc1': df['capexatl1'] > df['mediana_capexatl1'],
+        'oc2': df['residuo'] > 0,
+        'oc3': df['divev'] > df['mediana_divev'],
+        'oc4': df['dpa'] == 0,
+        'oc41': df['dyf'] > df['mediana_dy'],
+        'oc134': df['oc1'] + df['oc3'] + df['oc4'],
+        'oc234': df['oc2'] + df['oc3'] + df['oc4'],
+    }
+    recalculado = calcular_proxies(df)
+    return pd.DataFrame({
+        proxy: {
+            'regra': (valores.astype(int) == df[proxy]).mean(),
+            'recalculo': (recalculado[proxy] == df[proxy]).mean(),
+        }
+        for proxy, valores in regra.items()
+    }).T
+
+
+def painel_ampliado(df, escala):
+    """Painel sintético com ``escala`` cópias de cada empresa (tickers distintos)."""
+    copias = []
+    for i in range(escala):
+        copia = df.copy()
+        copia['ticker'] = copia['ticker'].astype(str) + (f"_{i}" if i else "")
+        copias.append(copia)
+    return pd.concat(copias, ignore_index=True)
+
+
+if __name__ == "__main__":
+    from utils.dados import carregar_dados
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--escala', type=int, default=10,
+                        help="tamanho do painel sintético usado na medição de tempo")
+    args = parser.parse_args()
+
+    df = carregar_dados()
+    print(verificar(df).to_string(float_format="{:.3f}".format))
+
+    ampliado = painel_ampliado(df, args.escala).drop(columns=['atl1', 'recl1'])
+    inicio = time.perf_counter()
+    calcular_proxies(ampliado)
+    print(f"\n{len(ampliado)} linhas recalculadas em {time.perf_counter() - inicio:.2f} s")
@@ -0,0 +1,91 @@
+"""Índice de ranking por (ano, setor).
+
+Para cada coluna ranqueável (``divev_dif`` e as métricas ``w*``) guarda os
+números das linhas ordenados por célula (ano, setor) e, dentro da célula,
+pelo valor da coluna. Os N maiores (ou menores) de qualquer seleção de anos e
+setores saem das pontas das fatias já ordenadas: cada célula contribui com no
+máximo N candidatos e apenas esses candidatos são comparados, sem ordenar a
+seleção inteira.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.esquema import METRICAS_WINSORIZADAS
+
+COLUNAS_RANQUEAVEIS = ['divev_dif'] + METRICAS_WINSORIZADAS
+
+
+class IndiceRanking:
+    """Linhas de cada coluna ranqueável ordenadas por (ano, setor, valor)."""
+
+    def __init__(self, df, colunas=COLUNAS_RANQUEAVEIS):
+        self.n_linhas = len(df)
+        codigos_ano, self._anos = pd.factorize(df['ano'], sort=True)
+        codigos_setor, self._setores = pd.factorize(df['setor'], sort=True)
+        self._posicao_ano = {ano: i for i, ano in enumerate(self._anos.tolist())}
+        self._posicao_setor = {setor: i for i, setor in enumerate(self._setores.tolist())}
+        n_celulas = len(self._anos) * len(self._setores)
+        celula = codigos_ano * len(self._setores) + codigos_setor
+
+        self._colunas = {}
+        for coluna in colunas:
+            if coluna not in df.columns:
+                continue
+            valores = df[coluna].to_numpy(dtype='float64')
+            # Valores ausentes ficam fora do ranking
+            validas = np.flatnonzero(~np.isnan(valores))
+            ordem = validas[np.lexsort((valores[validas], celula[validas]))]
+            limites = np.searchsorted(celula[ordem], np.arange(n_celulas + 1))
+            self._colunas[coluna] = (valores, ordem, limites)
+
+    @property
+    def colunas(self):
+        return list(self._colunas)
+
+    def _celulas(self, anos, setores):
+        anos = self._posicao_ano.values() if anos is None else [
+            self._posicao_ano[a] for a in np.atleast_1d(anos).tolist() if a in self._posicao_ano
+        ]
+        setores = self._posicao_setor.values() if setores is None else [
+            self._posicao_setor[s] for s in np.atleast_1d(setores).tolist() if s in self._posicao_setor
+        ]
+        return [a * len(self._setores) + s for a in anos for s in setores]
+
+    def ranking(self, coluna, n, anos=None, setores=None, linhas=None, crescente=False):
+        """Números das linhas com os ``n`` maiores valores de ``coluna``, em ordem.
+
+        Com ``crescente=True``, os ``n`` menores. ``anos`` e ``setores``
+        restringem as células consultadas; ``linhas`` (números das linhas,
+        como ``Selecao.linhas``) restringe as linhas aceitas. Lança
+        ``ValueError`` se ``n`` for menor que 1.
+        """
+        if n < 1:
+            raise ValueError(f"O tamanho do ranking deve ser ao menos 1: {n}.")
+        valores, ordem, limites = self._colunas[coluna]
+        permitidas = None
+        if linhas is not None:
+            permitidas = np.zeros(self.n_linhas, dtype=bool)
+            permitidas[linhas] = True
+
+        candidatos = []
+        for celula in self._celulas(anos, setores):
+            fatia = ordem[limites[celula]:limites[celula + 1]]
+            if not crescente:
+                fatia = fatia[::-1]
+            if permitidas is not None:
+                fatia = fatia[permitidas[fatia]]
+            candidatos.append(fatia[:n])
+        if not candidatos:
+            return np.array([], dtype=np.int64)
+
+        candidatos = np.concatenate(candidatos)
+        chave = valores[candidatos] if crescente else -valores[candidatos]
+        if len(candidatos) > n:
+            melhores = np.argpartition(chave, n - 1)[:n]
+            candidatos, chave = candidatos[melhores], chave[melhores]
+        return candidatos[np.argsort(chave, kind='stable')]
+
+
+def obter_ranking(painel):
+    """Índice de ranking do painel, construído uma única vez por versão dos dados."""
+    return painel.artefato('ranking', IndiceRanking)
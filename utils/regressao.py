@@ -0,0 +1,82 @@
+"""Regressões MQO simples ajustadas em lote por célula (setor, ano).
+
+Todas as células são ajustadas de uma vez a partir das somas por grupo
+(forma fechada de ``y = a + b * x``), sem laço em Python. Os coeficientes,
+o R² e os resíduos ficam em cache por versão dos dados.
+"""
+import numpy as np
+import pandas as pd
+
+GRUPOS = ['setor', 'ano']
+
+
+def ajustar_celulas(df, x, y, grupos=GRUPOS):
+    """Ajusta ``y = a + b * x`` em cada grupo.
+
+    Retorna ``(coeficientes, residuos)``: um DataFrame com uma linha por grupo
+    (colunas dos grupos, ``n``, ``intercepto``, ``inclinacao`` e ``r2``) e um
+    array com o resíduo de cada linha de ``df``. Linhas com ``x`` ou ``y``
+    ausentes não entram no ajuste e ficam com resíduo NaN; grupos sem variação
+    em ``x`` usam apenas a média de ``y``.
+    """
+    agrupado = df.groupby(grupos, observed=True, sort=True)
+    codigos = agrupado.ngroup().to_numpy()
+    chaves = agrupado.size().index.to_frame(index=False)
+
+    xv = df[x].to_numpy(dtype='float64')
+    yv = df[y].to_numpy(dtype='float64')
+    validos = np.isfinite(xv) & np.isfinite(yv) & (codigos >= 0)
+
+    c = codigos[validos]
+    xs, ys = xv[validos], yv[validos]
+    k = agrupado.ngroups
+    n = np.bincount(c, minlength=k).astype('float64')
+    sx = np.bincount(c, xs, minlength=k)
+    sy = np.bincount(c, ys, minlength=k)
+    sxx = np.bincount(c, xs * xs, minlength=k)
+    syy = np.bincount(c, ys * ys, minlength=k)
+    sxy = np.bincount(c, xs * ys, minlength=k)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sxx_c = sxx - sx * sx / n
+        syy_c = syy - sy * sy / n
+        sxy_c = sxy - sx * sy / n
+        b = np.where(sxx_c > 1e-12 * np.maximum(sxx, 1), sxy_c / sxx_c, 0.0)
+        a = (sy - b * sx) / n
+        r2 = np.where(syy_c > 0, b * sxy_c / syy_c, np.nan)
+
+    residuos = np.full(len(df), np.nan)
+    residuos[validos] = ys - a[c] - b[c] * xs
+
+    coeficientes = chaves.assign(n=n.astype('int64'), intercepto=a, inclinacao=b, r2=r2)
+    return coeficientes, residuos
+
+
+def residuos_mqo(df, x, y, grupos=GRUPOS):
+    """Apenas os resíduos de ``ajustar_celulas``."""
+    return ajustar_celulas(df, x, y, grupos)[1]
+
+
+def anexar_celulas(regressao, df, x, y, grupos=GRUPOS):
+    """Acrescenta a ``regressao`` as células de ``df`` (linhas após as já ajustadas).
+
+    As células de ``df`` não podem existir em ``regressao``: cada célula é
+    ajustada apenas com as próprias linhas.
+    """
+    coeficientes, residuos = regressao
+    novos_coeficientes, novos_residuos = ajustar_celulas(df, x, y, grupos)
+    coeficientes = pd.concat([coeficientes, novos_coeficientes], ignore_index=True)
+    return (
+        coeficientes.sort_values(list(grupos), kind='stable', ignore_index=True),
+        np.concatenate([residuos, novos_residuos]),
+    )
+
+
+def obter_regressao(painel, x, y, grupos=GRUPOS):
+    """``ajustar_celulas`` sobre o painel, calculado uma única vez por versão dos dados."""
+    grupos = list(grupos)
+    return painel.artefato(
+        ('regressao', x, y, tuple(grupos)),
+        lambda df: ajustar_celulas(df, x, y, grupos),
+        lambda regressao, df: anexar_celulas(regressao, df, x, y, grupos),
+    )
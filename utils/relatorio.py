@@ -0,0 +1,390 @@
+"""Pacote estático (HTML, PNG e Excel) com todas as visões das páginas 1 a 4.
+
+Para aulas e distribuição offline, cada combinação de filtros das páginas é
+pré-renderizada em uma pasta que abre no navegador sem o aplicativo:
+
+- página 1: cada proxy × métrica de desempenho (figura, médias e Excel);
+- página 2: cada célula (setor, ano) com dados (figura, reta MQO e Excel);
+- página 3: cada ano (gráfico por setor, rankings de ``divev_dif`` e Excel);
+- página 4: cada nível de governança (gráfico, série e Excel).
+
+As visões são renderizadas em um pool de processos. Os índices, agregados e
+regressões são construídos antes de o pool iniciar; com ``fork``, os processos
+herdam esses artefatos e o painel mapeado em memória somente para leitura,
+sem relê-los. O ``manifesto.json`` guarda, para cada visão, o hash das linhas
+e colunas que ela usa: numa nova execução, as visões cujas entradas não
+mudaram (por exemplo, os anos antigos depois de anexar um ano novo) são
+puladas, e as que deixaram de existir têm os arquivos removidos::
+
+    python -m utils.relatorio --destino relatorio --processos 4
+"""
+import argparse
+import hashlib
+import html
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from utils import analises
+from utils.cubo import METRICAS_DESEMPENHO, obter_cubo
+from utils.dados import carregar_painel
+from utils.esquema import NIVEIS_GOVERNANCA, VARIAVEIS_OC
+from utils.exportacao import gerar_excel
+from utils.figuras import figura_desempenho, figura_investimento, grafico_contagem_oc3, grafico_governanca
+from utils.importacao import modulo
+from utils.indice import obter_indice
+from utils.ranking import obter_ranking
+
+DESTINO = os.environ.get("RELATORIO_DESTINO", "relatorio")
+
+# Processos do pool (RELATORIO_PROCESSOS; padrão: um por CPU)
+PROCESSOS = int(os.environ.get("RELATORIO_PROCESSOS", "0")) or os.cpu_count() or 1
+
+# Incrementar quando o conteúdo dos arquivos mudar: invalida todas as visões
+VERSAO_FORMATO = 1
+
+ARQUIVO_MANIFESTO = "manifesto.json"
+ARQUIVO_PLOTLY = "plotly.min.js"
+
+TITULOS_PAGINAS = {
+    1: "Excesso de confiança e desempenho",
+    2: "Excesso de investimento",
+    3: "Decisões de financiamento: dívida",
+    4: "Governança corporativa",
+}
+
+# Mesmas colunas das páginas 3 e 4
+COLUNAS_FINANCIAMENTO = ['ano', 'setor', 'ticker', 'oc3', 'divev', 'mediana_divev', 'divev_dif',
+                         'wroa', 'wroaebit', 'wroe', 'wqtobin', 'wmgop', 'wopor', 'lnat', 'divbrat']
+TAMANHO_RANKING = 10
+
+_painel = None
+
+
+def _nome_arquivo(texto):
+    texto = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^0-9A-Za-z]+', '_', texto).strip('_').lower()
+
+
+# === Espaço de visões ===
+
+def visoes(painel):
+    """Todas as visões do pacote: dicionários com ``id``, ``pagina``, ``titulo`` e ``parametros``."""
+    indice = obter_indice(painel)
+    proxies = [oc for oc in VARIAVEIS_OC if oc in painel.colunas]
+    lista = []
+    for proxy in proxies:
+        for metrica in METRICAS_DESEMPENHO:
+            if metrica in painel.colunas:
+                lista.append({
+                    'id': f"pagina1/{proxy}_{metrica}", 'pagina': 1,
+                    'titulo': f"{metrica.upper()} por ano e grupo de {proxy.upper()}",
+                    'parametros': {'proxy': proxy, 'metrica': metrica},
+                })
+    for setor in indice.valores('setor'):
+        for ano in indice.valores('ano', setor=setor):
+            lista.append({
+                'id': f"pagina2/{_nome_arquivo(setor)}_{ano}", 'pagina': 2,
+                'titulo': f"{setor} ({ano})",
+                'parametros': {'setor': setor, 'ano': ano},
+            })
+    if 'divev_dif' in painel.colunas:
+        for ano in indice.valores('ano'):
+            lista.append({
+                'id': f"pagina3/{ano}", 'pagina': 3,
+                'titulo': f"Empresas com OC3 = 1 em {ano}",
+                'parametros': {'ano': ano},
+            })
+    for nivel in NIVEIS_GOVERNANCA:
+        if nivel in painel.colunas:
+            lista.append({
+                'id': f"pagina4/{nivel}", 'pagina': 4,
+                'titulo': f"Nível {nivel.upper()}",
+                'parametros': {'nivel': nivel, 'ocs': proxies},
+            })
+    return lista
+
+
+def _entradas(painel, visao):
+    # Colunas e linhas de que a visão depende
+    p = visao['parametros']
+    indice = obter_indice(painel)
+    if visao['pagina'] == 1:
+        return ['ano', 'setor', p['proxy'], p['metrica']], None
+    if visao['pagina'] == 2:
+        return None, indice.linhas(setor=p['setor'], ano=p['ano'])
+    if visao['pagina'] == 3:
+        return [c for c in COLUNAS_FINANCIAMENTO if c in painel.colunas], indice.linhas(ano=p['ano'])
+    return ['ano', 'setor', 'ticker', p['nivel']] + p['ocs'], None
+
+
+def assinatura_entradas(painel, visao):
+    """Hash dos parâmetros e dos dados de que a ``visao`` depende."""
+    colunas, linhas = _entradas(painel, visao)
+    dados = painel.dados(colunas, linhas=linhas)
+    hash_ = hashlib.sha256(json.dumps([VERSAO_FORMATO, visao['id'], visao['parametros']]).encode())
+    hash_.update(json.dumps(list(dados.columns)).encode())
+    hash_.update(pd.util.hash_pandas_object(dados, index=False).to_numpy().tobytes())
+    return hash_.hexdigest()
+
+
+# === Renderização de cada página ===
+
+def _tabela_html(df, casas=4):
+    return df.to_html(index=False, border=0, classes='tabela', float_format=lambda x: f"{x:.{casas}f}", na_rep='')
+
+
+def _grafico_html(fig):
+    return fig.to_html(full_html=False, include_plotlyjs=False)
+
+
+def _pagina1(painel, p, nome):
+    proxy, metrica = p['proxy'], p['metrica']
+    indice = obter_indice(painel)
+    anos, setores = indice.valores('ano'), indice.valores('setor')
+    medias = analises.desempenho(painel, proxy, metrica, anos=anos, setores=setores)
+    arquivos = {
+        f"{nome}.png": figura_desempenho(painel, proxy, metrica, indice.valores(proxy), anos, setores),
+        f"{nome}.xlsx": gerar_excel(medias, 'Medias'),
+    }
+    corpo = (
+        f'<img src="{nome}.png" alt="{html.escape(metrica)}">'
+        f"<h2>Médias por ano e grupo</h2>{_tabela_html(medias)}"
+    )
+    return arquivos, corpo
+
+
+def _pagina2(painel, p, nome):
+    dados, reta = analises.celula_investimento(painel, p['setor'], p['ano'])
+    arquivos = {
+        f"{nome}.png": figura_investimento(painel, p['setor'], p['ano']),
+        f"{nome}.xlsx": gerar_excel(dados, 'Dados'),
+    }
+    corpo = f'<img src="{nome}.png" alt="{html.escape(p["setor"])}">'
+    if reta is not None:
+        corpo += (
+            f"<p>Reta MQO: resíduo = {reta['intercepto']:.3f} {'-' if reta['inclinacao'] < 0 else '+'} "
+            f"{abs(reta['inclinacao']):.3f} × crescimento dos ativos "
+            f"(R² = {reta['r2']:.3f}, n = {reta['n']})</p>"
+        )
+    corpo += f"<h2>Dados representados no gráfico</h2>{_tabela_html(dados[['ticker', 'creat', 'residuo']])}"
+    return arquivos, corpo
+
+
+def _pagina3(painel, p, nome):
+    ano = p['ano']
+    contagem = analises.contagem_oc3(painel, ano)
+    maiores = analises.ranking_empresas(painel, 'divev_dif', TAMANHO_RANKING, ano=ano)
+    menores = analises.ranking_empresas(painel, 'divev_dif', TAMANHO_RANKING, ano=ano, crescente=True)
+    colunas = [c for c in COLUNAS_FINANCIAMENTO if c in painel.colunas]
+    dados = obter_indice(painel).selecionar(painel, ano=ano, oc3=1).dados(colunas)
+    arquivos = {f"{nome}.xlsx": gerar_excel(dados, 'Dados')}
+    corpo = _grafico_html(grafico_contagem_oc3(contagem)) if len(contagem) else "<p>Não há empresas com OC3 = 1.</p>"
+    corpo += (
+        f"<h2>Empresas com Maior Nível de Excesso de Confiança Gerencial</h2>{_tabela_html(maiores)}"
+        f"<h2>Empresas com Menor Nível de Excesso de Confiança Gerencial</h2>{_tabela_html(menores)}"
+    )
+    return arquivos, corpo
+
+
+def _pagina4(painel, p, nome):
+    nivel, ocs = p['nivel'], p['ocs']
+    serie = analises.serie_governanca(painel, nivel, ocs)
+    dados = obter_indice(painel).selecionar(painel, **{nivel: 1}).dados(['ticker', 'ano', 'setor', nivel] + ocs)
+    arquivos = {f"{nome}.xlsx": gerar_excel(dados, 'Empresas')}
+    corpo = (
+        _grafico_html(grafico_governanca(serie, nivel))
+        + "<p>Empresas com excesso de confiança: ao menos uma proxy de OC igual a 1.</p>"
+        + f"<h2>Série anual</h2>{_tabela_html(serie)}"
+    )
+    return arquivos, corpo
+
+
+RENDERIZADORES = {1: _pagina1, 2: _pagina2, 3: _pagina3, 4: _pagina4}
+
+
+def _documento(titulo, corpo, raiz=''):
+    return f"""<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<title>{html.escape(titulo)}</title>
+<script src="{raiz}{ARQUIVO_PLOTLY}"></script>
+<style>
+body {{ font-family: sans-serif; max-width: 1100px; margin: 2em auto; padding: 0 1em; }}
+img {{ max-width: 100%; }}
+.tabela {{ border-collapse: collapse; font-size: 0.9em; }}
+.tabela th, .tabela td {{ padding: 0.2em 0.6em; border-bottom: 1px solid #ddd; text-align: right; }}
+</style>
+</head>
+<body>
+{corpo}
+</body>
+</html>
+"""
+
+
+def _iniciar_processo(caminho):
+    global _painel
+    # Com "fork", o painel e os artefatos já vêm do processo principal
+    _painel = carregar_painel(caminho)
+
+
+def renderizar(visao, destino):
+    """Grava os arquivos da ``visao`` em ``destino``; retorna os caminhos relativos gravados."""
+    pasta, nome = visao['id'].split('/')
+    os.makedirs(os.path.join(destino, pasta), exist_ok=True)
+    arquivos, corpo = RENDERIZADORES[visao['pagina']](_painel, visao['parametros'], nome)
+    titulo = f"{TITULOS_PAGINAS[visao['pagina']]} — {visao['titulo']}"
+    xlsx = f"{nome}.xlsx"
+    arquivos[f"{nome}.html"] = _documento(
+        titulo,
+        f'<p><a href="../index.html">← Índice</a></p><h1>{html.escape(titulo)}</h1>{corpo}'
+        f'<p><a href="{xlsx}">Baixar dados em Excel</a></p>',
+        raiz='../'
+    ).encode('utf-8')
+    for arquivo, conteudo in arquivos.items():
+        with open(os.path.join(destino, pasta, arquivo), 'wb') as saida:
+            saida.write(conteudo)
+    return [f"{pasta}/{arquivo}" for arquivo in arquivos]
+
+
+# === Manifesto e índice ===
+
+def ler_manifesto(destino):
+    """Manifesto da última execução em ``destino`` (vazio se não houver)."""
+    try:
+        with open(os.path.join(destino, ARQUIVO_MANIFESTO), encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'visoes': {}}
+
+
+def _gravar_manifesto(destino, manifesto):
+    caminho = os.path.join(destino, ARQUIVO_MANIFESTO)
+    temporario = caminho + ".tmp"
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, ensure_ascii=False, indent=1)
+    os.replace(temporario, caminho)
+
+
+def _gravar_indice(destino, painel, lista):
+    secoes = []
+    for pagina, titulo in TITULOS_PAGINAS.items():
+        itens = ''.join(
+            f'<li><a href="{visao["id"]}.html">{html.escape(visao["titulo"])}</a></li>'
+            for visao in lista if visao['pagina'] == pagina
+        )
+        if itens:
+            secoes.append(f"<h2>{html.escape(titulo)}</h2><ul>{itens}</ul>")
+    corpo = (
+        f"<h1>Excesso de Confiança Gerencial</h1>"
+        f"<p>Conjunto de dados: {html.escape(painel.nome)} (versão {painel.versao[:12]}).</p>"
+        + ''.join(secoes)
+    )
+    with open(os.path.join(destino, "index.html"), 'w', encoding='utf-8') as arquivo:
+        arquivo.write(_documento("Excesso de Confiança Gerencial", corpo))
+
+
+def _remover(destino, arquivos):
+    for arquivo in arquivos:
+        try:
+            os.remove(os.path.join(destino, arquivo))
+        except FileNotFoundError:
+            pass
+
+
+def gerar(painel, destino=DESTINO, processos=PROCESSOS, forcar=False):
+    """Gera ou atualiza o pacote estático de ``painel`` em ``destino``.
+
+    Uma visão com falha não impede as demais: ela fica fora do manifesto e é
+    tentada de novo na próxima execução. Retorna ``(renderizadas, puladas,
+    removidas, falhas)``, com ``falhas`` no formato ``{id: erro}``.
+    """
+    os.makedirs(destino, exist_ok=True)
+    lista = visoes(painel)
+    anterior = ler_manifesto(destino)['visoes']
+    manifesto = {'conjunto': painel.nome, 'versao_dados': painel.versao, 'visoes': {}}
+
+    pendentes = []
+    falhas = {}
+    for visao in lista:
+        entradas = assinatura_entradas(painel, visao)
+        registro = anterior.get(visao['id'])
+        if (not forcar and registro is not None and registro['entradas'] == entradas
+                and all(os.path.exists(os.path.join(destino, a)) for a in registro['arquivos'])):
+            manifesto['visoes'][visao['id']] = registro
+        else:
+            pendentes.append((visao, entradas))
+
+    # Arquivos de visões que deixaram de existir
+    removidas = [id_ for id_ in anterior if id_ not in {visao['id'] for visao in lista}]
+    for id_ in removidas:
+        _remover(destino, anterior[id_]['arquivos'])
+
+    if not os.path.exists(os.path.join(destino, ARQUIVO_PLOTLY)):
+        with open(os.path.join(destino, ARQUIVO_PLOTLY), 'w', encoding='utf-8') as arquivo:
+            arquivo.write(modulo('plotly.offline').get_plotlyjs())
+
+    try:
+        if pendentes:
+            # Artefatos construídos uma única vez, antes de os processos serem criados
+            obter_indice(painel)
+            obter_cubo(painel)
+            obter_ranking(painel)
+            analises.retas_investimento(painel)
+            metodo = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+            with ProcessPoolExecutor(
+                max_workers=processos,
+                mp_context=multiprocessing.get_context(metodo),
+                initializer=_iniciar_processo,
+                initargs=(painel.caminho,),
+            ) as pool:
+                tarefas = {pool.submit(renderizar, visao, destino): (visao, entradas) for visao, entradas in pendentes}
+                for tarefa in as_completed(tarefas):
+                    visao, entradas = tarefas[tarefa]
+                    try:
+                        arquivos = tarefa.result()
+                    except Exception as erro:
+                        falhas[visao['id']] = repr(erro)
+                        continue
+                    manifesto['visoes'][visao['id']] = {
+                        'titulo': visao['titulo'],
+                        'entradas': entradas,
+                        'arquivos': arquivos,
+                    }
+    finally:
+        # Visões concluídas ficam registradas mesmo se a execução for interrompida
+        _gravar_manifesto(destino, manifesto)
+    _gravar_indice(destino, painel, [visao for visao in lista if visao['id'] in manifesto['visoes']])
+    return len(pendentes) - len(falhas), len(lista) - len(pendentes), len(removidas), falhas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--destino', default=DESTINO, help=f"pasta do pacote (padrão: {DESTINO})")
+    parser.add_argument('--processos', type=int, default=PROCESSOS)
+    parser.add_argument('--conjunto', help="nome do conjunto de dados (padrão: o primeiro do registro)")
+    parser.add_argument('--forcar', action='store_true', help="renderiza todas as visões, mesmo as inalteradas")
+    parser.add_argument('--zip', action='store_true', help="gera também um arquivo .zip do pacote")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    try:
+        painel = analises.painel_do_conjunto(args.conjunto)
+    except KeyError:
+        parser.error(f"conjunto desconhecido: {args.conjunto!r}")
+    renderizadas, puladas, removidas, falhas = gerar(painel, args.destino, args.processos, args.forcar)
+    print(f"{renderizadas} visões renderizadas, {puladas} inalteradas, {removidas} removidas "
+          f"em {time.perf_counter() - inicio:.1f} s ({args.processos} processos)")
+    for id_, erro in falhas.items():
+        print(f"{id_} falhou: {erro}")
+    if args.zip:
+        print(shutil.make_archive(args.destino.rstrip(os.sep), 'zip', args.destino))